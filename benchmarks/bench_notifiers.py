@@ -0,0 +1,126 @@
+"""Time notification delivery through NotificationDispatcher.
+
+For each backend, sends --count notifications and reports how long send() held
+the caller (the Kivy main thread in the app) and how long each notification
+took to go out. "slow" is a subprocess that takes --slow seconds, standing in
+for an osascript / notify-send that hangs; with --timeout below it, every send
+should be cut off at the timeout while send() itself stays in microseconds.
+
+Finally a burst of --burst reminders due on the same minute is run through
+NotificationScheduler to count how many notifications it turns into.
+
+    python benchmarks/bench_notifiers.py --count 200
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from datetime import datetime, timedelta
+
+from notifiers import NotificationDispatcher, MemoryNotifier, LogNotifier, NotifySendNotifier, batch_message
+from scheduler import NotificationScheduler
+
+
+class SlowNotifier:
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def send(self, title, message, timeout=None):
+        subprocess.run(["sleep", str(self.seconds)], check=True, timeout=timeout)
+
+
+class Timed:
+    """Wraps a notifier and records when each send finished."""
+    def __init__(self, notifier):
+        self.notifier = notifier
+        self.finished = []
+
+    def send(self, title, message, timeout=None):
+        try:
+            self.notifier.send(title, message, timeout=timeout)
+        finally:
+            self.finished.append(time.perf_counter())
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+def run(name, notifier, count, timeout):
+    timed = Timed(notifier)
+    # No rate limit, this measures the backend itself
+    dispatcher = NotificationDispatcher(timed, max_queued=count, timeout=timeout, min_interval=0)
+
+    queued, send_times = [], []
+    for i in range(count):
+        start = time.perf_counter()
+        dispatcher.send("Reminder", f"Reminder {i}\nScheduled for 09:00 AM")
+        send_times.append(time.perf_counter() - start)
+        queued.append(start)
+
+    dispatcher.flush()
+    dispatcher.close()
+
+    # Sent one at a time in order, so the i-th finish belongs to the i-th send
+    delivery = [done - start for start, done in zip(queued, timed.finished)]
+    print(f"{name:<12} send() median {statistics.median(send_times) * 1e6:7.1f} us  "
+          f"max {max(send_times) * 1e6:8.1f} us   "
+          f"delivered p50 {percentile(delivery, 50) * 1000:9.2f} ms  p95 {percentile(delivery, 95) * 1000:9.2f} ms  "
+          f"total {(timed.finished[-1] - queued[0]):6.2f} s")
+
+
+def burst(count):
+    now = datetime(2026, 1, 1, 8, 59)
+    clock = [now]
+    timers = []
+    memory = MemoryNotifier()
+
+    class Timer:
+        def __init__(self, delay, callback):
+            self.callback = callback
+            timers.append(self)
+
+        def cancel(self):
+            pass
+
+    scheduler = NotificationScheduler(lambda items: memory.send(*batch_message(items, clock[0])), Timer,
+                                      now=lambda: clock[0])
+    due = now + timedelta(minutes=1)
+    scheduler.load([(i, f"Reminder {i}", due, "Work" if i % 2 else "Home", None) for i in range(count)])
+
+    clock[0] = due
+    timers[-1].callback()
+    print(f"burst        {count} reminders due at {due:%H:%M} -> {len(memory.sent)} notification(s): "
+          f"{memory.sent[0][0]!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=0.2)
+    parser.add_argument("--slow", type=float, default=1.0)
+    parser.add_argument("--burst", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run("memory", MemoryNotifier(), args.count, args.timeout)
+        run("log file", LogNotifier(os.path.join(tmp, "notifications.log")), args.count, args.timeout)
+        if shutil.which("notify-send"):
+            run("notify-send", NotifySendNotifier(), args.count, args.timeout)
+        else:
+            print("notify-send  not installed, skipped")
+        run("slow", SlowNotifier(args.slow), min(args.count, 10), args.timeout)
+
+    burst(args.burst)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compare the database.ini pragma profile against SQLite's defaults.
+
+Times the add_reminder insert path (insert_reminder) and the load_reminders
+read path (fetch_folder_reminders) on a fresh database for each profile.
+
+    python benchmarks/bench_pragmas.py --reminders 2000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import ConnectionManager, setup_database, insert_reminder, fetch_folder_reminders, load_pragma_profile
+
+# What the app ran on before the profile existed
+BASELINE_PRAGMAS = {"journal_mode": "DELETE", "synchronous": "FULL"}
+
+
+def run(pragmas, reminders, folders, reads):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ConnectionManager(os.path.join(tmp, "bench.db"), pragmas=pragmas)
+        setup_database(db)
+
+        folder_names = [f"Folder {i}" for i in range(folders)]
+        with db.transaction() as cursor:
+            cursor.executemany("INSERT INTO folders (name) VALUES (?)", [(name,) for name in folder_names])
+
+        writes = []
+        for i in range(reminders):
+            start = time.perf_counter()
+            # High urgency and not recurring, so every add hits the worst case of three inserts
+            insert_reminder(db, f"Reminder {i}", folder_names[i % folders], 3, datetime(2030, 1, 1, 9, 0))
+            writes.append(time.perf_counter() - start)
+
+        loads = []
+        for i in range(reads):
+            start = time.perf_counter()
+            fetch_folder_reminders(db, folder_names[i % folders])
+            loads.append(time.perf_counter() - start)
+
+        db.close()
+    return writes, loads
+
+
+def describe(samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    return f"mean {statistics.mean(samples) * 1000:7.3f} ms   p95 {p95 * 1000:7.3f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reminders", type=int, default=1000)
+    parser.add_argument("--folders", type=int, default=20)
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+
+    for label, pragmas in (("defaults", BASELINE_PRAGMAS), ("profile", load_pragma_profile())):
+        writes, loads = run(pragmas, args.reminders, args.folders, args.reads)
+        print(f"{label:<9} add_reminder   {describe(writes)}")
+        print(f"{label:<9} load_reminders {describe(loads)}")
+
+
+if __name__ == "__main__":
+    main()
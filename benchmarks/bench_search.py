@@ -0,0 +1,58 @@
+"""Time search_reminders over a large database.
+
+Fills a fresh database with --reminders reminders (plus the copies add_reminder
+makes) built from a small vocabulary, so common words match a big share of
+the table, then times a mix of selective, common and as-you-type queries.
+
+    python benchmarks/bench_search.py --reminders 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import ConnectionManager, setup_database, insert_reminder, search_reminders
+
+WORDS = ("buy milk call mom dentist appointment pay rent water plants email boss "
+         "finish report gym laundry taxes car wash passport renew book flight").split()
+
+QUERIES = ["milk", "dentist appo", "pay rent", "passport renew", "fl", "12345"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reminders", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ConnectionManager(os.path.join(tmp, "bench.db"))
+        setup_database(db)
+
+        with db.transaction():
+            for i in range(args.reminders):
+                text = " ".join(random.sample(WORDS, 3)) + f" {i}"
+                insert_reminder(db, text, "Pinned" if i % 3 else "Recurring", random.choice((1, 2, 3)),
+                                datetime(2030, 1, 1, 9, 0), add_to_recurring=i % 5 == 0)
+
+        for query in QUERIES:
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                results = search_reminders(db, query)
+                samples.append(time.perf_counter() - start)
+            print(f"{query!r:<18} {len(results):3d} results   "
+                  f"median {statistics.median(samples) * 1000:7.3f} ms   max {max(samples) * 1000:7.3f} ms")
+
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
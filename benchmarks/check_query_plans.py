@@ -0,0 +1,126 @@
+"""Fail if any hot query would do a full table scan.
+
+Calls the database.py functions behind switching folders, searching, adding,
+dragging and completing reminders, the badges, the notification schedule and
+the calendar against a scratch database built by setup_database, records every
+statement they actually issue (sqlite3's trace callback, with the parameters
+filled in) and runs EXPLAIN QUERY PLAN on each. A query changed in database.py
+is checked as it now is, nothing here has to be kept in step with it.
+
+    python benchmarks/check_query_plans.py
+"""
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import (ConnectionManager, setup_database, insert_reminder, insert_reminders, fetch_folder_reminders,
+                      search_reminders, complete_reminder, fetch_completed, move_reminder, fetch_folder_counts,
+                      advance_overdue_watermark, get_notify_at, add_notification_dates, add_schedule,
+                      fetch_pending_notifications, fetch_missed_notifications, claim_notifications,
+                      set_delivered_through, fetch_delivery_history, fetch_occurrences)
+from recurrence import Recurrence
+
+# Tables with a row per folder, per table or just one row, read whole on purpose
+SMALL_TABLES = {"folders", "folder_counters", "counter_state", "notification_state", "themes", "sqlite_sequence"}
+
+# Hot path -> tables it has to read whole: the app's startup load wants every schedule still running
+WHOLE_READS = {"pending notifications": {"s"}}
+
+_STATEMENT = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|REPLACE|WITH)\b", re.IGNORECASE)
+_VIRTUAL_SCAN = re.compile(r"VIRTUAL TABLE INDEX (\d+):")
+
+
+def hot_paths(db):
+    """Yield (name, call) for each hot path, call() running it on db. Seeds the rows they need first."""
+    soon = (datetime.now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+    first = insert_reminder(db, "Dentist appointment", "Pinned", 3, soon)
+    second = insert_reminder(db, "Pay rent", "Pinned", 1, soon + timedelta(hours=1))
+    add_notification_dates(db, first, [soon + timedelta(days=2)])
+    add_schedule(db, second, Recurrence("weekly", soon))
+    pending = fetch_pending_notifications(db)
+
+    yield "load_reminders", lambda: fetch_folder_reminders(db, "Pinned")
+    yield "search", lambda: search_reminders(db, "dentist")
+    yield "add reminder", lambda: insert_reminder(db, "Call the bank", "Pinned", 2, soon, True)
+    yield "import chunk", lambda: insert_reminders(db, [("Imported", "Pinned", 1, soon, False, [soon], [])])
+    yield "add dates", lambda: add_notification_dates(db, first, [soon + timedelta(days=3)])
+    yield "add schedule", lambda: add_schedule(db, first, Recurrence("monthly", soon))
+    yield "saved date", lambda: get_notify_at(db, first)
+    yield "drag reminder", lambda: move_reminder(db, second, None, first)
+    yield "folder counts", lambda: fetch_folder_counts(db)
+    yield "newly overdue", lambda: advance_overdue_watermark(db, datetime.now() + timedelta(days=3))
+    yield "pending notifications", lambda: fetch_pending_notifications(db)
+    yield "daemon schedule", lambda: fetch_pending_notifications(db, soon, soon + timedelta(hours=6))
+    yield "missed notifications", lambda: fetch_missed_notifications(db, soon - timedelta(days=1), soon)
+    yield "claim notifications", lambda: claim_notifications(db, [item[:4] for item in pending], "app")
+    yield "delivered through", lambda: set_delivered_through(db, soon)
+    yield "delivery history", lambda: fetch_delivery_history(db)
+    yield "folder occurrences", lambda: fetch_occurrences(db, soon, soon + timedelta(days=31), "Pinned")
+    yield "all occurrences", lambda: fetch_occurrences(db, soon, soon + timedelta(days=31))
+    yield "complete reminder", lambda: complete_reminder(db, first)
+    yield "Completed page", lambda: fetch_completed(db)
+
+
+def traced(db, call):
+    """The statements call() issued on db's connection, without transaction control and trigger bodies."""
+    statements = []
+    db.connection.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        db.connection.set_trace_callback(None)
+    return list(dict.fromkeys(s for s in statements if _STATEMENT.match(s)))
+
+
+def full_scans(details, allowed=()):
+    """The plan steps in details that scan a whole table, other than the tables in allowed."""
+    # Scanning a subquery's or CTE's own (already filtered) result is fine, as is a SELECT without a FROM
+    allowed = set(allowed) | SMALL_TABLES | {"CONSTANT"}
+    allowed |= {d.split()[1] for d in details if d.split()[0] in ("MATERIALIZE", "CO-ROUTINE")}
+
+    for detail in details:
+        words = detail.split()
+        if words[0] != "SCAN" or words[1] in allowed or words[1].startswith("("):
+            continue
+        # A virtual table (the FTS index) is only walked whole when no constraint reaches it (index 0)
+        virtual = _VIRTUAL_SCAN.search(detail)
+        if virtual and virtual.group(1) != "0":
+            continue
+        # "SCAN t USING COVERING INDEX" still walks the whole index
+        yield detail
+
+
+def check(db):
+    """Run every hot path; returns (how many statements they issued, [(path, statement, detail)] full scans)."""
+    checked, failures = 0, []
+    for name, call in hot_paths(db):
+        for statement in traced(db, call):
+            with db.cursor() as cursor:
+                cursor.execute("EXPLAIN QUERY PLAN " + statement)
+                details = [row[-1] for row in cursor.fetchall()]
+            checked += 1
+            failures += [(name, " ".join(statement.split()), detail)
+                         for detail in full_scans(details, WHOLE_READS.get(name, ()))]
+    return checked, failures
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ConnectionManager(os.path.join(tmp, "plans.db"))
+        setup_database(db)
+        checked, failures = check(db)
+        db.close()
+
+    for name, statement, detail in failures:
+        print(f"FULL SCAN  {name}: {detail}\n    {statement[:200]}")
+    if failures:
+        sys.exit(1)
+    print(f"OK  {checked} statements from the hot paths use an index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Headless notifications for the Reminders app, for while the window is closed.
+
+Opens reminders.db, sleeps until the next reminder is due, sends its
+notification and goes back to sleep. Nothing from Kivy is imported, and only
+the next few hours of the schedule are held in memory, so it can run
+permanently in the background (a launchd agent or a systemd user service):
+
+    python daemon.py [--db reminders.db] [--log notifications.log] [--latency latency.json]
+
+Every POLL_INTERVAL seconds it checks PRAGMA data_version, which changes when
+any other connection commits, and reloads the schedule if the app (or an
+import) has changed something. If the file itself is replaced, say a backup
+restored over it, the connection is reopened.
+
+If the machine sleeps, the first tick after it wakes (see scheduler.py) reads
+whatever fell due in the meantime and announces it as one summary; at startup
+it does the same for anything due since notifications last went out.
+
+It never creates reminders.db: started before the app has ever run, it waits
+for the app to create the file. The only writes are to notification_deliveries and the delivered_through
+watermark. Every notification is claimed there before it's sent (see
+database.claim_notifications), so with the app open as well, whichever of the
+two claims a reminder first announces it and the other stays quiet.
+
+How late each notification went out is kept in a LatencyRecorder (latency.py);
+with --latency the percentiles and recent deliveries are written there on exit.
+"""
+import argparse
+import os
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database import (DB_PATH, ConnectionManager, fetch_pending_notifications, fetch_missed_notifications,
+                      claim_notifications, set_delivered_through)
+from latency import LatencyRecorder
+from migrations import SCHEMA_VERSION, schema_version
+from notifiers import NotificationDispatcher, LogNotifier, batch_message
+from scheduler import NotificationScheduler
+
+# How far ahead the schedule is loaded; it's reloaded half way through
+HORIZON = timedelta(hours=6)
+
+# Seconds between checks for changes made by the app
+POLL_INTERVAL = 30
+
+# A small page cache and no mmap, the daemon reads a handful of rows at a time
+DAEMON_PRAGMAS = {
+    "cache_size": -1024,
+    "mmap_size": 0,
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+}
+
+
+class _Alarm:
+    """What arm() hands NotificationScheduler here: run() sleeps until the deadline and calls back."""
+    def __init__(self, delay, callback):
+        self.deadline = time.monotonic() + delay
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class NotificationDaemon:
+    def __init__(self, db_path=DB_PATH, notify=None, now=datetime.now, notifier=None):
+        """notify(items) announces [(reminder_id, text, due, folder_name)] that fell due together.
+        By default they go to a NotificationDispatcher around notifier (notifiers.default_notifier()
+        if not given) as one notification."""
+        self.db_path = db_path
+        self.now = now
+        self.latency = LatencyRecorder(now=now)
+        self.dispatcher = None
+        if notify is None:
+            self.dispatcher = NotificationDispatcher(notifier)
+            notify = lambda items: self.dispatcher.send(*batch_message(items),
+                                                        on_sent=lambda ok: self.latency.completed(items, ok))
+        self.notify = notify
+
+        # Never creates the file: an empty reminders.db would make the app skip its first-run setup
+        self.db = ConnectionManager(db_path, pragmas=DAEMON_PRAGMAS, create=False)
+        self.scheduler = NotificationScheduler(self.deliver, self._arm, now=self.now,
+                                               on_wake=lambda since: fetch_missed_notifications(self.db, since),
+                                               latency=self.latency)
+        self.reload_at = None
+        self._alarm = None
+        self._file = None
+        self._data_version = None
+
+    def _arm(self, delay, callback):
+        self._alarm = _Alarm(delay, callback)
+        return self._alarm
+
+    def reload(self):
+        """Throw the schedule away and load the next HORIZON of it from the database."""
+        # Anything that fell due since the last alarm still goes out
+        due = self.scheduler.pop_due()
+        if due:
+            self.deliver(due)
+        self.scheduler.clear()
+
+        now = self.now()
+        self.scheduler.load(fetch_pending_notifications(self.db, now, now + HORIZON))
+        self.reload_at = now + HORIZON / 2
+
+    def deliver(self, items):
+        try:
+            claimed = claim_notifications(self.db, items, "daemon")
+            set_delivered_through(self.db, self.scheduler.delivered_through)
+        except Exception as e:  # Not claimed, so not sent; the app may still announce them
+            print(f"[ERROR] Could not claim notifications: {e}")
+            return
+        if not claimed:
+            return
+        try:
+            self.notify(claimed)
+        except Exception as e:
+            print(f"[ERROR] Notification failed: {e}")
+            self.latency.completed(claimed, False)
+            return
+        if self.dispatcher is None:
+            self.latency.completed(claimed)  # A notify() of our own has already sent them
+
+    def changed(self):
+        """True if the database has been written to (or replaced) since the last call."""
+        stat = os.stat(self.db_path)
+        file = (stat.st_dev, stat.st_ino)
+        if file != self._file:
+            self.db.close()  # A new file, the old connection would keep reading the old one
+            self._file = file
+            self._data_version = None
+
+        with self.db.cursor() as cursor:
+            cursor.execute("PRAGMA data_version")
+            data_version = cursor.fetchone()[0]
+        changed = data_version != self._data_version
+        self._data_version = data_version
+        return changed
+
+    def run(self, stop=None):
+        """Deliver notifications until stop (a threading.Event) is set."""
+        stop = stop or threading.Event()
+
+        # Started before the app has ever run, there's nothing to announce until it has
+        if not os.path.exists(self.db_path):
+            print(f"Waiting for {self.db_path} to be created by the app")
+            while not os.path.exists(self.db_path):
+                if stop.wait(POLL_INTERVAL):
+                    self.close()
+                    return
+
+        if schema_version(self.db) < SCHEMA_VERSION:
+            raise SystemExit(f"{self.db_path} is from an older version, open the app once to upgrade it")
+
+        self.changed()
+        self.reload()
+        missed = self.scheduler.catch_up(fetch_missed_notifications(self.db))
+        if missed:
+            self.latency.dispatched(missed, caught_up=True)
+            self.deliver(missed)
+        while not stop.is_set():
+            alarm = self._alarm
+            timeout = POLL_INTERVAL
+            if alarm is not None and not alarm.cancelled:
+                timeout = min(timeout, max(0, alarm.deadline - time.monotonic()))
+            if stop.wait(timeout):
+                break
+
+            if alarm is not None and not alarm.cancelled and time.monotonic() >= alarm.deadline:
+                alarm.cancelled = True
+                alarm.callback()
+
+            try:
+                if self.changed() or self.now() >= self.reload_at:
+                    self.reload()
+            except Exception as e:  # The app may be halfway through replacing the file
+                print(f"[ERROR] Could not reload the schedule: {e}")
+
+        self.close()
+
+    def close(self):
+        self.scheduler.cancel()
+        self.db.close()
+        if self.dispatcher is not None:
+            self.dispatcher.close(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--log", help="Append notifications to this file instead of showing them")
+    parser.add_argument("--latency", help="Write notification latency percentiles to this JSON file on exit")
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+
+    daemon = NotificationDaemon(args.db, notifier=LogNotifier(args.log) if args.log else None)
+    try:
+        daemon.run(stop)
+    finally:
+        if args.latency:
+            daemon.latency.dump(args.latency)
+
+
+if __name__ == "__main__":
+    main()
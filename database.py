@@ -0,0 +1,991 @@
+"""SQLite connection management for the Reminders app.
+
+The UI thread shares one long-lived connection instead of opening a new one
+(and re-reading the schema) on every click. Background threads borrow
+connections from a small pool so they never touch the UI connection.
+"""
+import configparser
+import heapq
+import json
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import urllib.parse
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from operator import itemgetter
+
+from migrations import migrate
+from recurrence import Recurrence
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "reminders.db")
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "database.ini")
+
+# Applied to every connection as it opens. WAL + synchronous=NORMAL means a commit
+# appends to the log without an fsync, which is most of what an add_reminder used to cost.
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,        # Negative means KiB, so roughly 16 MB of page cache
+    "mmap_size": 134217728,      # 128 MB
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,        # ms to wait on a lock held by another connection
+}
+
+_PRAGMA_VALUE = re.compile(r"^-?\w+$")
+
+
+def load_pragma_profile(config_path=CONFIG_PATH):
+    """Read the [pragmas] section of database.ini on top of DEFAULT_PRAGMAS.
+
+    Setting enabled = false turns the whole profile off (SQLite defaults).
+    """
+    profile = dict(DEFAULT_PRAGMAS)
+
+    parser = configparser.ConfigParser()
+    if not parser.read(config_path) or not parser.has_section("pragmas"):
+        return profile
+
+    if not parser.getboolean("pragmas", "enabled", fallback=True):
+        return {}
+
+    for name, value in parser.items("pragmas"):
+        if name == "enabled":
+            continue
+        if name not in DEFAULT_PRAGMAS:
+            raise ValueError(f"Unsupported pragma in {config_path}: {name}")
+        profile[name] = value
+
+    return profile
+
+
+def apply_pragmas(conn, profile):
+    for name, value in profile.items():
+        # PRAGMA values can't be bound as parameters, so only accept plain words and numbers
+        if not _PRAGMA_VALUE.match(str(value)):
+            raise ValueError(f"Invalid value for pragma {name}: {value!r}")
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+class ConnectionManager:
+    def __init__(self, db_path=DB_PATH, pool_size=2, pragmas=None, read_only=False, create=True):
+        """read_only opens every connection with mode=ro, so nothing can write (or migrate) through it.
+        create=False opens with mode=rw, so a missing file raises instead of being created empty."""
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.pragmas = load_pragma_profile() if pragmas is None else pragmas
+        self.read_only = read_only
+        self.create = create
+
+        self._conn = None
+        self._pool = queue.LifoQueue()
+        self._pool_lock = threading.Lock()
+        self._pool_opened = 0
+        self._all_pooled = []
+
+    def _open(self):
+        # isolation_level=None leaves transactions to transaction() below instead of sqlite3's implicit BEGINs
+        if self.read_only or not self.create:
+            mode = "ro" if self.read_only else "rw"
+            uri = "file:" + urllib.parse.quote(os.path.abspath(self.db_path)) + "?mode=" + mode
+            conn = sqlite3.connect(uri, uri=True, isolation_level=None, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        apply_pragmas(conn, self.pragmas)
+        return conn
+
+    @property
+    def connection(self):
+        """The long-lived connection, only to be used from the UI thread."""
+        if self._conn is None:
+            self._conn = self._open()
+        return self._conn
+
+    @contextmanager
+    def cursor(self, conn=None):
+        """Hand out a cursor on the UI connection (or conn), closed afterwards."""
+        cursor = (conn or self.connection).cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+    @contextmanager
+    def transaction(self, conn=None, write=True):
+        """Run the block in a single transaction, rolled back if anything raises.
+
+        A write transaction takes the write lock up front (BEGIN IMMEDIATE, as the writer thread does).
+        With a deferred BEGIN, a helper that reads before it writes fails outright with "database is
+        locked" if another connection commits in between, busy_timeout or not. write=False is for a
+        read-only snapshot.
+
+        Nested calls join the outer transaction so helpers can be composed.
+        """
+        conn = conn or self.connection
+        if conn.in_transaction:
+            with self.cursor(conn) as cursor:
+                yield cursor
+            return
+
+        with self.cursor(conn) as cursor:
+            cursor.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+            try:
+                yield cursor
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    @contextmanager
+    def pooled(self):
+        """Borrow a connection for a background thread, returned to the pool afterwards."""
+        conn = None
+        with self._pool_lock:
+            if self._pool.empty() and self._pool_opened < self.pool_size:
+                conn = self._open()
+                self._pool_opened += 1
+                self._all_pooled.append(conn)
+
+        if conn is None:
+            conn = self._pool.get()  # Blocks until another thread gives one back
+
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._pool.put(conn)
+
+    def bind(self, conn):
+        """A view of this manager whose cursor()/transaction() use conn, for the
+        database.py helpers when they run on a background thread."""
+        return _BoundConnection(self, conn)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+        with self._pool_lock:
+            for conn in self._all_pooled:
+                conn.close()
+            self._all_pooled.clear()
+            self._pool = queue.LifoQueue()
+            self._pool_opened = 0
+
+
+class _BoundConnection:
+    def __init__(self, manager, conn):
+        self._manager = manager
+        self.connection = conn
+
+    def cursor(self, conn=None):
+        return self._manager.cursor(conn or self.connection)
+
+    def transaction(self, conn=None, write=True):
+        return self._manager.transaction(conn or self.connection, write)
+
+
+# SQL Database Setup
+def setup_database(db):
+    """Bring the schema up to date (see migrations.py). A current database costs one PRAGMA read."""
+    migrate(db)
+
+
+# reminder_order and folder_order are sparse: neighbours start ORDER_GAP apart, so a drag
+# can drop an item between two others by giving it the midpoint and touching only its own row
+ORDER_GAP = 1024
+
+# Once two neighbours are this close, the folder is worth respacing before the gap runs out
+ORDER_MIN_GAP = 8
+
+# Built-in folders keep folder_order 0-3; custom folders sort after them
+BUILT_IN_FOLDER_ORDER = {"Pinned": 0, "Recurring": 1, "Non-Completed": 2, "Completed": 3}
+
+
+def _next_order(cursor, folder_name):
+    cursor.execute("SELECT MAX(reminder_order) FROM reminders WHERE folder_name = ?", (folder_name,))
+    max_order = cursor.fetchone()[0]
+    return (max_order + ORDER_GAP) if max_order is not None else 0
+
+
+def _key_between(before, after):
+    """An integer order key strictly between two keys (None means that end is open), or None if there's no room."""
+    if before is None and after is None:
+        return 0
+    if before is None:
+        return after - ORDER_GAP
+    if after is None:
+        return before + ORDER_GAP
+    if after - before < 2:
+        return None
+    return (before + after) // 2
+
+
+def _is_tight(before, key, after):
+    return any(other is not None and abs(key - other) < ORDER_MIN_GAP for other in (before, after))
+
+
+def to_epoch(moment):
+    """UTC seconds since the epoch for a naive local datetime, how due_at is stored."""
+    return int(moment.timestamp())
+
+
+def _due(moment):
+    """(due_at, utc_offset) for a naive local datetime, (None, None) for None."""
+    if moment is None:
+        return None, None
+    local = moment.astimezone()
+    return int(local.timestamp()), int(local.utcoffset().total_seconds())
+
+
+def from_epoch(seconds):
+    """The naive local datetime for a due_at, None for None."""
+    return None if seconds is None else datetime.fromtimestamp(seconds)
+
+
+def copy_folders(folder_name, urgency_level, add_to_recurring):
+    """[(folder, keeps_notify_at)] for the copies add_reminder makes of a new reminder."""
+    copies = []
+    # Also insert into Recurring if selected
+    if add_to_recurring:
+        copies.append(("Recurring", True))
+    if urgency_level == 3 and folder_name != "Pinned":
+        copies.append(("Pinned", False))
+    if folder_name != "Non-Completed" and not add_to_recurring:
+        copies.append(("Non-Completed", True))
+    return copies
+
+
+def insert_reminder(db, reminder_text, folder_name, urgency_level, notify_at, add_to_recurring=False):
+    """Insert a new reminder plus the copies add_reminder keeps in Recurring, Pinned and Non-Completed.
+
+    notify_at is a (local) datetime or None. Returns the id of the original row.
+    """
+    due = _due(notify_at)
+    with db.transaction() as cursor:
+        # Always insert into the original folder
+        cursor.execute("""
+            INSERT INTO reminders (text, folder_name, reminder_order, urgency_level, due_at, utc_offset)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (reminder_text, folder_name, _next_order(cursor, folder_name), urgency_level) + due)
+        reminder_id = cursor.lastrowid
+
+        for copy_folder, keeps_notify_at in copy_folders(folder_name, urgency_level, add_to_recurring):
+            cursor.execute("""
+                INSERT INTO reminders (text, folder_name, reminder_order, urgency_level, due_at, utc_offset, source_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (reminder_text, copy_folder, _next_order(cursor, copy_folder), urgency_level)
+                  + (due if keeps_notify_at else (None, None)) + (reminder_id,))
+
+    return reminder_id
+
+
+def insert_reminders(db, reminders):
+    """insert_reminder for many reminders at once, in one transaction with one executemany per table.
+
+    reminders is a list of (text, folder_name, urgency_level, notify_at, add_to_recurring, extra_dates, schedules),
+    notify_at and extra_dates being local datetimes and schedules Recurrence rules.
+    Missing folders are created.
+    """
+    with db.transaction() as cursor:
+        # Ids are handed out here so the copies can point at their original without a round trip per row
+        cursor.execute("""
+            SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'reminders'), 0),
+                       COALESCE((SELECT MAX(id) FROM reminders), 0))
+        """)
+        next_id = cursor.fetchone()[0] + 1
+
+        cursor.executemany("""
+            INSERT OR IGNORE INTO folders (name, folder_order)
+            VALUES (?, (SELECT MAX(folder_order) FROM folders) + ?)
+        """, [(name, ORDER_GAP) for name in {r[1] for r in reminders}])
+
+        order_keys = {}
+
+        def take_order(folder_name):
+            if folder_name not in order_keys:
+                order_keys[folder_name] = _next_order(cursor, folder_name)
+            key = order_keys[folder_name]
+            order_keys[folder_name] += ORDER_GAP
+            return key
+
+        rows, dates, schedules = [], [], []
+        for text, folder_name, urgency_level, notify_at, add_to_recurring, extra_dates, rules in reminders:
+            reminder_id = next_id
+            due = _due(notify_at)
+            rows.append((reminder_id, text, folder_name, take_order(folder_name), urgency_level) + due + (None,))
+            next_id += 1
+
+            for copy_folder, keeps_notify_at in copy_folders(folder_name, urgency_level, add_to_recurring):
+                rows.append((next_id, text, copy_folder, take_order(copy_folder), urgency_level)
+                            + (due if keeps_notify_at else (None, None)) + (reminder_id,))
+                next_id += 1
+
+            dates.extend((reminder_id, text, folder_name) + _due(date) for date in extra_dates)
+            schedules.extend((reminder_id, folder_name) + rule.to_row() for rule in rules)
+
+        cursor.executemany("""
+            INSERT INTO reminders (id, text, folder_name, reminder_order, urgency_level, due_at, utc_offset, source_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        cursor.executemany("""
+            INSERT INTO reminder_notifications (reminder_id, reminder_text, folder_name, due_at, utc_offset)
+            VALUES (?, ?, ?, ?, ?)
+        """, dates)
+        cursor.executemany("""
+            INSERT INTO reminder_schedules (reminder_id, folder_name, frequency, interval, starts_at, until, exdates)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, schedules)
+
+    return len(reminders)
+
+
+# A reminder's schedules folded into one column, as a JSON array of reminder_schedules rows
+_SCHEDULES_JSON = "json_group_array(json_array(s.frequency, s.interval, s.starts_at, s.until, s.exdates))"
+
+FOLDER_REMINDERS_SQL = f"""
+    SELECT r.id, r.text, r.urgency_level, r.due_at, n.first_at,
+           (SELECT due_at FROM reminder_notifications
+            WHERE reminder_id = r.id
+            ORDER BY due_at LIMIT 1 OFFSET 1) AS second_at,
+           COALESCE(n.total, 0),
+           (SELECT {_SCHEDULES_JSON} FROM reminder_schedules AS s
+            WHERE s.folder_name = :folder AND s.reminder_id = r.id) AS schedules
+    FROM reminders AS r
+    LEFT JOIN (
+        SELECT reminder_id, MIN(due_at) AS first_at, COUNT(*) AS total
+        FROM reminder_notifications
+        WHERE folder_name = :folder
+        GROUP BY reminder_id
+    ) AS n ON n.reminder_id = r.id
+    WHERE r.folder_name = :folder
+    ORDER BY r.reminder_order ASC
+"""
+
+
+def fetch_folder_reminders(db, folder_name):
+    """Return [(id, text, urgency_level, first_two_dates, date_count)] for one folder, in display order,
+    first_two_dates being local datetimes.
+
+    One statement: the earliest dates, the count and the reminder's schedules are worked out
+    in SQL, so a recurring reminder with hundreds of dates still only brings back one row.
+    date_count is None for a reminder with a schedule that never ends (see _dates_and_count).
+    """
+    with db.cursor() as cursor:
+        cursor.execute(FOLDER_REMINDERS_SQL, {"folder": folder_name})
+        rows = cursor.fetchall()
+
+    now = datetime.now()
+    return [(reminder_id, text, urgency) + _dates_and_count(due_at, first_at, second_at, total, schedules, now)
+            for reminder_id, text, urgency, due_at, first_at, second_at, total, schedules in rows]
+
+
+def _dates_and_count(due_at, first_at, second_at, total, schedules, now):
+    """(first_two_dates, date_count) from a reminder's own due_at, its two earliest extra dates,
+    how many extra dates it has and its schedules (a _SCHEDULES_JSON array).
+
+    date_count is every stored date plus every occurrence of the schedules from now on, or
+    None if one of them repeats forever.
+    """
+    dates = [from_epoch(d) for d in (due_at, first_at, second_at) if d is not None]
+    if due_at is not None:
+        total += 1
+
+    if schedules != "[]":
+        # A set: search gathers the same rule from each copy it was added to
+        for rule in {Recurrence.from_row(*row) for row in json.loads(schedules)}:
+            dates.extend(islice(rule.occurrences(now), 2))
+            count = rule.count_from(now)
+            total = None if total is None or count is None else total + count
+
+    return sorted(dates)[:2], total
+
+
+def _match_expression(query):
+    """Turn what was typed into an FTS5 query: every word must appear, the last one may be unfinished."""
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    # Quoted so words like AND / NOT / NEAR are searched for rather than parsed
+    terms = [f'"{word}"' for word in words]
+    if len(words[-1]) >= 2:
+        # A one-letter prefix matches most of the table and is no use while typing
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+# Dates and schedules belong to the row they were added on, which may be a copy, so each hit
+# gathers them from the original and all its copies
+SEARCH_SQL = f"""
+    WITH hits AS (
+        SELECT rowid AS id, rank FROM reminders_fts
+        WHERE reminders_fts MATCH :match
+        ORDER BY rank LIMIT :limit
+    ),
+    hit_rows AS (
+        SELECT id AS original_id, id AS row_id FROM hits
+        UNION ALL
+        SELECT c.source_id, c.id FROM hits JOIN reminders AS c ON c.source_id = hits.id
+    ),
+    dates AS (
+        SELECT original_id, due_at, ROW_NUMBER() OVER win AS n, COUNT(*) OVER (PARTITION BY original_id) AS total
+        FROM (SELECT DISTINCT hit_rows.original_id, n.due_at
+              FROM hit_rows JOIN reminder_notifications AS n ON n.reminder_id = hit_rows.row_id)
+        WINDOW win AS (PARTITION BY original_id ORDER BY due_at)
+    ),
+    first_dates AS (
+        SELECT original_id, MAX(CASE n WHEN 1 THEN due_at END) AS first_at,
+               MAX(CASE n WHEN 2 THEN due_at END) AS second_at, MAX(total) AS total
+        FROM dates WHERE n <= 2
+        GROUP BY original_id
+    )
+    SELECT r.id, r.text, r.urgency_level, r.due_at, d.first_at, d.second_at, COALESCE(d.total, 0),
+           (SELECT {_SCHEDULES_JSON} FROM hit_rows JOIN reminder_schedules AS s ON s.reminder_id = hit_rows.row_id
+            WHERE hit_rows.original_id = r.id),
+           r.folder_name
+    FROM hits
+    JOIN reminders AS r ON r.id = hits.id
+    LEFT JOIN first_dates AS d ON d.original_id = r.id
+    ORDER BY hits.rank
+"""
+
+
+def search_reminders(db, query, limit=50):
+    """Return [(id, text, urgency_level, first_two_dates, date_count, folder_name)], best match first.
+
+    Only original rows are in reminders_fts, so the copies insert_reminder keeps in
+    Pinned / Recurring / Non-Completed come back once, as the reminder they were copied from,
+    with the dates and schedules of every copy.
+    """
+    match = _match_expression(query)
+    if match is None:
+        return []
+
+    with db.cursor() as cursor:
+        cursor.execute(SEARCH_SQL, {"match": match, "limit": limit})
+        rows = cursor.fetchall()
+
+    now = datetime.now()
+    return [(reminder_id, text, urgency) + _dates_and_count(due_at, first_at, second_at, total, schedules, now)
+            + (folder_name,)
+            for reminder_id, text, urgency, due_at, first_at, second_at, total, schedules, folder_name in rows]
+
+
+def complete_reminder(db, reminder_id):
+    """Remove a reminder and its copies from every folder and file it once in the completed archive.
+
+    Returns (id of the original row, names of the folders it was removed from).
+    """
+    with db.transaction() as cursor:
+        cursor.execute("""
+            SELECT id, text, folder_name, urgency_level,
+                   strftime('%Y-%m-%d %H:%M', due_at, 'unixepoch', 'localtime') FROM reminders
+            WHERE id = (SELECT COALESCE(source_id, id) FROM reminders WHERE id = ?)
+        """, (reminder_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None, []
+        original_id = row[0]
+
+        cursor.execute("""
+            INSERT INTO completed_reminders (text, folder_name, urgency_level, notify_at, completed_at)
+            VALUES (?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'))
+        """, row[1:])
+
+        for table in ("reminder_notifications", "reminder_schedules"):
+            cursor.execute(f"""
+                DELETE FROM {table}
+                WHERE reminder_id IN (SELECT id FROM reminders WHERE id = ? OR source_id = ?)
+            """, (original_id, original_id))
+        cursor.execute("SELECT DISTINCT folder_name FROM reminders WHERE id = ? OR source_id = ?",
+                       (original_id, original_id))
+        folders = [name for (name,) in cursor.fetchall()]
+        cursor.execute("DELETE FROM reminders WHERE id = ? OR source_id = ?", (original_id, original_id))
+
+    return original_id, folders
+
+
+# Rows per page of the Completed view
+COMPLETED_PAGE_SIZE = 100
+
+
+def fetch_completed(db, before_id=None, limit=COMPLETED_PAGE_SIZE):
+    """Return [(id, text)] from the completed archive, newest first.
+
+    Pass the last id of the previous page as before_id to get the next one.
+    """
+    with db.cursor() as cursor:
+        # Always bounded on id, so even the first page is a primary key range read
+        cursor.execute("""
+            SELECT id, text FROM completed_reminders
+            WHERE id < ?
+            ORDER BY id DESC
+            LIMIT ?
+        """, (before_id if before_id is not None else sys.maxsize, limit))
+        return cursor.fetchall()
+
+
+def _reminder_order_key(cursor, reminder_id):
+    if reminder_id is None:
+        return None
+    cursor.execute("SELECT reminder_order FROM reminders WHERE id = ?", (reminder_id,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def move_reminder(db, reminder_id, before_id=None, after_id=None):
+    """Move a reminder between two neighbours (ids, None at either end of the folder).
+
+    Normally a single-row UPDATE. Returns True when the folder is getting crowded
+    around the new position and should be respaced with rebalance_reminders.
+    """
+    with db.transaction() as cursor:
+        before = _reminder_order_key(cursor, before_id)
+        after = _reminder_order_key(cursor, after_id)
+        key = _key_between(before, after)
+
+        if key is None:
+            # Neighbours are adjacent integers, respace the folder now and try again
+            cursor.execute("SELECT folder_name FROM reminders WHERE id = ?", (reminder_id,))
+            _rebalance_reminders(cursor, cursor.fetchone()[0])
+            before = _reminder_order_key(cursor, before_id)
+            after = _reminder_order_key(cursor, after_id)
+            key = _key_between(before, after)
+
+        cursor.execute("UPDATE reminders SET reminder_order = ? WHERE id = ?", (key, reminder_id))
+
+    return _is_tight(before, key, after)
+
+
+def _rebalance_reminders(cursor, folder_name):
+    cursor.execute("SELECT id FROM reminders WHERE folder_name = ? ORDER BY reminder_order, id", (folder_name,))
+    cursor.executemany("UPDATE reminders SET reminder_order = ? WHERE id = ?",
+                       [(i * ORDER_GAP, rid) for i, (rid,) in enumerate(cursor.fetchall())])
+
+
+def rebalance_reminders(db, folder_name):
+    """Respace a folder's reminder_order keys ORDER_GAP apart, keeping their order."""
+    with db.transaction() as cursor:
+        _rebalance_reminders(cursor, folder_name)
+
+
+def fetch_folders(db):
+    """Return [(name, folder_order, image_path)] for every folder, unsorted."""
+    with db.cursor() as cursor:
+        cursor.execute("SELECT name, folder_order, image_path FROM folders")
+        return cursor.fetchall()
+
+
+def fetch_folder_counts(db, now=None):
+    """Return {folder name: (open, overdue, dates)} from the trigger-maintained counters.
+
+    dates is how many extra notification dates the folder's reminders carry. Reminders that
+    fell due since the last advance_overdue_watermark are added on top, a range read over
+    just those rows.
+    """
+    now = to_epoch(now or datetime.now())
+    with db.cursor() as cursor:
+        cursor.execute("SELECT folder_name, open_count, overdue_count, date_count FROM folder_counters")
+        counts = {name: list(row) for name, *row in cursor.fetchall()}
+        cursor.execute("SELECT watermark FROM counter_state WHERE id = 1")
+        watermark = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT folder_name, COUNT(*) FROM reminders
+            WHERE due_at > ? AND due_at <= ?
+            GROUP BY folder_name
+        """, (watermark, now))
+        for name, newly_due in cursor.fetchall():
+            if name in counts:
+                counts[name][1] += newly_due
+    return {name: tuple(pair) for name, pair in counts.items()}
+
+
+def advance_overdue_watermark(db, now=None):
+    """Fold reminders that have fallen due since the last call into the stored overdue counts."""
+    now = to_epoch(now or datetime.now())
+    with db.transaction() as cursor:
+        cursor.execute("SELECT watermark FROM counter_state WHERE id = 1")
+        watermark = cursor.fetchone()[0]
+        if now <= watermark:
+            return  # Clock went backwards, or nothing has changed
+        cursor.execute("""
+            INSERT INTO folder_counters (folder_name, overdue_count)
+            SELECT folder_name, COUNT(*) FROM reminders
+            WHERE due_at > ? AND due_at <= ?
+            GROUP BY folder_name
+            ON CONFLICT (folder_name) DO UPDATE SET overdue_count = overdue_count + excluded.overdue_count
+        """, (watermark, now))
+        cursor.execute("UPDATE counter_state SET watermark = ? WHERE id = 1", (now,))
+
+
+def create_folder(db, folder_name):
+    """Add a custom folder at the bottom of the sidebar."""
+    with db.transaction() as cursor:
+        cursor.execute("""
+            INSERT INTO folders (name, folder_order)
+            VALUES (?, (SELECT MAX(folder_order) FROM folders) + ?)
+        """, (folder_name, ORDER_GAP))
+
+
+def restore_folders(db, folders):
+    """Bring back folders [(name, image_path)] from a backup, in the order given.
+
+    Missing folders are added at the bottom of the sidebar; existing ones only take the
+    backup's icon if they have none. Returns how many were added.
+    """
+    with db.transaction() as cursor:
+        cursor.execute("SELECT name FROM folders")
+        existing = {name for (name,) in cursor.fetchall()}
+        for name, image_path in folders:
+            cursor.execute("""
+                INSERT INTO folders (name, image_path, folder_order)
+                VALUES (?, ?, (SELECT MAX(folder_order) FROM folders) + ?)
+                ON CONFLICT (name) DO UPDATE SET image_path = excluded.image_path
+                WHERE COALESCE(folders.image_path, '') = ''
+            """, (name, image_path or '', ORDER_GAP))
+    return len({name for name, _ in folders} - existing)
+
+
+def insert_completed(db, rows):
+    """Add [(text, folder_name, urgency_level, notify_at, completed_at)] to the completed archive
+    as they are, for restoring a backup. Returns how many were added."""
+    with db.transaction() as cursor:
+        cursor.executemany("""
+            INSERT INTO completed_reminders (text, folder_name, urgency_level, notify_at, completed_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+    return len(rows)
+
+
+def _folder_order_key(cursor, folder_name):
+    if folder_name is None:
+        return None
+    cursor.execute("SELECT folder_order FROM folders WHERE name = ?", (folder_name,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def move_folder(db, folder_name, before_name=None, after_name=None):
+    """Move a custom folder between two other custom folders (None at either end of the list).
+
+    Same contract as move_reminder; respace with rebalance_folders when it returns True.
+    """
+    if folder_name in BUILT_IN_FOLDER_ORDER:
+        return False
+
+    with db.transaction() as cursor:
+        # Nothing above the first custom folder except the built-in ones
+        floor = max(BUILT_IN_FOLDER_ORDER.values())
+        before = _folder_order_key(cursor, before_name)
+        before = floor if before is None else before
+        after = _folder_order_key(cursor, after_name)
+        key = _key_between(before, after)
+
+        if key is None:
+            _rebalance_folders(cursor)
+            before = _folder_order_key(cursor, before_name)
+            before = floor if before is None else before
+            after = _folder_order_key(cursor, after_name)
+            key = _key_between(before, after)
+
+        cursor.execute("UPDATE folders SET folder_order = ? WHERE name = ?", (key, folder_name))
+
+    return _is_tight(before, key, after)
+
+
+def _rebalance_folders(cursor):
+    placeholders = ", ".join("?" * len(BUILT_IN_FOLDER_ORDER))
+    cursor.execute(f"""
+        SELECT id FROM folders
+        WHERE name NOT IN ({placeholders})
+        ORDER BY folder_order, name
+    """, tuple(BUILT_IN_FOLDER_ORDER))
+    cursor.executemany("UPDATE folders SET folder_order = ? WHERE id = ?",
+                       [(i * ORDER_GAP, fid) for i, (fid,) in enumerate(cursor.fetchall(), start=1)])
+
+
+def rebalance_folders(db):
+    """Respace custom folders' folder_order keys ORDER_GAP apart, keeping their order."""
+    with db.transaction() as cursor:
+        _rebalance_folders(cursor)
+
+
+def get_notify_at(db, reminder_id):
+    """The reminder's own notify_at as a local datetime, None if it has none."""
+    with db.cursor() as cursor:
+        cursor.execute("SELECT due_at FROM reminders WHERE id = ?", (reminder_id,))
+        row = cursor.fetchone()
+    return from_epoch(row[0]) if row else None
+
+
+def add_notification_dates(db, reminder_id, dates):
+    """Attach extra notify_at datetimes to a reminder.
+
+    Returns (id of the original row, the reminder's folder), (None, None) if it's gone.
+    """
+    with db.transaction() as cursor:
+        cursor.execute("SELECT text, folder_name, COALESCE(source_id, id) FROM reminders WHERE id = ?",
+                       (reminder_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None, None
+        text, folder_name, original_id = row
+
+        cursor.executemany("""
+            INSERT INTO reminder_notifications (reminder_id, reminder_text, folder_name, due_at, utc_offset)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(reminder_id, text, folder_name) + _due(dt) for dt in dates])
+
+    return original_id, folder_name
+
+
+def add_schedule(db, reminder_id, rule):
+    """Attach a repeating schedule (a recurrence.Recurrence) to a reminder.
+
+    Returns (id of the original row, the reminder's folder), (None, None) if it's gone.
+    """
+    with db.transaction() as cursor:
+        cursor.execute("SELECT folder_name, COALESCE(source_id, id) FROM reminders WHERE id = ?", (reminder_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None, None
+        folder_name, original_id = row
+
+        cursor.execute("""
+            INSERT INTO reminder_schedules (reminder_id, folder_name, frequency, interval, starts_at, until, exdates)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (reminder_id, folder_name) + rule.to_row())
+
+    return original_id, folder_name
+
+
+def fetch_pending_notifications(db, after=None, before=None):
+    """Return [(original reminder id, text, due datetime, folder, rule)] for every notification due
+    after `after` (now by default) and, if given, no later than `before`.
+
+    A reminder's own notify_at counts once for the reminder and its copies; extra dates and
+    schedules are reported against the original, in the folder they were added from. rule is
+    the Recurrence for a schedule's next occurrence, None for a one-off date. Dates already in
+    notification_deliveries are left out.
+    """
+    after = after or datetime.now()
+    bounds = (to_epoch(after), to_epoch(before) if before else sys.maxsize)
+    pending = []
+    with db.cursor() as cursor:
+        # Left to itself the planner walks every original through idx_reminders_source
+        cursor.execute("""
+            SELECT id, text, due_at, folder_name FROM reminders AS r INDEXED BY idx_reminders_due_at
+            WHERE due_at > ? AND due_at <= ? AND source_id IS NULL
+              AND NOT EXISTS (SELECT 1 FROM notification_deliveries AS d
+                              WHERE d.reminder_id = r.id AND d.due_at = r.due_at)
+        """, bounds)
+        for reminder_id, text, due_at, folder_name in cursor:
+            pending.append((reminder_id, text, from_epoch(due_at), folder_name, None))
+
+        cursor.execute("""
+            SELECT COALESCE(r.source_id, r.id), n.reminder_text, n.due_at, n.folder_name
+            FROM reminder_notifications AS n
+            JOIN reminders AS r ON r.id = n.reminder_id
+            WHERE n.due_at > ? AND n.due_at <= ?
+              AND NOT EXISTS (SELECT 1 FROM notification_deliveries AS d
+                              WHERE d.reminder_id = COALESCE(r.source_id, r.id) AND d.due_at = n.due_at)
+        """, bounds)
+        for reminder_id, text, due_at, folder_name in cursor:
+            pending.append((reminder_id, text, from_epoch(due_at), folder_name, None))
+
+        # Only schedules that can have an occurrence in the window; with no end to it that's every
+        # schedule still running, a whole read of reminder_schedules
+        cursor.execute(f"""
+            SELECT COALESCE(r.source_id, r.id), r.text, s.folder_name,
+                   s.frequency, s.interval, s.starts_at, s.until, s.exdates
+            FROM reminder_schedules AS s
+            JOIN reminders AS r ON r.id = s.reminder_id
+            WHERE (s.until IS NULL OR s.until > :after) {"AND s.starts_at <= :before" if before else ""}
+        """, {"after": after.isoformat(timespec="seconds"),
+              "before": before.isoformat(timespec="seconds") if before else None})
+        for reminder_id, text, folder_name, *rule in cursor:
+            rule = Recurrence.from_row(*rule)
+            due = rule.next_after(after)
+            if due is not None and (before is None or due <= before):
+                pending.append((reminder_id, text, due, folder_name, rule))
+
+    return pending
+
+
+def fetch_missed_notifications(db, since=None, now=None):
+    """fetch_pending_notifications for everything due after since (the stored delivered_through
+    by default) and by now: what fell due while nothing was running to announce it."""
+    if since is None:
+        since = get_delivered_through(db)
+    return fetch_pending_notifications(db, since, now or datetime.now())
+
+
+def get_delivered_through(db):
+    """The local datetime notifications have been announced up to."""
+    with db.cursor() as cursor:
+        cursor.execute("SELECT delivered_through FROM notification_state WHERE id = 1")
+        return from_epoch(cursor.fetchone()[0])
+
+
+def set_delivered_through(db, moment):
+    """Record that notifications have been announced up to moment; it never moves backwards."""
+    with db.transaction() as cursor:
+        cursor.execute("UPDATE notification_state SET delivered_through = MAX(delivered_through, ?) WHERE id = 1",
+                       (to_epoch(moment),))
+
+
+def claim_notifications(db, items, fired_by):
+    """Record [(reminder_id, text, due, folder_name)] in notification_deliveries before they're sent,
+    returning the ones nobody had claimed yet. Only those should go out.
+
+    The claim is one insert per item that does nothing if the row is already there, so of two
+    instances (the app and the daemon, or the app before and after a restart) exactly one gets
+    each notification. It commits before anything is sent and no lock is held while sending:
+    a notification that then fails to send is not retried.
+    """
+    fired_at = to_epoch(datetime.now())
+    claimed = []
+    with db.transaction() as cursor:
+        for item in items:
+            reminder_id, text, due, _ = item
+            cursor.execute("""
+                INSERT INTO notification_deliveries (reminder_id, due_at, fired_at, fired_by, reminder_text)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT DO NOTHING
+            """, (reminder_id, to_epoch(due), fired_at, fired_by, text))
+            if cursor.rowcount:
+                claimed.append(item)
+    return claimed
+
+
+def fetch_delivery_history(db, limit=50):
+    """Return [(reminder_id, text, due, fired_at, fired_by)] for the last notifications sent, newest first."""
+    with db.cursor() as cursor:
+        # Bounded on fired_at like fetch_completed on id, so it's a range read off idx_deliveries_fired_at
+        cursor.execute("""
+            SELECT reminder_id, reminder_text, due_at, fired_at, fired_by FROM notification_deliveries
+            WHERE fired_at < ?
+            ORDER BY fired_at DESC LIMIT ?
+        """, (sys.maxsize, limit))
+        return [(reminder_id, text, from_epoch(due_at), from_epoch(fired_at), fired_by)
+                for reminder_id, text, due_at, fired_at, fired_by in cursor.fetchall()]
+
+
+def _rule_occurrences(reminder_id, text, folder_name, rule, start, end):
+    for due in rule.occurrences(start, end):
+        yield reminder_id, text, due, folder_name
+
+
+def _distinct_occurrences(occurrences):
+    """Drop repeats of a (reminder, due) pair from a time-ordered stream: a date or schedule on both
+    a reminder and one of its copies. Repeats share a due time, so only that time's ids are kept."""
+    current, seen = None, set()
+    for occurrence in occurrences:
+        reminder_id, _, due, _ = occurrence
+        if due != current:
+            current, seen = due, set()
+        if reminder_id not in seen:
+            seen.add(reminder_id)
+            yield occurrence
+
+
+def fetch_occurrences(db, start, end, folder_name=None, limit=None):
+    """Return [(original reminder id, text, due datetime, folder)] for every date falling in
+    [start, end), in time order, for one folder or (without folder_name) all of them.
+
+    Covers a reminder's own notify_at, its extra dates and every occurrence of its schedules,
+    each date once even if its copies carry it too. The dates come off their due_at indexes already sorted and each schedule counts from
+    the start of the range, so the merge only works out as many as it hands back: with limit
+    (the next few for an agenda, say) it stops there.
+    """
+    folder_filter = "folder_name = :folder" if folder_name is not None else "source_id IS NULL"
+    params = {"folder": folder_name, "start_at": to_epoch(start), "end_at": to_epoch(end),
+              "start": start.isoformat(timespec="seconds"), "end": end.isoformat(timespec="seconds")}
+
+    with db.cursor() as reminders, db.cursor() as dates, db.cursor() as schedules:
+        reminders.execute(f"""
+            SELECT COALESCE(source_id, id), text, due_at, folder_name
+            FROM reminders INDEXED BY idx_reminders_due_at
+            WHERE due_at >= :start_at AND due_at < :end_at AND {folder_filter}
+            ORDER BY due_at
+        """, params)
+        dates.execute(f"""
+            SELECT COALESCE(r.source_id, r.id), n.reminder_text, n.due_at, n.folder_name
+            FROM reminder_notifications AS n
+            JOIN reminders AS r ON r.id = n.reminder_id
+            WHERE n.due_at >= :start_at AND n.due_at < :end_at
+            {"AND n.folder_name = :folder" if folder_name is not None else ""}
+            ORDER BY n.due_at
+        """, params)
+        schedules.execute(f"""
+            SELECT COALESCE(r.source_id, r.id), r.text, s.folder_name,
+                   s.frequency, s.interval, s.starts_at, s.until, s.exdates
+            FROM reminder_schedules AS s
+            JOIN reminders AS r ON r.id = s.reminder_id
+            WHERE s.starts_at < :end AND (s.until IS NULL OR s.until >= :start)
+            {"AND s.folder_name = :folder" if folder_name is not None else ""}
+        """, params)
+
+        sources = [((reminder_id, text, from_epoch(due_at), folder) for reminder_id, text, due_at, folder in rows)
+                   for rows in (reminders, dates)]
+        sources += [_rule_occurrences(reminder_id, text, folder, Recurrence.from_row(*rule), start, end)
+                    for reminder_id, text, folder, *rule in schedules.fetchall()]
+        return list(islice(_distinct_occurrences(heapq.merge(*sources, key=itemgetter(2))), limit))
+
+
+def remove_folder(db, folder_name):
+    with db.transaction() as cursor:
+        cursor.execute("DELETE FROM folders WHERE name = ?", (folder_name,))
+
+
+def set_folder_icon(db, folder_name, image_path):
+    with db.transaction() as cursor:
+        cursor.execute("UPDATE folders SET image_path = ? WHERE name = ?", (image_path, folder_name))
+
+
+def clear_completed(db):
+    with db.transaction() as cursor:
+        # No WHERE and no triggers, so SQLite drops the table's pages instead of deleting row by row
+        cursor.execute("DELETE FROM completed_reminders")
+
+
+def save_theme(db, name, colors, selected=False):
+    """Store a theme; colors maps background/primary/secondary/text to hex strings.
+
+    selected=True also makes it the active theme.
+    """
+    with db.transaction() as cursor:
+        if selected:
+            # Unselect all other themes first
+            cursor.execute("UPDATE themes SET selected_theme = 0")
+
+        cursor.execute("""
+            INSERT INTO themes (name, background, "primary", "secondary", "text", selected_theme)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (name, colors["background"], colors["primary"], colors["secondary"], colors["text"],
+              1 if selected else 0))
+
+
+def select_theme(db, name):
+    with db.transaction() as cursor:
+        cursor.execute("UPDATE themes SET selected_theme = 0")
+        cursor.execute("UPDATE themes SET selected_theme = 1 WHERE name = ?", (name,))
+
+
+def remove_theme(db, name):
+    with db.transaction() as cursor:
+        cursor.execute("DELETE FROM themes WHERE name = ?", (name,))
+
+
+def delete_incomplete_themes(db):
+    with db.transaction() as cursor:
+        cursor.execute("""
+            DELETE FROM themes
+            WHERE name IS NULL OR background IS NULL OR
+                  "primary" IS NULL OR "secondary" IS NULL OR "text" IS NULL
+        """)
@@ -0,0 +1,69 @@
+"""Background reads for the Reminders app.
+
+Folder loads used to query SQLite on the Kivy main thread before a single widget
+was built. DatabaseReader runs the query on a small thread pool instead and hands
+the rows back through dispatch (Clock.schedule_once in the app).
+
+Reads are keyed ("reminders", ...): a newer read with the same key supersedes the
+older one, which is cancelled if it hasn't started and dropped if it has, so
+clicking through several folders only ever builds the last one.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _report_error(error):
+    print(f"[ERROR] Background read failed: {error}")
+
+
+class DatabaseReader:
+    def __init__(self, db, dispatch=None, workers=2):
+        """db is a database.ConnectionManager; each worker borrows one of its pooled connections."""
+        self.db = db
+        self.dispatch = dispatch or (lambda fn: fn())
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-reader")
+        self._lock = threading.Lock()
+        self._latest = {}  # key -> (generation, future)
+
+    def submit(self, key, func, *args, on_done=None, on_error=None):
+        """Run func(db, *args) on a worker and dispatch on_done(result) unless a newer
+        read with the same key has been submitted in the meantime."""
+        with self._lock:
+            generation, previous = self._latest.get(key, (0, None))
+            future = self._executor.submit(self._read, func, args)
+            self._latest[key] = (generation + 1, future)
+        # Outside the lock: cancelling runs its callback, and with an inline dispatch that's _deliver
+        if previous is not None:
+            previous.cancel()
+
+        future.add_done_callback(
+            lambda f: self.dispatch(lambda: self._deliver(key, generation + 1, f, on_done, on_error)))
+        return future
+
+    def cancel(self, key):
+        """Forget the outstanding read for key, if any."""
+        with self._lock:
+            generation, previous = self._latest.get(key, (0, None))
+            self._latest[key] = (generation + 1, None)
+        if previous is not None:
+            previous.cancel()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _read(self, func, args):
+        with self.db.pooled() as conn:
+            return func(self.db.bind(conn), *args)
+
+    def _deliver(self, key, generation, future, on_done, on_error):
+        with self._lock:
+            if self._latest.get(key, (0, None))[0] != generation:
+                return  # Superseded, someone has already asked for something else
+        if future.cancelled():
+            return
+
+        error = future.exception()
+        if error is not None:
+            (on_error or _report_error)(error)
+        elif on_done is not None:
+            on_done(future.result())
@@ -0,0 +1,138 @@
+"""Write-behind queue for the Reminders app.
+
+UI handlers used to run their INSERT/UPDATE/DELETE on the Kivy main thread, so a
+slow fsync stalled whatever animation was playing. Now they submit() a command
+and carry on; a single writer thread drains the queue every few milliseconds and
+commits whatever has piled up in one transaction.
+
+A command is any database.py write helper, func(db, *args). Each one runs inside
+its own SAVEPOINT, so a command that raises is undone on its own without taking
+the rest of the batch with it. Callbacks only fire after the batch has committed,
+through dispatch (Clock.schedule_once in the app) so they land back on the UI thread.
+"""
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class _Command:
+    __slots__ = ("func", "args", "on_done", "on_error", "inline")
+
+    def __init__(self, func, args, on_done, on_error, inline):
+        self.func = func
+        self.args = args
+        self.on_done = on_done
+        self.on_error = on_error
+        self.inline = inline
+
+
+def _report_error(error):
+    print(f"[ERROR] Background write failed: {error}")
+
+
+class DatabaseWriter:
+    def __init__(self, db, dispatch=None, batch_window=0.005, max_batch=200):
+        """db is a database.ConnectionManager. dispatch(fn) must call fn on the UI thread;
+        without one, callbacks run on the writer thread (handy for scripts).
+        """
+        self.db = db
+        self.dispatch = dispatch or (lambda fn: fn())
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+
+        self._queue = queue.Queue()
+        self._idle = threading.Condition()
+        self._pending = 0
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args, on_done=None, on_error=None, inline=False):
+        """Queue func(db, *args) for the writer thread.
+
+        on_done(result) or on_error(exception) is dispatched once the batch it
+        ended up in has committed (or failed to). With inline they're called on the
+        writer thread instead, for callbacks that don't touch the UI and have to run
+        even if the UI thread has stopped (close() still runs them).
+        """
+        with self._idle:
+            self._pending += 1
+        self._queue.put(_Command(func, args, on_done, on_error, inline))
+
+    def flush(self, timeout=None):
+        """Block until every submitted command has been written. Returns False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self):
+        """Write whatever is still queued, then stop the thread."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        with self.db.pooled() as conn:
+            bound = self.db.bind(conn)
+            while True:
+                batch, stop = self._next_batch()
+                if batch:
+                    self._write(conn, bound, batch)
+                if stop:
+                    return
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+
+        # Give the rest of a burst (a drag, a multi-select) a moment to arrive
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                command = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if command is _STOP:
+                return batch, True
+            batch.append(command)
+
+        return batch, False
+
+    def _write(self, conn, bound, batch):
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for command in batch:
+                conn.execute("SAVEPOINT command")
+                try:
+                    results.append((command, command.func(bound, *command.args), None))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO command")
+                    results.append((command, None, e))
+                conn.execute("RELEASE command")
+            conn.commit()
+        except Exception as e:
+            # BEGIN or COMMIT itself failed, so nothing in the batch was written
+            if conn.in_transaction:
+                conn.rollback()
+            results = [(command, None, e) for command in batch]
+
+        for command, result, error in results:
+            dispatch = self._call if command.inline else self.dispatch
+            if error is not None:
+                dispatch(lambda c=command, e=error: (c.on_error or _report_error)(e))
+            elif command.on_done is not None:
+                dispatch(lambda c=command, r=result: c.on_done(r))
+
+        with self._idle:
+            self._pending -= len(batch)
+            self._idle.notify_all()
+
+    @staticmethod
+    def _call(fn):
+        try:
+            fn()
+        except Exception as e:
+            print(f"[ERROR] Write callback failed: {e}")
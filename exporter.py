@@ -0,0 +1,216 @@
+"""Streaming export of folders, reminders and their notification dates.
+
+Everything is read inside one read transaction on a pooled connection, so the
+export is a consistent snapshot even while the app keeps writing (WAL lets
+readers and the writer run side by side). Rows are written as the cursors
+produce them, never collected with fetchall(), so a backup of a big database
+costs the same memory as a small one.
+
+    python exporter.py backup.jsonl
+    python exporter.py reminders.ics
+
+Formats:
+    .jsonl  full backup: folders (with their icons, in sidebar order), reminders (with their
+            schedules) and the completed archive, one object per line; importer.py restores all of it
+    .csv    active reminders, in the layout importer.py reads back
+    .ics    active reminders as VEVENTs (VTODOs when there's no date), extra dates as RDATEs
+
+Repeating schedules only go into .jsonl; the other formats have the one-off dates.
+
+A reminder and its Pinned / Recurring / Non-Completed copies are exported once,
+as the original, with the dates attached to any of them.
+"""
+import argparse
+import csv
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from database import DB_PATH, ConnectionManager, setup_database
+
+# A due_at as the "YYYY-MM-DD HH:MM" wall-clock time it was set as, in the zone it was set in
+_WALL_TIME = "strftime('%Y-%m-%d %H:%M', {row}.due_at + {row}.utc_offset, 'unixepoch')"
+
+# One folder at a time, so the rows come straight off idx_reminders_folder_order
+# in display order instead of going through a sort
+_FOLDER_REMINDERS = f"""
+    SELECT r.id, r.text, r.urgency_level, {_WALL_TIME.format(row="r")},
+           EXISTS (SELECT 1 FROM reminders AS c
+                   WHERE c.source_id = r.id AND c.folder_name = 'Recurring') AS recurring,
+           (SELECT group_concat(notify_at, ';') FROM (
+                SELECT {_WALL_TIME.format(row="n")} AS notify_at FROM reminders AS c
+                JOIN reminder_notifications AS n ON n.reminder_id = c.id
+                WHERE c.id = r.id OR c.source_id = r.id
+                ORDER BY n.due_at)) AS dates,
+           (SELECT json_group_array(json_object(
+                       'frequency', s.frequency, 'interval', s.interval, 'starts_at', s.starts_at,
+                       'until', s.until, 'exdates', s.exdates))
+            FROM reminders AS c
+            JOIN reminder_schedules AS s ON s.reminder_id = c.id
+            WHERE c.id = r.id OR c.source_id = r.id) AS schedules
+    FROM reminders AS r
+    WHERE r.folder_name = ? AND r.source_id IS NULL
+    ORDER BY r.reminder_order, r.id
+"""
+
+
+@contextmanager
+def snapshot(db):
+    """A cursor on a pooled connection, inside one read transaction."""
+    with db.pooled() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+            conn.rollback()  # Nothing was written, this just ends the snapshot
+
+
+def _reminder_rows(cursor):
+    # Reminders can outlive their folder row (delete_folder leaves them), so go by reminders itself
+    folders = cursor.connection.cursor()
+    try:
+        for (folder_name,) in folders.execute("SELECT DISTINCT folder_name FROM reminders ORDER BY folder_name"):
+            for reminder_id, text, urgency, notify_at, recurring, dates, schedules in cursor.execute(
+                    _FOLDER_REMINDERS, (folder_name,)):
+                yield (reminder_id, text, folder_name, urgency, notify_at, bool(recurring),
+                       dates.split(";") if dates else [], json.loads(schedules))
+    finally:
+        folders.close()
+
+
+def export_jsonl(cursor, out):
+    counts = {"folders": 0, "reminders": 0, "completed": 0}
+
+    for name, image_path, folder_order in cursor.execute(
+            "SELECT name, image_path, folder_order FROM folders ORDER BY folder_order, name"):
+        out.write(json.dumps({"type": "folder", "name": name, "image_path": image_path,
+                              "folder_order": folder_order}) + "\n")
+        counts["folders"] += 1
+
+    for _, text, folder_name, urgency, notify_at, recurring, dates, schedules in _reminder_rows(cursor):
+        out.write(json.dumps({"type": "reminder", "text": text, "folder": folder_name, "urgency": urgency,
+                              "notify_at": notify_at, "recurring": recurring, "dates": dates,
+                              "schedules": schedules}) + "\n")
+        counts["reminders"] += 1
+
+    for text, folder_name, urgency, notify_at, completed_at in cursor.execute(
+            "SELECT text, folder_name, urgency_level, notify_at, completed_at FROM completed_reminders ORDER BY id"):
+        out.write(json.dumps({"type": "completed", "text": text, "folder": folder_name, "urgency": urgency,
+                              "notify_at": notify_at, "completed_at": completed_at}) + "\n")
+        counts["completed"] += 1
+
+    return counts
+
+
+def export_csv(cursor, out):
+    writer = csv.writer(out)
+    writer.writerow(["text", "folder", "urgency", "notify_at", "recurring", "dates"])
+
+    count = 0
+    for _, text, folder_name, urgency, notify_at, recurring, dates, _ in _reminder_rows(cursor):
+        writer.writerow([text, folder_name, urgency, notify_at or "", "yes" if recurring else "no", ";".join(dates)])
+        count += 1
+    return {"reminders": count}
+
+
+def _ics_escape(text):
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _ics_datetime(value):
+    """A "YYYY-MM-DD HH:MM" wall-clock time as a floating (local) iCalendar DATE-TIME."""
+    return datetime.fromisoformat(value).strftime("%Y%m%dT%H%M%S")
+
+
+def _ics_line(out, line):
+    # Fold at 75 octets, continuation lines start with a space
+    encoded = line.encode("utf-8")
+    while len(encoded) > 75:
+        cut = 75
+        while cut and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1  # Don't split a UTF-8 character
+        out.write(encoded[:cut].decode("utf-8") + "\r\n")
+        encoded = b" " + encoded[cut:]
+    out.write(encoded.decode("utf-8") + "\r\n")
+
+
+def export_ics(cursor, out):
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    _ics_line(out, "BEGIN:VCALENDAR")
+    _ics_line(out, "VERSION:2.0")
+    _ics_line(out, "PRODID:-//Reminders App//Export//EN")
+
+    count = 0
+    for reminder_id, text, folder_name, urgency, notify_at, recurring, dates, _ in _reminder_rows(cursor):
+        component = "VEVENT" if notify_at else "VTODO"
+        _ics_line(out, f"BEGIN:{component}")
+        _ics_line(out, f"UID:reminder-{reminder_id}@reminders-app")
+        _ics_line(out, f"DTSTAMP:{stamp}")
+        _ics_line(out, f"SUMMARY:{_ics_escape(text)}")
+        _ics_line(out, f"CATEGORIES:{_ics_escape(folder_name)}")
+        # Urgency 3 / 2 / 1 -> RFC 5545 high / medium / low
+        _ics_line(out, f"PRIORITY:{ {3: 1, 2: 5}.get(urgency, 9) }")
+        if notify_at:
+            _ics_line(out, f"DTSTART:{_ics_datetime(notify_at)}")
+        for date in dates:
+            _ics_line(out, f"RDATE:{_ics_datetime(date)}")
+        if recurring:
+            _ics_line(out, "X-REMINDERS-RECURRING:TRUE")
+        _ics_line(out, f"END:{component}")
+        count += 1
+
+    _ics_line(out, "END:VCALENDAR")
+    return {"reminders": count}
+
+
+WRITERS = {
+    ".jsonl": export_jsonl,
+    ".csv": export_csv,
+    ".ics": export_ics,
+}
+
+
+def export_file(db, path, file_format=None):
+    """Write a snapshot of the database to path. Returns counts of what was written.
+
+    file_format is a WRITERS key (".jsonl", ".csv", ".ics"), taken from the extension if not given.
+    """
+    file_format = file_format or os.path.splitext(path)[1].lower()
+    if file_format not in WRITERS:
+        raise ValueError(f"Unsupported file type: {file_format}")
+
+    # Written under a temporary name so a failed export never leaves half a backup behind
+    partial = path + ".partial"
+    newline = "" if file_format in (".csv", ".ics") else None
+    try:
+        with snapshot(db) as cursor, open(partial, "w", encoding="utf-8", newline=newline) as out:
+            counts = WRITERS[file_format](cursor, out)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=sorted(WRITERS), help="Override the file extension")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    db = ConnectionManager(args.db)
+    setup_database(db)
+    try:
+        counts = export_file(db, args.path, args.format)
+    finally:
+        db.close()
+
+    print("Exported " + ", ".join(f"{n} {what}" for what, n in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""Bulk import of reminders from CSV, JSON Lines and iCalendar (.ics) files.
+
+Records are streamed from the file one at a time, checked with the same rules
+as the Add Reminder popup, and written in chunks through database.insert_reminders,
+so memory stays flat however big the file is. Usable from the app or on its own:
+
+    python importer.py reminders.csv --folder Work
+
+CSV and JSONL records have the fields
+    text, folder, urgency (1-3 or No Urgency / Medium / High), notify_at,
+    recurring (yes/no), dates (extra notify_at values; ';'-separated in CSV)
+where notify_at is "YYYY-MM-DD HH:MM" in 24h time or "YYYY-MM-DD hh:MM AM/PM".
+JSONL records can also carry schedules, a list of repeating schedules as exporter.py
+writes them: {"frequency", "interval", "starts_at", "until", "exdates"}.
+JSONL records can also be {"type": "folder", "name", "image_path"} and
+{"type": "completed", "text", "folder", "urgency", "notify_at", "completed_at"},
+as an exporter.py backup has them: folders are created in the order they come
+(existing ones keep their place), completed reminders go into the archive.
+From .ics files every VEVENT / VTODO becomes a reminder: SUMMARY is the text,
+DTSTART (or DUE) the notify_at, RDATEs the extra dates, the first CATEGORIES
+entry the folder, PRIORITY the urgency, and an RRULE marks it recurring.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+from calendar import monthrange, month_name
+from datetime import datetime, timezone
+
+from database import DB_PATH, ConnectionManager, setup_database, insert_reminders, restore_folders, insert_completed
+from recurrence import Recurrence
+
+# Reminders written per transaction
+CHUNK_SIZE = 5000
+
+URGENCY_NAMES = {"no urgency": 1, "medium": 2, "high": 3}
+
+_NOTIFY_AT = re.compile(
+    r"^(\d{4})-(\d{1,2})-(\d{1,2})[ T](\d{1,2}):(\d{2})(?::\d{2}(?:\.\d+)?)?\s*([AaPp][Mm])?$")
+
+
+def notify_at_from_parts(year, month, day, hour, minute, ampm=None):
+    """Build the notify_at datetime add_reminder stores, with the checks on_add applies.
+
+    hour is 1-12 when ampm ("AM" / "PM") is given, otherwise 0-23. Raises ValueError.
+    """
+    if ampm is not None:
+        ampm = ampm.upper()
+        if ampm not in ("AM", "PM") or not 1 <= hour <= 12:
+            raise ValueError(f"Invalid time: {hour}:{minute:02d} {ampm}")
+
+        # Convert 12h → 24h
+        if ampm == "PM" and hour != 12:
+            hour += 12
+        elif ampm == "AM" and hour == 12:
+            hour = 0
+
+    if not 1 <= month <= 12:
+        raise ValueError(f"Invalid month: {month}")
+    if not 0 <= hour <= 23 or not 0 <= minute <= 59:
+        raise ValueError(f"Invalid time: {hour}:{minute:02d}")
+
+    _, max_day = monthrange(year, month)
+    if not 1 <= day <= max_day:
+        raise ValueError(f"{month_name[month]} {year} has only {max_day} days.")
+
+    return datetime(year, month, day, hour, minute)
+
+
+def parse_notify_at(value):
+    """notify_at_from_parts for a "YYYY-MM-DD HH:MM" or "YYYY-MM-DD hh:MM AM/PM" string."""
+    match = _NOTIFY_AT.match(value.strip())
+    if not match:
+        raise ValueError(f"Unrecognised date: {value!r}")
+    year, month, day, hour, minute = (int(part) for part in match.groups()[:5])
+    return notify_at_from_parts(year, month, day, hour, minute, match.group(6))
+
+
+def _urgency(value):
+    if value is None or value == "":
+        return 1
+    if isinstance(value, str) and value.strip().lower() in URGENCY_NAMES:
+        return URGENCY_NAMES[value.strip().lower()]
+    urgency = int(value)
+    if urgency not in (1, 2, 3):
+        raise ValueError(f"Urgency must be 1-3, not {urgency}")
+    return urgency
+
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("yes", "true", "1", "y")
+    return bool(value)
+
+
+def to_reminder(record, default_folder=None):
+    """Check one raw record and return it as an insert_reminders tuple. Raises ValueError."""
+    text = (record.get("text") or "").strip()
+    if not text:
+        raise ValueError("Missing reminder text")
+
+    folder_name = _folder_name(record.get("folder") or default_folder)
+    if not folder_name:
+        raise ValueError("No folder given and no default folder")
+    if folder_name == "Completed":
+        raise ValueError("Cannot add to the Completed folder")
+
+    notify_at = record.get("notify_at")
+    notify_at = parse_notify_at(notify_at) if notify_at else None
+
+    dates = record.get("dates") or []
+    if isinstance(dates, str):
+        dates = [d for d in dates.split(";") if d.strip()]
+    extra_dates = [parse_notify_at(d) for d in dates]
+
+    schedules = []
+    for schedule in record.get("schedules") or []:
+        if not isinstance(schedule, dict):
+            raise ValueError("Expected a schedule object")
+        schedules.append(Recurrence.from_row(schedule.get("frequency"), int(schedule.get("interval") or 1),
+                                             schedule.get("starts_at") or "", schedule.get("until"),
+                                             schedule.get("exdates")))
+
+    return (text, folder_name, _urgency(record.get("urgency")), notify_at, _flag(record.get("recurring")),
+            extra_dates, schedules)
+
+
+def _folder_name(value):
+    return (value or "").replace('[b]', '').replace('[/b]', '').strip()
+
+
+def to_folder(record):
+    """Check a folder record from a backup and return (name, image_path). Raises ValueError."""
+    name = _folder_name(record.get("name"))
+    if not name:
+        raise ValueError("Missing folder name")
+    image_path = record.get("image_path")
+    if image_path is not None and not isinstance(image_path, str):
+        raise ValueError("Expected image_path to be text")
+    return name, image_path
+
+
+def to_completed(record):
+    """Check a completed record from a backup and return an insert_completed tuple. Raises ValueError."""
+    text = (record.get("text") or "").strip()
+    if not text:
+        raise ValueError("Missing reminder text")
+    urgency = record.get("urgency")
+    return (text, _folder_name(record.get("folder")) or None, None if urgency is None else _urgency(urgency),
+            record.get("notify_at"), record.get("completed_at"))
+
+
+def read_csv(path):
+    """Yield (line number, record) for every row of a CSV file with a header row."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def read_jsonl(path):
+    """Yield (line number, record) for every non-blank line; a line that isn't JSON yields the error."""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as e:
+                yield line_number, e
+
+
+def _unfold(f):
+    """iCalendar content lines, with folded continuation lines joined back on."""
+    pending, pending_number = None, 0
+    for line_number, line in enumerate(f, start=1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending += line[1:]
+            continue
+        if pending is not None:
+            yield pending_number, pending
+        pending, pending_number = line, line_number
+    if pending is not None:
+        yield pending_number, pending
+
+
+def _ics_text(value):
+    return (value.replace("\\n", " ").replace("\\N", " ").replace("\\,", ",")
+            .replace("\\;", ";").replace("\\\\", "\\"))
+
+
+def _ics_datetime(value, params):
+    """An iCalendar DATE or DATE-TIME as a local "YYYY-MM-DD HH:MM" string."""
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        # All-day; the calendar popup's fallback time
+        return datetime.strptime(value[:8], "%Y%m%d").strftime("%Y-%m-%d 09:00")
+
+    dt = datetime.strptime(value.rstrip("Z")[:15], "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        dt = dt.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    elif "TZID" in params:
+        try:
+            from zoneinfo import ZoneInfo
+            dt = dt.replace(tzinfo=ZoneInfo(params["TZID"])).astimezone().replace(tzinfo=None)
+        except Exception:
+            pass  # Unknown zone, keep the wall-clock time as written
+    return dt.strftime("%Y-%m-%d %H:%M")
+
+
+def read_ics(path):
+    """Yield (line number, record) for every VEVENT and VTODO in an iCalendar file."""
+    with open(path, encoding="utf-8") as f:
+        record, start_line, nested = None, 0, 0
+        for line_number, line in _unfold(f):
+            name, _, value = line.partition(":")
+            name, *param_parts = name.split(";")
+            name = name.upper()
+            params = dict(p.split("=", 1) for p in param_parts if "=" in p)
+
+            if name == "BEGIN":
+                if value in ("VEVENT", "VTODO") and record is None:
+                    record, start_line, nested = {}, line_number, 0
+                elif record is not None:
+                    nested += 1  # VALARM and friends
+                continue
+            if name == "END":
+                if record is not None and nested:
+                    nested -= 1
+                elif record is not None and value in ("VEVENT", "VTODO"):
+                    yield start_line, record
+                    record = None
+                continue
+            if record is None or nested:
+                continue
+
+            try:
+                if name == "SUMMARY":
+                    record["text"] = _ics_text(value)
+                elif name == "DTSTART" or (name == "DUE" and "notify_at" not in record):
+                    record["notify_at"] = _ics_datetime(value, params)
+                elif name == "CATEGORIES" and value:
+                    record["folder"] = _ics_text(value.split(",")[0])
+                elif name == "PRIORITY":
+                    # RFC 5545: 1-4 high, 5 medium, 6-9 low, 0 undefined
+                    priority = int(value)
+                    record["urgency"] = 3 if 1 <= priority <= 4 else 2 if priority == 5 else 1
+                elif name in ("RRULE", "X-REMINDERS-RECURRING"):
+                    record["recurring"] = True
+                elif name == "RDATE":
+                    record.setdefault("dates", []).extend(_ics_datetime(v, params) for v in value.split(","))
+            except ValueError as e:
+                record["error"] = e
+
+
+READERS = {
+    ".csv": read_csv,
+    ".jsonl": read_jsonl,
+    ".ndjson": read_jsonl,
+    ".ics": read_ics,
+}
+
+
+class ImportResult:
+    def __init__(self, max_errors=100):
+        self.imported = 0
+        self.folders = 0  # Folders created from a backup's folder records
+        self.completed = 0  # Completed reminders restored into the archive
+        self.skipped = 0
+        self.errors = []  # (line number, message), only the first max_errors are kept
+        self.max_errors = max_errors
+
+    def skip(self, line_number, error):
+        self.skipped += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line_number, str(error)))
+
+    def __str__(self):
+        text = f"Imported {self.imported} reminders"
+        if self.folders:
+            text += f", {self.folders} folders"
+        if self.completed:
+            text += f", {self.completed} completed"
+        return text + f", skipped {self.skipped}"
+
+
+def import_file(db, path, default_folder=None, file_format=None, chunk_size=CHUNK_SIZE, max_errors=100):
+    """Stream reminders from path into the database. Returns an ImportResult.
+
+    file_format is a READERS key (".csv", ".jsonl", ".ics"), taken from the extension if not given.
+    """
+    file_format = file_format or os.path.splitext(path)[1].lower()
+    if file_format not in READERS:
+        raise ValueError(f"Unsupported file type: {file_format}")
+
+    result = ImportResult(max_errors)
+    chunk, folders, completed = [], [], []
+
+    def flush():
+        # Folders first, so they're in place (and in order) before reminders would create them
+        if folders:
+            result.folders += restore_folders(db, folders)
+            folders.clear()
+        if chunk:
+            result.imported += insert_reminders(db, chunk)
+            chunk.clear()
+        if completed:
+            result.completed += insert_completed(db, completed)
+            completed.clear()
+
+    for line_number, record in READERS[file_format](path):
+        try:
+            if isinstance(record, Exception):
+                raise record
+            if not isinstance(record, dict):
+                raise ValueError("Expected an object")
+            if "error" in record:
+                raise record["error"]
+            kind = record.get("type", "reminder")
+            if kind == "reminder":
+                chunk.append(to_reminder(record, default_folder))
+            elif kind == "folder":
+                folders.append(to_folder(record))
+            elif kind == "completed":
+                completed.append(to_completed(record))
+            else:
+                raise ValueError(f"Unknown record type: {kind!r}")
+        except (ValueError, TypeError) as e:
+            result.skip(line_number, e)
+            continue
+
+        if len(chunk) + len(completed) >= chunk_size:
+            flush()
+
+    flush()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--folder", help="Folder for records that don't name one")
+    parser.add_argument("--format", choices=sorted(READERS), help="Override the file extension")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    db = ConnectionManager(args.db)
+    setup_database(db)
+    try:
+        result = import_file(db, args.path, args.folder, args.format)
+    finally:
+        db.close()
+
+    print(result)
+    for line_number, message in result.errors:
+        print(f"  line {line_number}: {message}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""How late notifications go out, for the debug panel.
+
+LatencyRecorder keeps the last few hundred deliveries in a ring buffer, each as
+when it was due, when the scheduler handed it to notify() and when the notifier
+finished sending it (or failed to):
+
+    latency = LatencyRecorder()
+    scheduler = NotificationScheduler(notify, arm, latency=latency)
+    dispatcher.send(title, message, on_sent=lambda ok: latency.completed(items, ok))
+
+    latency.percentiles()   # {"dispatch": {"p50": 0.01, ...}, "delivery": {...}, "count": 120}
+    latency.dump(path)      # the same plus every record, as JSON
+
+"dispatch" is how long after its due time a reminder reached notify(), which is
+the scheduler's timer and the UI thread; "delivery" runs on to the notifier
+returning, so it takes in the claim write, the dispatcher queue, min_interval and
+osascript / notify-send themselves. Reminders that went out in a catch-up (the
+app was closed, the machine asleep) are kept but left out of the percentiles, a
+few hours' outage says nothing about the notification path. Nothing here
+touches Kivy or SQLite.
+"""
+import json
+import threading
+from collections import deque
+from datetime import datetime
+
+# Deliveries kept; the oldest are dropped first
+RING_SIZE = 500
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, p):
+    """The nearest-rank p-th percentile of sorted values, or None if there are none."""
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * p // 100))  # ceil(len * p / 100)
+    return values[rank - 1]
+
+
+class LatencyRecorder:
+    def __init__(self, size=RING_SIZE, now=datetime.now):
+        self.now = now
+        self._records = deque(maxlen=size)  # [reminder_id, due, dispatched, completed, ok, caught_up]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._records)
+
+    def dispatched(self, items, when=None, caught_up=False):
+        """Record [(reminder_id, text, due, folder_name)] being handed to notify() at when (default now)."""
+        when = when or self.now()
+        with self._lock:
+            for reminder_id, _, due, _ in items:
+                self._records.append([reminder_id, due, when, None, None, caught_up])
+
+    def completed(self, items, ok=True, when=None):
+        """Record the notifier having finished with items at when; ok is False if it failed or timed out.
+
+        Safe from any thread. Items the recorder never saw dispatched (or has since dropped) are ignored.
+        """
+        when = when or self.now()
+        keys = {(reminder_id, due) for reminder_id, _, due, _ in items}
+        with self._lock:
+            # Newest first, they were only just dispatched
+            for record in reversed(self._records):
+                if not keys:
+                    break
+                key = (record[0], record[1])
+                if key in keys and record[3] is None:
+                    record[3], record[4] = when, ok
+                    keys.discard(key)
+
+    def percentiles(self):
+        """{"dispatch": {"p50": seconds, ...}, "delivery": {...}, "count": n} over the ring buffer.
+
+        Seconds are None until there is something to measure; delivery only counts sends that succeeded.
+        """
+        with self._lock:
+            records = [record for record in self._records if not record[5]]
+        dispatch = sorted((dispatched - due).total_seconds() for _, due, dispatched, _, _, _ in records)
+        delivery = sorted((completed - due).total_seconds()
+                          for _, due, _, completed, ok, _ in records if ok)
+        return {
+            "dispatch": {f"p{p}": percentile(dispatch, p) for p in PERCENTILES},
+            "delivery": {f"p{p}": percentile(delivery, p) for p in PERCENTILES},
+            "count": len(records),
+        }
+
+    def records(self):
+        """Every record in the ring buffer, oldest first, as dicts with ISO-format times."""
+        def iso(moment):
+            return moment.isoformat() if moment is not None else None
+
+        with self._lock:
+            records = [list(record) for record in self._records]
+        return [{"reminder_id": reminder_id, "due": iso(due), "dispatched": iso(dispatched),
+                 "completed": iso(completed), "ok": ok, "caught_up": caught_up}
+                for reminder_id, due, dispatched, completed, ok, caught_up in records]
+
+    def dump(self, path):
+        """Write the percentiles and every record to path as JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"written_at": self.now().isoformat(), "summary": self.percentiles(),
+                       "records": self.records()}, f, indent=2)
@@ -2,7 +2,6 @@
 import os
 os.environ['KIVY_WINDOW'] = 'sdl2'
 os.environ['SDL_VIDEO_CENTERED'] = '1'
-import sqlite3
 from kivy.config import Config
 Config.set('graphics', 'width', '1200')
 Config.set('graphics', 'height', '800')
@@ -37,116 +36,48 @@ from kivy.uix.spinner import Spinner
 
 # Standard libraries
 import time
-import subprocess
+import threading
 from datetime import datetime
+from collections import Counter
 from calendar import monthrange
-from typing import List, Tuple, Union
 
 Config.set('input', 'mouse', 'mouse,multitouch_on_demand')
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "reminders.db")
+from database import (DB_PATH, ConnectionManager, setup_database, BUILT_IN_FOLDER_ORDER, get_notify_at, save_theme,
+                      select_theme, remove_theme, delete_incomplete_themes, COMPLETED_PAGE_SIZE,
+                      fetch_pending_notifications, fetch_missed_notifications, set_delivered_through,
+                      claim_notifications)
+from db_writer import DatabaseWriter
+from db_reader import DatabaseReader
+from repository import ReminderRepository
+from scheduler import NotificationScheduler
+from recurrence import Recurrence, FREQUENCIES, add_months
+from importer import notify_at_from_parts, import_file, READERS
+from exporter import export_file
+from notifiers import NotificationDispatcher, batch_message
+from latency import LatencyRecorder
 # </editor-fold>
 
-def send_mac_notification(title, message):
-    """Send a native macOS notification using osascript."""
-    script = f'display notification "{message}" with title "{title}"'
-    subprocess.run(["osascript", "-e", script])
-
-# SQL Database Setup
-def setup_database():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    # 1. Create base tables
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS folders (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT UNIQUE NOT NULL,
-        image_path TEXT DEFAULT '',
-        folder_order INTEGER DEFAULT 0
-    )
-    ''')
-
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS reminders (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        text TEXT NOT NULL,
-        folder_name TEXT NOT NULL,
-        reminder_order INTEGER DEFAULT 0,
-        urgency_level INTEGER DEFAULT 3,
-        FOREIGN KEY (folder_name) REFERENCES folders(name)
-    )
-    ''')
-
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS reminder_notifications (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        reminder_text TEXT NOT NULL,
-        folder_name TEXT NOT NULL,
-        notify_at TEXT NOT NULL,
-        FOREIGN KEY (folder_name) REFERENCES folders(name)
-    )
-    ''')
-
-    # 2. Now alter the table to add notify_at
-    try:
-        cursor.execute("ALTER TABLE reminders ADD COLUMN notify_at TEXT")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-
-    # 3. Themes table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS themes (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT,
-        background TEXT,
-        "primary" TEXT,
-        "secondary" TEXT,
-        "text" TEXT
-    )
-    ''')
-
-    # Step 1: Add selected_theme column to track the currently selected theme
-    try:
-        cursor.execute("ALTER TABLE themes ADD COLUMN selected_theme INTEGER DEFAULT 0")
-    except sqlite3.OperationalError:
-        # If column already exists
-        pass
-
-    # 4. Only insert Tropical if NO themes exist (it is a default created but deletable third theme)
-    cursor.execute("SELECT COUNT(*) FROM themes")
-    theme_count = cursor.fetchone()[0]
-    if theme_count == 0:
-        cursor.execute("""
-            INSERT INTO themes (name, background, "primary", "secondary", "text")
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            "Tropical",
-            "#ffe8b0",  # sand colors
-            "#ffa07a",  # light coral (primary)
-            "#20b2aa",  # light sea green (secondary)
-            "#000000"   # black text
-        ))
-
-    # 5. Folder setup
-    cursor.execute("INSERT OR IGNORE INTO folders (name) VALUES ('Pinned'), ('Recurring'), ('Completed'), ('Non-Completed')")
-    cursor.execute("UPDATE folders SET folder_order = 0 WHERE name = 'Pinned'")
-    cursor.execute("UPDATE folders SET folder_order = 1 WHERE name = 'Recurring'")
-    cursor.execute("UPDATE folders SET folder_order = 2 WHERE name = 'Non-Completed'")
-    cursor.execute("UPDATE folders SET folder_order = 3 WHERE name = 'Completed'")
-
-    cursor.execute("""
-        SELECT name FROM folders
-        WHERE name NOT IN ('Pinned', 'Recurring', 'Non-Completed', 'Completed')
-        ORDER BY name
-    """)
-
-    other_folders = cursor.fetchall()
-    for i, (name,) in enumerate(other_folders, start=4):
-        cursor.execute("UPDATE folders SET folder_order = ? WHERE name = ?", (i, name))
+class CountBadge(Label):
+    """Open / overdue counts drawn over the right end of a sidebar folder button."""
+    def __init__(self, app_ref, **kwargs):
+        super().__init__(
+            markup=True,
+            size_hint=(None, 1),
+            width=Window.width * 0.06,
+            pos_hint={'right': 0.97},
+            halign='right',
+            valign='middle',
+            color=app_ref.theme["text"],
+            **kwargs
+        )
+        self.bind(size=lambda inst, size: setattr(inst, 'text_size', size))
 
-    conn.commit()
-    conn.close()
+    def show(self, open_count, overdue_count):
+        text = f"[b]{open_count}[/b]" if open_count else ""
+        if overdue_count:
+            text = f"[color=ff5555][b]{overdue_count}[/b][/color]  " + text
+        self.text = text
 
 class DraggableFolder(RelativeLayout):
     def __init__(self, folder_name, icon_path, app_ref, **kwargs):
@@ -180,6 +111,9 @@ class DraggableFolder(RelativeLayout):
         layout.add_widget(self.label)
         self.add_widget(layout)
 
+        self.badge = CountBadge(app_ref)
+        self.add_widget(self.badge)
+
         Window.bind(mouse_pos=self.check_drag)
 
     def check_drag(self, window, pos):
@@ -227,7 +161,9 @@ class DraggableFolder(RelativeLayout):
             for widget in all_widgets:
                 parent.add_widget(widget)
 
-            self.app_ref.reorder_folders()
+            # Only custom folders are stored in drag order (Recurring is draggable but keeps its place)
+            custom_order = [w.folder_name for w in draggable_folders if w.folder_name not in BUILT_IN_FOLDER_ORDER]
+            self.app_ref.reorder_folders(self.folder_name, custom_order)
 
         return super().on_touch_up(touch)
 
@@ -383,6 +319,9 @@ class FolderButton(RelativeLayout):
         layout.add_widget(label)
         self.add_widget(layout)
 
+        self.badge = CountBadge(app_ref)
+        self.add_widget(self.badge)
+
 class CalendarCell(Button):
     def __init__(self, day, calendar_ref, **kwargs):
         super().__init__(**kwargs)
@@ -417,9 +356,12 @@ class CalendarCell(Button):
         self.update_background()
 
 class CalendarGrid(ScrollView):
-    def __init__(self, **kwargs):
+    def __init__(self, load_busy=None, **kwargs):
         super().__init__(**kwargs)
         self.selected_dates = set()  # Store selected dates (format "YYYY-MM-DD")
+        # load_busy(start, end, on_done) looks up what's already due in a month, see mark_busy
+        self.load_busy = load_busy
+        self.day_buttons = {}  # "YYYY-MM-DD" -> button for the month on show
         self.grid = GridLayout(
             cols=7,
             size_hint=(None, None),
@@ -434,6 +376,7 @@ class CalendarGrid(ScrollView):
 
     def build_calendar(self, year=None, month=None):
         self.grid.clear_widgets()
+        self.day_buttons = {}
 
         now = datetime.now()
         year = year or now.year
@@ -475,6 +418,21 @@ class CalendarGrid(ScrollView):
 
             btn.bind(on_press=lambda instance, date=full_date: self.toggle_date(instance, date))
             self.grid.add_widget(btn)
+            self.day_buttons[full_date] = btn
+
+        if self.load_busy is not None:
+            start = datetime(year, month, 1)
+            self.load_busy(start, add_months(start, 1), self.mark_busy)
+
+    def mark_busy(self, occurrences):
+        """Show how many reminders fall due on each day, from [(reminder_id, text, due, folder_name)]."""
+        busy = Counter(due.strftime("%Y-%m-%d") for _, _, due, _ in occurrences)
+        for full_date, btn in self.day_buttons.items():
+            day = int(full_date[-2:])
+            count = busy.get(full_date)
+            btn.markup = True
+            btn.halign = 'center'
+            btn.text = f"[b]{day}[/b]\n[size=16]{count} due[/size]" if count else str(day)
 
     def toggle_date(self, btn, date_str):
         if date_str in self.selected_dates:
@@ -490,7 +448,8 @@ class CalendarGrid(ScrollView):
         self.time_label.markup = True
 
 class DraggableReminder(BoxLayout):
-    def __init__(self, reminder_text, urgency_level, folder_name, app_ref, notify_at=None, **kwargs):
+    def __init__(self, reminder_id, reminder_text, urgency_level, folder_name, app_ref, notify_at=None,
+                 date_count=0, draggable=True, **kwargs):
         super().__init__(orientation='horizontal',
                          size_hint=(None, None),
                          size=(Window.width * 0.5, Window.height * 0.065),
@@ -499,10 +458,16 @@ class DraggableReminder(BoxLayout):
                          **kwargs)
 
         self.app_ref = app_ref
+        self.reminder_id = reminder_id
         self.reminder_text = reminder_text
         self.folder_name = folder_name
         self.dragging = False
-        self.notify_at = [notify_at] if isinstance(notify_at, str) else (notify_at or [])
+        # Search results mix folders, so their order can't be dragged
+        self.draggable = draggable
+        self.notify_at = [notify_at] if isinstance(notify_at, datetime) else (notify_at or [])
+        # load_reminders only passes the first two dates, plus how many there are in total
+        # (None when a repeating schedule has no end)
+        self.date_count = date_count
 
         # Complete Button
         btn_wrapper = FloatLayout(size_hint=(None, 1), width=Window.width * 0.025)
@@ -512,7 +477,7 @@ class DraggableReminder(BoxLayout):
             size=(Window.width * 0.02, Window.width * 0.02),
             pos_hint={'center_x': 0.5, 'center_y': 0.52}
         )
-        self.complete_btn.bind(on_press=lambda instance: self.app_ref.mark_as_completed(reminder_text, folder_name))
+        self.complete_btn.bind(on_press=lambda instance: self.app_ref.mark_as_completed(reminder_id, folder_name))
         btn_wrapper.add_widget(self.complete_btn)
         self.add_widget(btn_wrapper)
 
@@ -561,38 +526,35 @@ class DraggableReminder(BoxLayout):
         info_box = BoxLayout(orientation='vertical', size_hint=(1, 1))
         info_box.add_widget(self.text_btn)
 
-        # Display up to 2 dates horizontally, then "+X more"
+        # Display up to 2 dates horizontally, then "+X more" (or "repeats" for a schedule without an end)
         notify_dates = self.notify_at[:2]
-        extra_count = max(0, len(self.notify_at) - 2)
+        extra_count = None if self.date_count is None else max(0, self.date_count - 2)
 
         date_layout = BoxLayout(orientation='horizontal', spacing=10, size_hint_y=None, height=25)
 
-        for date_str in notify_dates:
-            try:
-                dt = datetime.fromisoformat(date_str)
-                formatted_time = dt.strftime("%b %d, %Y at %I:%M %p")
-                is_overdue = dt < datetime.now()
-                text_color = (1, 0.3, 0.3, 1) if is_overdue else self.app_ref.theme["text"]
+        now = datetime.now()
+        for dt in notify_dates:
+            formatted_time = dt.strftime("%b %d, %Y at %I:%M %p")
+            is_overdue = dt < now
+            text_color = (1, 0.3, 0.3, 1) if is_overdue else self.app_ref.theme["text"]
 
-                label = Label(
-                    text=f"[size=25][b][i]{formatted_time}[/i][/b][/size]",
-                    markup=True,
-                    size_hint=(None, 1),
-                    width=300,
-                    color=text_color
-                )
-                label.bind(size=label.setter('text_size'))
+            label = Label(
+                text=f"[size=25][b][i]{formatted_time}[/i][/b][/size]",
+                markup=True,
+                size_hint=(None, 1),
+                width=300,
+                color=text_color
+            )
+            label.bind(size=label.setter('text_size'))
 
-                if is_overdue:
-                    self.text_btn.color = text_color
+            if is_overdue:
+                self.text_btn.color = text_color
 
-                date_layout.add_widget(label)
-            except Exception as e:
-                print(f"Invalid date format in notify_at: {date_str} -> {e}")
+            date_layout.add_widget(label)
 
-        if extra_count > 0:
+        if extra_count != 0:
             more_label = Label(
-                text=f"[size=25][b][i]+{extra_count} more[/i][/b][/size]",
+                text=f"[size=25][b][i]{'repeats' if extra_count is None else f'+{extra_count} more'}[/i][/b][/size]",
                 markup=True,
                 size_hint=(None, 1),
                 width=220,
@@ -655,6 +617,7 @@ class DraggableReminder(BoxLayout):
 
         # Calendar grid (center)
         self.calendar = CalendarGrid(
+            load_busy=lambda start, end, on_done: self.app_ref.repo.occurrences(start, end, on_done),
             size_hint=(None, None),
             size=(700, 500),
             pos_hint={"center_x": 0.55, "center_y": 0.41}
@@ -767,84 +730,35 @@ class DraggableReminder(BoxLayout):
             selected = list(self.calendar.selected_dates)[0]  # Take the first selected date
             year, month, day = map(int, selected.split('-'))
 
+            db = self.app_ref.db
+
             # Pull the original notify_at time
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT notify_at FROM reminders
-                WHERE text = ? AND folder_name = ?
-            """, (self.reminder_text, self.folder_name))
-            row = cursor.fetchone()
-            conn.close()
+            original_notify_at = get_notify_at(db, self.reminder_id)
 
             hour, minute = 9, 0  # fallback default
-            if row and row[0]:
-                try:
-                    dt = datetime.fromisoformat(row[0])
-                    hour, minute = dt.hour, dt.minute
-                except ValueError:
-                    pass
+            if original_notify_at:
+                hour, minute = original_notify_at.hour, original_notify_at.minute
 
             notify_dt = datetime(year, month, day, hour, minute)
 
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO reminder_notifications (reminder_text, folder_name, notify_at)
-                VALUES (?, ?, ?)
-            """, (self.reminder_text, self.folder_name, notify_dt.isoformat()))
-
-            conn.commit()
-            conn.close()
-
-
-            # Check if a recurring schedule was selected
+            # Check if a recurring schedule was selected; it's stored as one rule that never runs out
             schedule_type = self.schedule_spinner.text.lower()
-            if schedule_type in ["daily", "weekly", "monthly", "quarterly"]:
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
-                base_dt = notify_dt
-                for i in range(1, 6):  # Next 5 scheduled times
-                    if schedule_type == "daily":
-                        next_dt = base_dt + timedelta(days=i)
-                    elif schedule_type == "weekly":
-                        next_dt = base_dt + timedelta(weeks=i)
-                    elif schedule_type == "monthly":
-                        month = base_dt.month + i
-                        year = base_dt.year + (month - 1) // 12
-                        month = ((month - 1) % 12) + 1
-                        day = min(base_dt.day, monthrange(year, month)[1])
-                        next_dt = datetime(year, month, day, base_dt.hour, base_dt.minute)
-                    elif schedule_type == "quarterly":
-                        month = base_dt.month + (i * 3)
-                        year = base_dt.year + (month - 1) // 12
-                        month = ((month - 1) % 12) + 1
-                        day = min(base_dt.day, monthrange(year, month)[1])
-                        next_dt = datetime(year, month, day, base_dt.hour, base_dt.minute)
-                    else:
-                        continue
-
-                    cursor.execute("""
-                        INSERT INTO reminder_notifications (reminder_text, folder_name, notify_at)
-                        VALUES (?, ?, ?)
-                    """, (self.reminder_text, self.folder_name, next_dt.isoformat()))
-
-                conn.commit()
-                conn.close()
+            rule = Recurrence(schedule_type, notify_dt) if schedule_type in FREQUENCIES else None
 
             popup.dismiss()
 
-            # Calculate delay
-            delay = (notify_dt - datetime.now()).total_seconds()
+            def on_saved(result):
+                original_id, _ = result
+                if original_id is not None:
+                    self.app_ref.scheduler.add(original_id, self.reminder_text, notify_dt, self.folder_name, rule)
 
-            if delay > 0:
-                Clock.schedule_once(
-                    lambda dt: send_mac_notification("Reminder", self.reminder_text),
-                    delay
-                )
+                # Refresh UI (reload folder) once the dates are written
+                self.app_ref.load_reminders(self.folder_name)
 
-            # Refresh UI (reload folder)
-            self.app_ref.load_reminders(self.folder_name)
+            if rule is not None:
+                self.app_ref.repo.add_schedule(self.reminder_id, rule, on_done=on_saved)
+            else:
+                self.app_ref.repo.add_dates(self.reminder_id, [notify_dt], on_done=on_saved)
 
         save_btn.bind(on_press=save_selected_date)
         layout.add_widget(save_btn)
@@ -884,7 +798,7 @@ class DraggableReminder(BoxLayout):
                 btn.background_color = (0.91, 0.902, 0.875, 1)  # Normal white
 
     def on_touch_down(self, touch):
-        if self.collide_point(*touch.pos):
+        if self.draggable and self.collide_point(*touch.pos):
             self.dragging = True
         return super().on_touch_down(touch)
 
@@ -918,8 +832,15 @@ class DraggableReminder(BoxLayout):
             for widget in reminder_widgets:
                 parent.add_widget(widget)
 
-            # Update reminder order in DB
-            self.app_ref.update_reminder_order(self.folder_name, self.reminder_text, insertion_index)
+            # Update reminder order in DB, only this row changes
+            before = reminder_widgets[insertion_index - 1] if insertion_index > 0 else None
+            after = reminder_widgets[insertion_index + 1] if insertion_index + 1 < len(reminder_widgets) else None
+            self.app_ref.update_reminder_order(
+                self.folder_name,
+                self.reminder_id,
+                before.reminder_id if before else None,
+                after.reminder_id if after else None
+            )
 
         return super().on_touch_up(touch)
 
@@ -930,8 +851,40 @@ class RemindersApp(App):
         # Check if the database exists before creating it
         db_exists = os.path.exists(DB_PATH)
 
+        # One long-lived connection shared by every screen (see database.py),
+        # plus pooled ones for the writer thread, the two reader threads, an import and an export
+        self.db = ConnectionManager(DB_PATH, pool_size=5)
+
         # Create database if needed, works with db_exists function above
-        setup_database()
+        setup_database(self.db)
+
+        # Writes go through a background thread; callbacks come back on the Kivy clock
+        self.writer = DatabaseWriter(self.db, dispatch=lambda fn: Clock.schedule_once(lambda dt: fn(), 0))
+
+        # Folder loads query off the main thread too, see load_reminders
+        self.reader = DatabaseReader(self.db, dispatch=lambda fn: Clock.schedule_once(lambda dt: fn(), 0))
+
+        # Folder list and recently viewed folders stay in memory, see repository.py
+        self.repo = ReminderRepository(self.db, self.reader, self.writer, on_change=self.refresh_badges)
+        self._loading_placeholder = None
+        self.folder_badges = {}  # folder name -> CountBadge in the sidebar
+
+        # Notifications go out from their own thread, never from a Clock callback
+        self.notifier = NotificationDispatcher()
+        # How late each one went out, see show_latency_popup (F12)
+        self.latency = LatencyRecorder()
+
+        # Every pending notification, including ones from before a restart, behind a single Clock event.
+        # After the machine sleeps, what fell due meanwhile is read on the reader and caught up like at startup
+        self.scheduler = NotificationScheduler(
+            self.deliver_notification,
+            arm=lambda delay, callback: Clock.schedule_once(lambda dt: callback(), delay),
+            on_wake=self.catch_up_after_sleep,
+            latency=self.latency
+        )
+        self.load_schedule()
+        self.reader.submit("catch up", fetch_missed_notifications, on_done=self.catch_up)
+        self.load_more_btn = None
 
         if not db_exists:
             # Temporary neutral theme before popup choice
@@ -969,15 +922,102 @@ class RemindersApp(App):
 
         self.root_layout.bind(pos=self.update_layout, size=self.update_layout)
         Window.bind(size=self.update_layout)
+        Window.bind(on_key_down=self.on_key_down)
 
         self.setup_ui()
         self.apply_theme()
 
+        # Reminders fall due while the app sits open, keep the overdue counts moving
+        Clock.schedule_interval(lambda dt: self.refresh_badges(), 60)
+        Clock.schedule_interval(lambda dt: self.repo.advance_overdue(), 15 * 60)
+
         self.update_layout()
         Clock.schedule_once(lambda dt: self.update_layout(), 0)
 
         return self.root_layout
 
+    def on_stop(self):
+        self.scheduler.cancel()
+        # Only what the scheduler has actually handed out counts as delivered; anything due that it
+        # hasn't (a catch-up still being read, say) goes out at the next start. Until something has,
+        # it's still datetime.min, which to_epoch can't store
+        if self.scheduler.delivered_through > datetime.min:
+            self.writer.submit(set_delivered_through, self.scheduler.delivered_through)
+        self.reader.close()
+        self.writer.close()  # Finishes any queued writes first, claims included, which queue their sends
+        self.notifier.close(timeout=5)
+        self.db.close()
+
+    def load_schedule(self):
+        # Off the main thread, there may be a lot of them; anything already scheduled is kept
+        self.reader.submit("schedule", fetch_pending_notifications, on_done=self.scheduler.load)
+
+    def deliver_notification(self, items):
+        # Everything that fell due together goes out as one notification, less anything the
+        # daemon (or this app before a restart) has already claimed
+        def send(claimed):
+            if claimed:
+                self.notifier.send(*batch_message(claimed), on_sent=lambda ok: self.latency.completed(claimed, ok))
+
+        # Sent from the writer thread, not the Clock, so claims still queued at on_stop aren't lost
+        self.writer.submit(claim_notifications, items, "app", on_done=send, inline=True)
+        self.writer.submit(set_delivered_through, self.scheduler.delivered_through)
+
+    def catch_up_after_sleep(self, since):
+        # Returns nothing, so the scheduler holds back until catch_up gets the rows
+        self.reader.submit("catch up", fetch_missed_notifications, since,
+                           on_done=lambda missed: self.catch_up(missed, since))
+
+    def catch_up(self, missed, since=None):
+        # Whatever fell due while the app was closed (or asleep since since), as one summary
+        due = self.scheduler.catch_up(missed, since)
+        if due:
+            self.latency.dispatched(due, caught_up=True)
+            self.deliver_notification(due)
+
+    def on_key_down(self, window, key, scancode, codepoint, modifiers):
+        if key == 293:  # F12
+            self.show_latency_popup()
+            return True
+        return False
+
+    def show_latency_popup(self):
+        # Debug panel: how late notifications have been going out, from the last few hundred deliveries
+        message = Label(markup=True, halign='center', valign='middle')
+        message.bind(size=message.setter('text_size'))
+
+        def seconds(value):
+            return "-" if value is None else f"{value:.3f}s"
+
+        def refresh(dt=None):
+            summary = self.latency.percentiles()
+            lines = [f"[b]{summary['count']} notifications[/b]", ""]
+            for name, label in (("dispatch", "Due -> dispatched"), ("delivery", "Due -> sent")):
+                values = summary[name]
+                lines.append(f"[b]{label}[/b]   " + "   ".join(f"{p}: {seconds(v)}" for p, v in values.items()))
+            message.text = "\n".join(lines)
+
+        def save(instance):
+            path = os.path.join(os.path.expanduser("~"), f"Reminders latency {datetime.now():%Y-%m-%d %H%M%S}.json")
+            try:
+                self.latency.dump(path)
+                save_btn.text = f"Saved to {path}"
+            except Exception as e:
+                print(f"[ERROR] Could not save latency to {path}: {e}")
+                save_btn.text = f"Save failed: {e}"
+
+        save_btn = Button(text="Save JSON", size_hint_y=None, height=60)
+        save_btn.bind(on_press=save)
+        content = BoxLayout(orientation='vertical', spacing=10, padding=10)
+        content.add_widget(message)
+        content.add_widget(save_btn)
+
+        refresh()
+        updates = Clock.schedule_interval(refresh, 1)
+        popup = Popup(title="Notification Latency", content=content, size_hint=(None, None), size=(900, 400))
+        popup.bind(on_dismiss=lambda *args: updates.cancel())
+        popup.open()
+
     def update_layout(self, *args):
         self.bg_rect.pos = self.root_layout.pos
         self.bg_rect.size = self.root_layout.size
@@ -1008,116 +1048,44 @@ class RemindersApp(App):
     def update_content_border(self, instance, value):
         self.content_border.rectangle = (instance.x, instance.y, instance.width, instance.height)
 
-    def mark_as_completed(self, reminder_text, current_folder):
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        # 1. Deletes reminder from every folder, keeps in Completed
-        cursor.execute("""
-            DELETE FROM reminders
-            WHERE text = ? AND folder_name != 'Completed'
-        """, (reminder_text,))
-
-        # 2. Insert into Completed if it's not already there
-        cursor.execute("""
-            SELECT 1 FROM reminders
-            WHERE text = ? AND folder_name = 'Completed'
-        """, (reminder_text,))
-        if not cursor.fetchone():
-            cursor.execute("""
-                INSERT INTO reminders (text, folder_name)
-                VALUES (?, 'Completed')
-            """, (reminder_text,))
-
-        conn.commit()
-        conn.close()
-
-        # 3. Reload current folder
-        self.load_reminders(current_folder)
-
-        if current_folder != "Non-Completed":
-            self.load_reminders("Non-Completed")
-
-    def update_reminder_order(self, folder_name, moved_text, new_index):
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        # Fetch current list of reminders
-        cursor.execute("SELECT text FROM reminders WHERE folder_name = ? ORDER BY reminder_order ASC", (folder_name,))
-        reminders = [row[0] for row in cursor.fetchall()]
-
-        # Remove and reinsert the moved reminder at new index
-        if moved_text in reminders:
-            reminders.remove(moved_text)
-            reminders.insert(new_index, moved_text)
-
-        # Update each reminder with new order
-        for i, text in enumerate(reminders):
-            cursor.execute("""
-                UPDATE reminders
-                SET reminder_order = ?
-                WHERE text = ? AND folder_name = ?
-            """, (i, text, folder_name))
-
-        conn.commit()
-        conn.close()
-
-        self.load_reminders(folder_name)
-
-    def reorder_folders(self):
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        priority_folders = {"Pinned", "Recurring", "Non-Completed", "Completed"}
-        priority_map = {"Pinned": 0, "Recurring": 1, "Non-Completed": 2, "Completed": 3}
-
-        # Reverse the list since Kivy StackLayout children are in reverse order
-        visible_folders = [child for child in self.sidebar.children if isinstance(child, DraggableFolder)]
-        visible_folders = visible_folders[::-1]
-
-        custom_index = 4  # Start after the last system folder
-
-        for widget in visible_folders:
-            folder_name = widget.folder_name
-
-            if folder_name in priority_folders:
-                continue  # Skip protected folders
-
-            cursor.execute("""
-                UPDATE folders
-                SET folder_order = ?
-                WHERE name = ?
-            """, (custom_index, folder_name))
-            custom_index += 1
-
-        # Re-apply hardcoded order for priority folders to ensure consistency
-        for name, order in priority_map.items():
-            cursor.execute("UPDATE folders SET folder_order = ? WHERE name = ?", (order, name))
-
-        conn.commit()
-        conn.close()
-
-        self.load_folders()
-
-    def reorder_reminders(self):
-        if not self.selected_folder:
-            return
-
-        folder_clean = self.selected_folder.replace('[b]', '').replace('[/b]', '')
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        # Loop through widgets in their current visual order
-        for index, reminder_widget in enumerate(self.reminder_list.children[::-1]):  # bottom-to-top, so reverse
-            if hasattr(reminder_widget, 'reminder_text'):
-                cursor.execute("""
-                    UPDATE reminders
-                    SET reminder_order = ?
-                    WHERE text = ? AND folder_name = ?
-                """, (index, reminder_widget.reminder_text, folder_clean))
-
-        conn.commit()
-        conn.close()
+    def mark_as_completed(self, reminder_id, current_folder):
+        if current_folder == "Completed":
+            return  # Already archived; its id is an archive id, not a reminders id
+
+        # Take the row off screen straight away, the write happens in the background
+        for widget in self.reminder_list.children[:]:
+            if isinstance(widget, DraggableReminder) and widget.reminder_id == reminder_id:
+                self.reminder_list.remove_widget(widget)
+
+        def on_done(result):
+            original_id, _ = result
+            self.scheduler.remove(original_id)
+
+            # Completed from the search results, keep showing them
+            if self.search_input.text.strip():
+                self.run_search(self.search_input.text.strip())
+                return
+
+            # Reload current folder. The other folders it was in are dropped from the
+            # cache and reload when next opened
+            self.load_reminders(current_folder)
+
+        # Deletes the reminder and its copies from every folder, keeps one in Completed
+        self.repo.complete(reminder_id, on_done=on_done)
+
+    def update_reminder_order(self, folder_name, reminder_id, before_id, after_id):
+        # The widgets are already in their new places, so no reload is needed
+        self.repo.move_reminder(folder_name, reminder_id, before_id, after_id)
+
+    def reorder_folders(self, folder_name, custom_order):
+        # custom_order is the custom folders top to bottom, after the drag
+        index = custom_order.index(folder_name) if folder_name in custom_order else -1
+        if index >= 0:
+            before = custom_order[index - 1] if index > 0 else None
+            after = custom_order[index + 1] if index + 1 < len(custom_order) else None
+            self.repo.move_folder(folder_name, before, after, on_done=lambda _: self.load_folders())
+        else:
+            self.load_folders()
 
     def show_help_popup(self, instance):
         # Large scrollable blank popup content
@@ -1341,6 +1309,14 @@ class RemindersApp(App):
             pos_hint={'top': 1})
         button_layout = BoxLayout(orientation='vertical', spacing=25)
 
+        # Search box, results show in the reminder area
+        self.search_input = TextInput(hint_text="Search reminders", multiline=False)
+        self.search_input.bind(text=self.on_search_text)
+        self._search_trigger = None
+        search_wrapper = BoxLayout(padding=(10, 5))
+        search_wrapper.add_widget(self.search_input)
+        button_layout.add_widget(search_wrapper)
+
         # Buttons
         self.add_folder_btn = HoverButton(
             text='[b]Add Folder[/b]', markup=True,
@@ -1367,6 +1343,20 @@ class RemindersApp(App):
         )
         self.add_reminder_btn.bind(on_press=self.add_reminder)
 
+        self.import_btn = HoverButton(
+            text='[b]Import Reminders[/b]', markup=True,
+            background_normal='', background_color=self.theme["primary"],
+            app_ref=self
+        )
+        self.import_btn.bind(on_press=self.import_reminders)
+
+        self.export_btn = HoverButton(
+            text='[b]Export Backup[/b]', markup=True,
+            background_normal='', background_color=self.theme["primary"],
+            app_ref=self
+        )
+        self.export_btn.bind(on_press=self.export_backup)
+
         self.change_theme_btn = HoverButton(text='[b]Change Theme[/b]', markup=True,
                                             background_normal='', background_color=self.theme["primary"]
                                             )
@@ -1388,7 +1378,7 @@ class RemindersApp(App):
 
 
         for btn in [self.add_folder_btn, self.delete_folder_btn, self.change_icon_btn, self.add_reminder_btn,
-                    self.change_theme_btn, self.help_btn]:
+                    self.import_btn, self.export_btn, self.change_theme_btn, self.help_btn]:
             wrapper = BoxLayout(padding=(10, 5))
             wrapper.add_widget(btn)
             button_layout.add_widget(wrapper)
@@ -1402,6 +1392,8 @@ class RemindersApp(App):
             self.delete_folder_btn,
             self.change_icon_btn,
             self.add_reminder_btn,
+            self.import_btn,
+            self.export_btn,
             self.help_btn,
             self.change_theme_btn
         ]
@@ -1466,19 +1458,17 @@ class RemindersApp(App):
         )
         self.saved_themes_box.bind(minimum_height=self.saved_themes_box.setter('height'))
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            DELETE FROM themes
-            WHERE name IS NULL OR background IS NULL OR
-                  "primary" IS NULL OR "secondary" IS NULL OR "text" IS NULL
-        """)
-        conn.commit()
+        # Incomplete rows are cleaned up in the background and skipped here
+        self.writer.submit(delete_incomplete_themes)
 
-        cursor.execute(
-            'SELECT name, background, "primary", "secondary", "text" FROM themes WHERE name NOT IN ("Dark", "Light") ORDER BY id DESC')
-        rows = cursor.fetchall()
-        conn.close()
+        with self.db.cursor() as cursor:
+            cursor.execute("""
+                SELECT name, background, "primary", "secondary", "text" FROM themes
+                WHERE name NOT IN ("Dark", "Light") AND name IS NOT NULL AND background IS NOT NULL AND
+                      "primary" IS NOT NULL AND "secondary" IS NOT NULL AND "text" IS NOT NULL
+                ORDER BY id DESC
+            """)
+            rows = cursor.fetchall()
 
         if not rows:
             self.saved_themes_box.add_widget(Label(
@@ -1885,13 +1875,11 @@ class RemindersApp(App):
             self.load_reminders(folder_name)
 
     def load_last_theme(self):
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            'SELECT background, "primary", "secondary", "text" FROM themes WHERE selected_theme = 1 ORDER BY id DESC LIMIT 1'
-        )
-        row = cursor.fetchone()
-        conn.close()
+        with self.db.cursor() as cursor:
+            cursor.execute(
+                'SELECT background, "primary", "secondary", "text" FROM themes WHERE selected_theme = 1 ORDER BY id DESC LIMIT 1'
+            )
+            row = cursor.fetchone()
 
         if row:
             self.theme = {
@@ -1915,6 +1903,9 @@ class RemindersApp(App):
         lv = len(hex_color)
         return tuple(int(hex_color[i:i + lv // 3], 16) / 255.0 for i in range(0, lv, lv // 3)) + (1,)
 
+    def theme_hex(self):
+        return {key: self.rgba_to_hex(self.theme[key]) for key in ("background", "primary", "secondary", "text")}
+
     def rgba_to_hex(self, rgba):
         return "#{:02x}{:02x}{:02x}".format(
             int(rgba[0] * 255),
@@ -1927,51 +1918,29 @@ class RemindersApp(App):
             self.prompt_save_theme()
             return
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        # Unselect all other themes first
-        cursor.execute("UPDATE themes SET selected_theme = 0")
+        def on_done(_):
+            # Only call this if the theme popup is already built
+            if hasattr(self, "saved_themes_box"):
+                self.refresh_saved_themes()
 
         # Save new theme and mark it as selected
-        cursor.execute("""
-            INSERT INTO themes (name, background, "primary", "secondary", "text", selected_theme)
-            VALUES (?, ?, ?, ?, ?, 1)
-        """, (
-            name,
-            self.rgba_to_hex(self.theme["background"]),
-            self.rgba_to_hex(self.theme["primary"]),
-            self.rgba_to_hex(self.theme["secondary"]),
-            self.rgba_to_hex(self.theme["text"])
-        ))
-
-        conn.commit()
-        conn.close()
-
-        # Only call this if the theme popup is already built
-        if hasattr(self, "saved_themes_box"):
-            self.refresh_saved_themes()
+        self.writer.submit(save_theme, name, self.theme_hex(), True, on_done=on_done)
 
     def clear_completed_reminders(self, instance):
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM reminders WHERE folder_name = 'Completed'")
-        conn.commit()
-        conn.close()
+        def on_done(_):
+            # Refresh only if currently viewing Completed
+            if self.selected_folder and 'Completed' in self.selected_folder:
+                self.load_reminders("Completed")
 
-        # Refresh only if currently viewing Completed
-        if self.selected_folder and 'Completed' in self.selected_folder:
-            self.load_reminders("Completed")
+        self.repo.clear_completed(on_done=on_done)
 
     def refresh_saved_themes(self):
         self.saved_themes_box.clear_widgets()
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            'SELECT name, background, "primary", "secondary", "text" FROM themes WHERE name NOT IN ("Dark", "Light") ORDER BY id DESC')
-        rows = cursor.fetchall()
-        conn.close()
+        with self.db.cursor() as cursor:
+            cursor.execute(
+                'SELECT name, background, "primary", "secondary", "text" FROM themes WHERE name NOT IN ("Dark", "Light") ORDER BY id DESC')
+            rows = cursor.fetchall()
 
         if not rows:
             self.saved_themes_box.add_widget(Label(
@@ -2010,17 +1979,19 @@ class RemindersApp(App):
 
     def load_folders(self):
         self.sidebar.clear_widgets()
+
+        # The old sidebar buttons are going away, stop theming them
+        old_buttons = set(map(id, self.sidebar_buttons))
+        self.themed_buttons = [b for b in self.themed_buttons if id(b) not in old_buttons]
         self.sidebar_buttons.clear()
+        self.folder_badges.clear()
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT name, folder_order, image_path FROM folders")
-        folders = cursor.fetchall()
+        # Cached, so redrawing the sidebar (theme changes, icon changes) doesn't query
+        folders = self.repo.folders()
 
         # Custom sort: Pinned, Non-Completed, Completed always on top
         priority = {'Pinned': 0, 'Recurring': 1, 'Non-Completed': 2, 'Completed': 3}
         folders.sort(key=lambda x: (priority.get(x[0], 3), x[1]))
-        conn.close()
 
         for folder in folders:
             name, order, image_path = folder
@@ -2046,15 +2017,21 @@ class RemindersApp(App):
             folder_widget.label.bind(on_press=self.switch_view)
             self.sidebar_buttons.append(folder_widget.label)
             self.sidebar.add_widget(folder_widget)
+            if name != "Completed":  # The archive has nothing open or overdue
+                self.folder_badges[name] = folder_widget.badge
 
         # Add sidebar buttons to themed buttons so they respond to theme toggle
         self.themed_buttons.extend(self.sidebar_buttons)
+        self.refresh_badges()
+
+    def refresh_badges(self):
+        # One row per folder from the counters table, however many reminders there are
+        self.repo.folder_counts(on_done=self.show_badges)
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT name, folder_order FROM folders ORDER BY folder_order")
-        rows = cursor.fetchall()
-        conn.close()
+    def show_badges(self, counts):
+        for name, badge in self.folder_badges.items():
+            open_count, overdue_count, _ = counts.get(name, (0, 0, 0))
+            badge.show(open_count, overdue_count)
 
     def add_folder(self, instance):
         layout = BoxLayout(orientation='vertical', spacing=10, padding=10)
@@ -2073,13 +2050,8 @@ class RemindersApp(App):
         def on_add_button_pressed(_):
             folder_name = text_input.text.strip()
             if folder_name:
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
-                cursor.execute("INSERT INTO folders (name) VALUES (?)", (folder_name,))
-                conn.commit()
-                conn.close()
                 popup.dismiss()
-                self.load_folders()
+                self.repo.create_folder(folder_name, on_done=lambda _: self.load_folders())
 
         add_button.bind(on_press=on_add_button_pressed)
         text_input.bind(on_text_validate=on_add_button_pressed)
@@ -2143,14 +2115,9 @@ class RemindersApp(App):
         popup.open()
 
         def on_confirm_delete(_):
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM folders WHERE name = ?", (folder_name_clean,))
-            conn.commit()
-            conn.close()
             popup.dismiss()
-            self.load_folders()
             self.selected_folder = None
+            self.repo.remove_folder(folder_name_clean, on_done=lambda _: self.load_folders())
 
         confirm_btn.bind(on_press=on_confirm_delete)
         cancel_btn.bind(on_press=popup.dismiss)
@@ -2211,27 +2178,8 @@ class RemindersApp(App):
             elif theme_name == 'light':
                 self.set_light_theme()
 
-            # Save selected built-in theme to DB as active
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-
-            # Unselect all previously selected themes
-            cursor.execute("UPDATE themes SET selected_theme = 0")
-
-            # Insert or replace the chosen built-in theme
-            cursor.execute("""
-                INSERT OR REPLACE INTO themes (name, background, "primary", "secondary", "text", selected_theme)
-                VALUES (?, ?, ?, ?, ?, 1)
-            """, (
-                theme_name.capitalize(),  # "Dark" or "Light"
-                self.rgba_to_hex(self.theme["background"]),
-                self.rgba_to_hex(self.theme["primary"]),
-                self.rgba_to_hex(self.theme["secondary"]),
-                self.rgba_to_hex(self.theme["text"])
-            ))
-
-            conn.commit()
-            conn.close()
+            # Save selected built-in theme to DB as active ("Dark" or "Light")
+            self.writer.submit(save_theme, theme_name.capitalize(), self.theme_hex(), True)
 
             popup.dismiss()
 
@@ -2320,19 +2268,112 @@ class RemindersApp(App):
         Window.bind(on_dropfile=on_file_drop)
         popup.bind(on_dismiss=lambda *_: Window.unbind(on_dropfile=on_file_drop))
 
+    def import_reminders(self, instance):
+        # Rows without a folder of their own go into the open folder
+        default_folder = self.selected_folder.replace('[b]', '').replace('[/b]', '') if self.selected_folder else None
+
+        layout = BoxLayout(orientation='vertical', spacing=10, padding=10)
+        instruction = Label(
+            text='[b]Drop a .csv, .jsonl or .ics file here[/b]',
+            markup=True,
+            halign='center',
+            valign='middle'
+        )
+        instruction.bind(size=instruction.setter('text_size'))
+        layout.add_widget(instruction)
+
+        popup = Popup(title="Import Reminders", content=layout, size_hint=(None, None), size=(600, 300))
+        popup.open()
+
+        def on_finished(result, error=None):
+            text = f"Import failed: {error}" if error else str(result)
+            if result and result.errors:
+                text += "\n" + "\n".join(f"line {n}: {message}" for n, message in result.errors[:5])
+            instruction.text = text
+            self.repo.invalidate_all()
+            self.load_schedule()
+            self.load_folders()
+            if self.selected_folder:
+                self.load_reminders(self.selected_folder)
+
+        def run_import(file_path):
+            # Its own pooled connection, committing a chunk at a time so the UI and writer keep going
+            try:
+                with self.db.pooled() as conn:
+                    result = import_file(self.db.bind(conn), file_path, default_folder)
+                Clock.schedule_once(lambda dt: on_finished(result), 0)
+            except Exception as e:
+                print(f"[ERROR] Import of {file_path} failed: {e}")
+                Clock.schedule_once(lambda dt: on_finished(None, e), 0)
+
+        def on_file_drop(window, file_path_bytes):
+            file_path = file_path_bytes.decode('utf-8')
+            if os.path.splitext(file_path)[1].lower() not in READERS:
+                instruction.text = "[b]Please drop a .csv, .jsonl or .ics file[/b]"
+                return
+            Window.unbind(on_dropfile=on_file_drop)
+            instruction.text = f"[b]Importing {os.path.basename(file_path)}...[/b]"
+            threading.Thread(target=run_import, args=(file_path,), daemon=True).start()
+
+        Window.bind(on_dropfile=on_file_drop)
+        popup.bind(on_dismiss=lambda *_: Window.unbind(on_dropfile=on_file_drop))
+
+    def export_backup(self, instance):
+        path = os.path.join(os.path.expanduser("~"), f"Reminders backup {datetime.now():%Y-%m-%d %H%M%S}.jsonl")
+
+        message = Label(text=f"[b]Exporting to {path}...[/b]", markup=True, halign='center', valign='middle')
+        message.bind(size=message.setter('text_size'))
+        popup = Popup(title="Export Backup", content=message, size_hint=(None, None), size=(700, 300))
+        popup.open()
+
+        def on_finished(text):
+            message.text = text
+
+        def run_export():
+            # Reads a snapshot on its own pooled connection, so adding and completing keep working meanwhile
+            try:
+                counts = export_file(self.db, path)
+                text = f"Saved {counts['reminders']} reminders and {counts['completed']} completed to\n{path}"
+            except Exception as e:
+                print(f"[ERROR] Export to {path} failed: {e}")
+                text = f"Export failed: {e}"
+            Clock.schedule_once(lambda dt: on_finished(text), 0)
+
+        threading.Thread(target=run_export, daemon=True).start()
+
     def update_folder_icon(self, file_path, folder_name):
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("UPDATE folders SET image_path = ? WHERE name = ?", (file_path, folder_name))
-        conn.commit()
-        conn.close()
+        # The cached folder list takes the new icon straight away, so this redraw doesn't query
+        self.repo.set_folder_icon(folder_name, file_path)
         self.load_folders()
 
     def load_reminders(self, folder_name):
+        folder_name_clean = folder_name.replace('[b]', '').replace('[/b]', '')
+
+        # The previous folder stays on screen while the query runs; only a slow load gets a placeholder
+        if self._loading_placeholder is not None:
+            self._loading_placeholder.cancel()
+        self._loading_placeholder = Clock.schedule_once(
+            lambda dt: self.show_loading_placeholder(folder_name_clean), 0.15)
+
+        # Reminders with their first two dates and date count (the first archive page for Completed),
+        # from the cache or a background query. A newer load_reminders call makes this one's result stale
+        self.repo.load_reminders(folder_name_clean,
+                                 on_done=lambda reminders: self.show_reminders(folder_name_clean, reminders))
+
+    def show_loading_placeholder(self, folder_name_clean):
+        self._loading_placeholder = None
         self.reminder_list.clear_widgets()
         self.reminder_area_layout.clear_widgets()
+        self.viewing_label.text = f"[b]Loading '{folder_name_clean}'...[/b]"
+        self.reminder_area_layout.add_widget(self.viewing_label)
 
-        folder_name_clean = folder_name.replace('[b]', '').replace('[/b]', '')
+    def show_reminders(self, folder_name_clean, reminders):
+        if self._loading_placeholder is not None:
+            self._loading_placeholder.cancel()
+            self._loading_placeholder = None
+
+        self.reminder_list.clear_widgets()
+        self.reminder_area_layout.clear_widgets()
 
         if folder_name_clean == "Completed":
             clear_completed_btn = HoverButton(
@@ -2347,113 +2388,63 @@ class RemindersApp(App):
             clear_completed_btn.bind(on_press=self.clear_completed_reminders)
             self.reminder_area_layout.add_widget(clear_completed_btn)
 
-        # Fetch reminders and all notify_at values
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        # Main reminders
-        cursor.execute("""
-            SELECT text, urgency_level
-            FROM reminders
-            WHERE folder_name = ?
-            ORDER BY reminder_order ASC
-        """, (folder_name_clean,))
-        reminders = cursor.fetchall()
-
-        # All notify_at timestamps
-        cursor.execute("""
-            SELECT reminder_text, notify_at
-            FROM reminder_notifications
-            WHERE folder_name = ?
-        """, (folder_name_clean,))
-        notify_map = {}
-        for text, notify_at in cursor.fetchall():
-            notify_map.setdefault(text, []).append(notify_at)
-
-        # Also include the notify_at from reminders table itself
-        cursor.execute("""
-            SELECT text, notify_at FROM reminders
-            WHERE folder_name = ?
-        """, (folder_name_clean,))
-        for text, notify_at in cursor.fetchall():
-            if notify_at:  # ignore NULLs
-                notify_map.setdefault(text, []).append(notify_at)
-
-
-        conn.close()
-
         # Show "No reminders" message if empty
         if not reminders:
             self.viewing_label.text = f"[b]No reminders in '{folder_name_clean}'[/b]"
             self.reminder_area_layout.add_widget(self.viewing_label)
             return
 
-        for text, urgency in reminders:
-            raw_dates = notify_map.get(text, [])
-
-            # Normalize to list
-            if isinstance(raw_dates, str):
-                dates = [raw_dates]
-            elif isinstance(raw_dates, list):
-                dates = raw_dates
-            elif raw_dates is None:
-                dates = []
-            else:
-                print(f"[WARN] Unrecognized notify_at format: {raw_dates} for {text}")
-                dates = []
-
-            show_urgency = folder_name_clean != "Completed"
+        if folder_name_clean == "Completed":
+            self.add_completed_rows(reminders)
+            return
 
+        for reminder_id, text, urgency, dates, date_count in reminders:
             btn = DraggableReminder(
+                reminder_id=reminder_id,
                 reminder_text=text,
-                urgency_level=urgency if show_urgency else None,
+                urgency_level=urgency,
                 folder_name=folder_name_clean,
                 notify_at=dates,
+                date_count=date_count,
                 app_ref=self
             )
             self.reminder_list.add_widget(btn)
 
-        now = datetime.now()
-        for text, notify_list in notify_map.items():
-            for notify_str in notify_list:
-                try:
-                    dt = datetime.fromisoformat(notify_str)
-                    delay = (dt - now).total_seconds()
-                except Exception as e:
-                    print(f"[ERROR] Could not parse notify_at '{notify_str}' for reminder '{text}': {e}") # Debug message
-
         self.reminder_area_layout.add_widget(self.reminder_list)
 
-        def split_reminder_instances(reminder_text: str, notify_at_list: List[str]) -> List[
-            Tuple[str, Union[str, List[str]]]]:
-            """
-            Given a reminder text and list of ISO datetime strings, split them into individual reminders for past events
-            and a grouped reminder for future events.
+    def add_completed_rows(self, rows):
+        # rows is one page of (id, text) from the archive, newest first
+        if self.reminder_list.parent is None:
+            self.reminder_area_layout.add_widget(self.reminder_list)
 
-            Returns:
-                List of tuples with (reminder_text, notify_at) where notify_at can be a string or list of strings.
-            """
-            now = datetime.now()
-            past_reminders = []
-            future_notify_at = []
+        for archive_id, text in rows:
+            self.reminder_list.add_widget(DraggableReminder(
+                reminder_id=archive_id,
+                reminder_text=text,
+                urgency_level=None,
+                folder_name="Completed",
+                draggable=False,  # The archive has no order of its own to drag
+                app_ref=self
+            ))
 
-            for notify_at_str in notify_at_list:
-                try:
-                    dt = datetime.fromisoformat(notify_at_str)
-                    if dt < now:
-                        formatted_date = dt.strftime("%b %d, %Y")
-                        labeled_text = f"{reminder_text} ({formatted_date})"
-                        past_reminders.append((labeled_text, notify_at_str))
-                    else:
-                        future_notify_at.append(notify_at_str)
-                except ValueError:
-                    continue  # Skip malformed dates
-
-            result = past_reminders
-            if future_notify_at:
-                result.append((reminder_text, future_notify_at))
-
-            return result
+        if self.load_more_btn is not None and self.load_more_btn.parent is not None:
+            self.load_more_btn.parent.remove_widget(self.load_more_btn)
+
+        # A full page means there may be more behind it
+        if len(rows) == COMPLETED_PAGE_SIZE:
+            last_id = rows[-1][0]
+            self.load_more_btn = HoverButton(
+                text='[b]Load More[/b]',
+                markup=True,
+                size_hint=(None, None),
+                size=(200, 40),
+                background_normal='',
+                background_color=self.theme["primary"],
+                app_ref=self
+            )
+            self.load_more_btn.bind(on_press=lambda instance: self.repo.load_more_completed(
+                last_id, on_done=self.add_completed_rows))
+            self.reminder_area_layout.add_widget(self.load_more_btn)
 
     def add_reminder(self, instance):
         if not self.selected_folder:
@@ -2597,9 +2588,6 @@ class RemindersApp(App):
             urgency_map = {'No Urgency': 1, 'Medium': 2, 'High': 3}
             urgency_level = urgency_map.get(urgency_spinner.text, 1)
 
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-
             if reminder_text:
                 year = int(year_spinner.text)
                 month = int(month_spinner.text.split(" - ")[0])
@@ -2609,83 +2597,26 @@ class RemindersApp(App):
                 minute = int(minute_spinner.text)
                 ampm = ampm_spinner.text
 
-                # Convert 12h → 24h
-                if ampm == "PM" and hour != 12:
-                    hour += 12
-                elif ampm == "AM" and hour == 12:
-                    hour = 0
-
-                notify_at = f"{year:04d}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}"
-
-                _, max_day = monthrange(year, month)
-                if day > max_day:
+                # Converts 12h → 24h and checks the day exists, same rules as the importer
+                try:
+                    notify_at = notify_at_from_parts(year, month, day, hour, minute, ampm)
+                except ValueError as e:
                     Popup(
                         title="Invalid Date",
-                        content=Label(text=f"{month_names[month - 1]} {year} has only {max_day} days."),
+                        content=Label(text=str(e)),
                         size_hint=(None, None), size=(450, 200)
                     ).open()
                     return
 
-                cursor.execute("SELECT MAX(reminder_order) FROM reminders WHERE folder_name = ?", (folder_clean,))
-                max_order = cursor.fetchone()[0]
-                next_order = (max_order + 1) if max_order is not None else 0
-
-                # Always insert into the original folder
-                cursor.execute("""
-                    INSERT INTO reminders (text, folder_name, reminder_order, urgency_level, notify_at)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (reminder_text, folder_clean, next_order, urgency_level, notify_at))
-
-                # Also insert into Recurring if selected
-                if add_to_recurring:
-                    cursor.execute("SELECT MAX(reminder_order) FROM reminders WHERE folder_name = 'Recurring'")
-                    max_rec_order = cursor.fetchone()[0]
-                    next_rec_order = (max_rec_order + 1) if max_rec_order is not None else 0
-
-                    cursor.execute("""
-                        INSERT INTO reminders (text, folder_name, reminder_order, urgency_level, notify_at)
-                        VALUES (?, 'Recurring', ?, ?, ?)
-                    """, (reminder_text, next_rec_order, urgency_level, notify_at))
-
-                if urgency_level == 3 and folder_clean != "Pinned":
-                    cursor.execute("SELECT MAX(reminder_order) FROM reminders WHERE folder_name = 'Pinned'")
-                    max_pinned_order = cursor.fetchone()[0]
-                    next_pinned_order = (max_pinned_order + 1) if max_pinned_order is not None else 0
-
-                    cursor.execute("""
-                        INSERT INTO reminders (text, folder_name, reminder_order, urgency_level)
-                        VALUES (?, 'Pinned', ?, ?)
-                    """, (reminder_text, next_pinned_order, urgency_level))
-
-                if folder_clean != "Non-Completed" and not add_to_recurring:
-                    cursor.execute("SELECT MAX(reminder_order) FROM reminders WHERE folder_name = 'Non-Completed'")
-                    max_nc_order = cursor.fetchone()[0]
-                    next_nc_order = (max_nc_order + 1) if max_nc_order is not None else 0
-
-                    cursor.execute("""
-                        INSERT INTO reminders (text, folder_name, reminder_order, urgency_level, notify_at)
-                        VALUES (?, 'Non-Completed', ?, ?, ?)
-                    """, (reminder_text, next_nc_order, urgency_level, notify_at))
-
-                conn.commit()
-                conn.close()
-
-                # Schedule notification
-                notify_dt = datetime.strptime(notify_at, "%Y-%m-%d %H:%M")
-                now = datetime.now()
-                delay = (notify_dt - now).total_seconds()
-
-                if delay > 0:
-                    formatted_time = notify_dt.strftime("%I:%M %p on %b %d, %Y")
-                    notification_body = f"{reminder_text}\nScheduled for {formatted_time}"
-
-                    Clock.schedule_once(
-                        lambda dt: send_mac_notification("Reminder", notification_body),
-                        delay
-                    )
+                def on_added(reminder_id):
+                    # Schedule notification
+                    self.scheduler.add(reminder_id, reminder_text, notify_at, folder_clean)
+                    self.load_reminders(folder_clean)
+
+                self.repo.add_reminder(reminder_text, folder_clean, urgency_level, notify_at, add_to_recurring,
+                                       on_done=on_added)
 
                 popup.dismiss()
-                self.load_reminders(folder_clean)
 
         add_button.bind(on_press=on_add)
         text_input.bind(on_text_validate=on_add)
@@ -2711,27 +2642,14 @@ class RemindersApp(App):
         self.apply_theme()
 
     def prompt_save_theme_to_db(self, instance=None):
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
         # Ask user for a name
         def save_with_name(name):
-            cursor.execute("""
-                INSERT INTO themes (name, background, "primary", "secondary", "text")
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                name,
-                self.rgba_to_hex(self.theme["background"]),
-                self.rgba_to_hex(self.theme["primary"]),
-                self.rgba_to_hex(self.theme["secondary"]),
-                self.rgba_to_hex(self.theme["text"])
-            ))
-            conn.commit()
-            conn.close()
+            def on_done(_):
+                if hasattr(self, "theme_popup"):
+                    self.theme_popup.dismiss()
+                self.show_theme_popup(None)  # Refresh the list
 
-            if hasattr(self, "theme_popup"):
-                self.theme_popup.dismiss()
-            self.show_theme_popup(None)  # Refresh the list
+            self.writer.submit(save_theme, name, self.theme_hex(), on_done=on_done)
 
         # Prompt user for theme name
         layout = BoxLayout(orientation='vertical', spacing=10, padding=10)
@@ -2763,12 +2681,7 @@ class RemindersApp(App):
             "text": theme_dict.get("text", (1, 1, 1, 1))
         }
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("UPDATE themes SET selected_theme = 0")
-        cursor.execute("UPDATE themes SET selected_theme = 1 WHERE name = ?", (theme_dict["name"],))
-        conn.commit()
-        conn.close()
+        self.writer.submit(select_theme, theme_dict["name"])
 
         self.apply_theme()
 
@@ -2829,35 +2742,91 @@ class RemindersApp(App):
         )
 
         def on_confirm(_):
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM themes WHERE name = ?", (theme_name,))
-            conn.commit()
-            conn.close()
             popup.dismiss()
-            self.show_theme_popup(None)  # Refresh list
+            self.writer.submit(remove_theme, theme_name, on_done=lambda _: self.show_theme_popup(None))  # Refresh list
 
         confirm_btn.bind(on_press=on_confirm)
         cancel_btn.bind(on_press=popup.dismiss)
         popup.open()
 
+    def on_search_text(self, instance, text):
+        # Wait for a pause in typing before querying
+        if self._search_trigger is not None:
+            self._search_trigger.cancel()
+        self._search_trigger = Clock.schedule_once(lambda dt: self.run_search(text.strip()), 0.15)
+
+    def run_search(self, query):
+        self._search_trigger = None
+
+        if not query:
+            # Back to whatever folder was open
+            if self.selected_folder:
+                self.load_reminders(self.selected_folder)
+            else:
+                self.reader.cancel("reminders")
+                self.reminder_list.clear_widgets()
+                self.reminder_area_layout.clear_widgets()
+                self.viewing_label.text = '[b]Select a folder to view reminders[/b]'
+                self.reminder_area_layout.add_widget(self.viewing_label)
+            return
+
+        # Same key as load_reminders, so a folder click and a search supersede each other
+        self.repo.search(query, on_done=lambda results: self.show_search_results(query, results))
+
+    def show_search_results(self, query, results):
+        if self._loading_placeholder is not None:
+            self._loading_placeholder.cancel()
+            self._loading_placeholder = None
+
+        self.reminder_list.clear_widgets()
+        self.reminder_area_layout.clear_widgets()
+
+        if not results:
+            self.viewing_label.text = f"[b]No reminders match '{query}'[/b]"
+            self.reminder_area_layout.add_widget(self.viewing_label)
+            return
+
+        for reminder_id, text, urgency, dates, date_count, folder_name in results:
+            btn = DraggableReminder(
+                reminder_id=reminder_id,
+                reminder_text=text,
+                urgency_level=urgency,
+                folder_name=folder_name,
+                notify_at=dates,
+                date_count=date_count,
+                draggable=False,
+                app_ref=self
+            )
+            self.reminder_list.add_widget(btn)
+
+        self.reminder_area_layout.add_widget(self.reminder_list)
+
     def switch_view(self, instance):
         folder_name = instance.text
 
+        # Leaving search for a folder
+        if self.search_input.text:
+            if self._search_trigger is not None:
+                self._search_trigger.cancel()
+                self._search_trigger = None
+            self.search_input.unbind(text=self.on_search_text)
+            self.search_input.text = ""
+            self.search_input.bind(text=self.on_search_text)
+
         self.selected_folder = folder_name
         folder_clean = folder_name.replace('[b]', '').replace('[/b]', '')
 
         # Load reminders for this folder
         self.load_reminders(folder_clean)
 
-    def create_complete_button(self, reminder_text, folder_name):
+    def create_complete_button(self, reminder_id, folder_name):
         btn = Button(
             size_hint=(None, None),
             size=(25, 25),
             background_normal='',
             background_color=(0, 0, 0, 0)  # Make button background transparent
         )
-        btn.bind(on_press=lambda instance: self.mark_as_completed(reminder_text, folder_name))
+        btn.bind(on_press=lambda instance: self.mark_as_completed(reminder_id, folder_name))
 
         with btn.canvas.before:
             Color(*self.theme["secondary"])  # Use app's theme secondary color
@@ -0,0 +1,545 @@
+"""Numbered schema migrations, tracked with PRAGMA user_version.
+
+Each step runs once, in order, inside the same transaction as the
+user_version bump. To change the schema, append a new step to MIGRATIONS;
+never edit a step that has already shipped.
+
+Databases created before versioning existed report user_version 0, so the
+early steps tolerate tables and columns that are already there.
+"""
+import sqlite3
+
+from recurrence import Recurrence
+
+
+def _add_column(cursor, table, column):
+    """ALTER TABLE ... ADD COLUMN, returning False if the column already exists."""
+    try:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+        return True
+    except sqlite3.OperationalError:
+        return False  # Column already exists
+
+
+def _1_base_schema(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS folders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL,
+        image_path TEXT DEFAULT '',
+        folder_order INTEGER DEFAULT 0
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS reminders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text TEXT NOT NULL,
+        folder_name TEXT NOT NULL,
+        reminder_order INTEGER DEFAULT 0,
+        urgency_level INTEGER DEFAULT 3,
+        FOREIGN KEY (folder_name) REFERENCES folders(name)
+    )
+    ''')
+    _add_column(cursor, "reminders", "notify_at TEXT")
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS reminder_notifications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        reminder_text TEXT NOT NULL,
+        folder_name TEXT NOT NULL,
+        notify_at TEXT NOT NULL,
+        FOREIGN KEY (folder_name) REFERENCES folders(name)
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS themes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        background TEXT,
+        "primary" TEXT,
+        "secondary" TEXT,
+        "text" TEXT
+    )
+    ''')
+    # Tracks the currently selected theme
+    _add_column(cursor, "themes", "selected_theme INTEGER DEFAULT 0")
+
+    # Only insert Tropical if NO themes exist (it is a default created but deletable third theme)
+    cursor.execute("SELECT COUNT(*) FROM themes")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("""
+            INSERT INTO themes (name, background, "primary", "secondary", "text")
+            VALUES (?, ?, ?, ?, ?)
+        """, (
+            "Tropical",
+            "#ffe8b0",  # sand colors
+            "#ffa07a",  # light coral (primary)
+            "#20b2aa",  # light sea green (secondary)
+            "#000000"   # black text
+        ))
+
+    # Built-in folders first, then custom folders alphabetically
+    cursor.execute("INSERT OR IGNORE INTO folders (name) VALUES ('Pinned'), ('Recurring'), ('Completed'), ('Non-Completed')")
+    cursor.execute("UPDATE folders SET folder_order = 0 WHERE name = 'Pinned'")
+    cursor.execute("UPDATE folders SET folder_order = 1 WHERE name = 'Recurring'")
+    cursor.execute("UPDATE folders SET folder_order = 2 WHERE name = 'Non-Completed'")
+    cursor.execute("UPDATE folders SET folder_order = 3 WHERE name = 'Completed'")
+
+    cursor.execute("""
+        SELECT name FROM folders
+        WHERE name NOT IN ('Pinned', 'Recurring', 'Non-Completed', 'Completed')
+        ORDER BY name
+    """)
+    cursor.executemany("UPDATE folders SET folder_order = ? WHERE name = ?",
+                       [(i, name) for i, (name,) in enumerate(cursor.fetchall(), start=4)])
+
+
+def _2_reminder_ids(cursor):
+    # Copies that add_reminder makes in Pinned / Recurring / Non-Completed point back at the original row,
+    # so completing any one of them can find the rest by id instead of by text
+    if _add_column(cursor, "reminders", "source_id INTEGER"):
+        cursor.execute("""
+            UPDATE reminders
+            SET source_id = (
+                SELECT MIN(original.id) FROM reminders AS original
+                WHERE original.text = reminders.text AND original.folder_name != 'Completed'
+            )
+            WHERE folder_name != 'Completed'
+        """)
+        cursor.execute("UPDATE reminders SET source_id = NULL WHERE source_id = id")
+
+    # Dates belong to one reminder row
+    if _add_column(cursor, "reminder_notifications", "reminder_id INTEGER REFERENCES reminders(id)"):
+        cursor.execute("""
+            UPDATE reminder_notifications
+            SET reminder_id = (
+                SELECT MIN(r.id) FROM reminders AS r
+                WHERE r.text = reminder_notifications.reminder_text
+                  AND r.folder_name = reminder_notifications.folder_name
+            )
+        """)
+
+
+def _3_hot_query_indexes(cursor):
+    # Covering indexes for the hot queries, so switching folders never scans the whole table
+
+    # load_reminders / update_reminder_order / next order: folder lookup already in display order
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reminders_folder_order
+        ON reminders (folder_name, reminder_order, text, urgency_level, notify_at)
+    """)
+
+    # mark_as_completed: every copy of a reminder
+    cursor.execute("DROP INDEX IF EXISTS idx_reminders_text_folder")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reminders_source ON reminders (source_id)")
+
+    # load_reminders: every date for a folder
+    cursor.execute("DROP INDEX IF EXISTS idx_notifications_folder")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_notifications_folder_reminder
+        ON reminder_notifications (folder_name, reminder_id, notify_at)
+    """)
+
+    # mark_as_completed: dates of the reminders being removed
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_notifications_reminder
+        ON reminder_notifications (reminder_id)
+    """)
+
+
+def _4_notification_date_order(cursor):
+    # load_reminders reads each reminder's second-earliest date straight off this index
+    cursor.execute("DROP INDEX IF EXISTS idx_notifications_reminder")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_notifications_reminder_date
+        ON reminder_notifications (reminder_id, notify_at)
+    """)
+
+
+def _5_sparse_order_keys(cursor):
+    # Space reminder_order / folder_order keys 1024 apart (database.ORDER_GAP at the time of
+    # writing) so a drag only has to update the moved row
+    gap = 1024
+
+    cursor.execute("""
+        SELECT id, folder_name FROM reminders
+        ORDER BY folder_name, reminder_order, id
+    """)
+    updates = []
+    previous_folder, position = None, 0
+    for reminder_id, folder_name in cursor.fetchall():
+        position = position + 1 if folder_name == previous_folder else 0
+        previous_folder = folder_name
+        updates.append((position * gap, reminder_id))
+    cursor.executemany("UPDATE reminders SET reminder_order = ? WHERE id = ?", updates)
+
+    # Built-in folders keep 0-3
+    cursor.execute("""
+        SELECT id FROM folders
+        WHERE name NOT IN ('Pinned', 'Recurring', 'Non-Completed', 'Completed')
+        ORDER BY folder_order, name
+    """)
+    cursor.executemany("UPDATE folders SET folder_order = ? WHERE id = ?",
+                       [(i * gap, folder_id) for i, (folder_id,) in enumerate(cursor.fetchall(), start=1)])
+
+
+def _6_reminder_search(cursor):
+    # Full-text index over reminders.text. External content, so the text itself is only stored once.
+    # Only original rows are indexed: the Pinned / Recurring / Non-Completed copies share their
+    # original's text, and search resolves them to it anyway
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS reminders_fts USING fts5(
+            text,
+            content='reminders',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS reminders_fts_insert AFTER INSERT ON reminders
+        WHEN new.source_id IS NULL BEGIN
+            INSERT INTO reminders_fts (rowid, text) VALUES (new.id, new.text);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS reminders_fts_delete AFTER DELETE ON reminders
+        WHEN old.source_id IS NULL BEGIN
+            INSERT INTO reminders_fts (reminders_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS reminders_fts_update AFTER UPDATE OF text ON reminders
+        WHEN old.source_id IS NULL BEGIN
+            INSERT INTO reminders_fts (reminders_fts, rowid, text) VALUES ('delete', old.id, old.text);
+            INSERT INTO reminders_fts (rowid, text) VALUES (new.id, new.text);
+        END
+    """)
+
+    # Index whatever is already there. Not the 'rebuild' command, which would pull the copies in too
+    cursor.execute("INSERT INTO reminders_fts (rowid, text) SELECT id, text FROM reminders WHERE source_id IS NULL")
+
+
+def _7_completed_archive(cursor):
+    # Completed reminders live in their own table, so folder queries on reminders never wade
+    # through them and Clear All is an unconditional DELETE (SQLite's truncate fast path).
+    # The Completed view pages through it newest first on the primary key
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS completed_reminders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT NOT NULL,
+            folder_name TEXT,
+            urgency_level INTEGER,
+            notify_at TEXT,
+            completed_at TEXT
+        )
+    """)
+
+    # Older completions didn't record any of the extra columns
+    cursor.execute("""
+        INSERT INTO completed_reminders (text)
+        SELECT text FROM reminders
+        WHERE folder_name = 'Completed'
+        ORDER BY reminder_order, id
+    """)
+    cursor.execute("DELETE FROM reminders WHERE folder_name = 'Completed'")
+
+
+def _8_folder_counters(cursor):
+    # Per-folder counts for the sidebar badges, kept up to date by triggers so drawing them is
+    # one row per folder however many reminders there are.
+    #
+    # "Overdue" moves with the clock, which triggers can't see. overdue_count counts reminders
+    # due at or before counter_state.watermark; readers add the few that fell due since then
+    # (a range read on idx_reminders_notify_at) and database.advance_overdue_watermark folds
+    # those in from time to time.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS folder_counters (
+            folder_name TEXT PRIMARY KEY,
+            open_count INTEGER NOT NULL DEFAULT 0,
+            overdue_count INTEGER NOT NULL DEFAULT 0,
+            date_count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS counter_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            watermark TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        INSERT OR REPLACE INTO counter_state (id, watermark)
+        VALUES (1, strftime('%Y-%m-%d %H:%M', 'now', 'localtime'))
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reminders_notify_at ON reminders (notify_at, folder_name)")
+
+    # Every change to a reminder row adjusts its folder's counts
+    overdue = "({row}.notify_at IS NOT NULL AND {row}.notify_at <= (SELECT watermark FROM counter_state WHERE id = 1))"
+    add_reminder = f"""
+        INSERT INTO folder_counters (folder_name, open_count, overdue_count)
+        VALUES (new.folder_name, 1, {overdue.format(row="new")})
+        ON CONFLICT (folder_name) DO UPDATE SET
+            open_count = open_count + 1,
+            overdue_count = overdue_count + excluded.overdue_count;
+    """
+    remove_reminder = f"""
+        UPDATE folder_counters SET
+            open_count = open_count - 1,
+            overdue_count = overdue_count - {overdue.format(row="old")}
+        WHERE folder_name = old.folder_name;
+    """
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS folder_counters_insert AFTER INSERT ON reminders "
+                   f"BEGIN {add_reminder} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS folder_counters_delete AFTER DELETE ON reminders "
+                   f"BEGIN {remove_reminder} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS folder_counters_update AFTER UPDATE OF folder_name, notify_at "
+                   f"ON reminders BEGIN {remove_reminder} {add_reminder} END")
+
+    # Notification dates only feed date_count, how much schedule a folder is carrying
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS folder_counters_date_insert AFTER INSERT ON reminder_notifications BEGIN
+            INSERT INTO folder_counters (folder_name, date_count) VALUES (new.folder_name, 1)
+            ON CONFLICT (folder_name) DO UPDATE SET date_count = date_count + 1;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS folder_counters_date_delete AFTER DELETE ON reminder_notifications BEGIN
+            UPDATE folder_counters SET date_count = date_count - 1 WHERE folder_name = old.folder_name;
+        END
+    """)
+
+    # Count what's already there
+    cursor.execute("DELETE FROM folder_counters")
+    cursor.execute("""
+        INSERT INTO folder_counters (folder_name, open_count, overdue_count)
+        SELECT folder_name, COUNT(*),
+               SUM(notify_at IS NOT NULL AND notify_at <= (SELECT watermark FROM counter_state WHERE id = 1))
+        FROM reminders
+        GROUP BY folder_name
+    """)
+    cursor.execute("""
+        INSERT INTO folder_counters (folder_name, date_count)
+        SELECT folder_name, COUNT(*) FROM reminder_notifications GROUP BY folder_name
+        ON CONFLICT (folder_name) DO UPDATE SET date_count = excluded.date_count
+    """)
+
+
+def _9_notification_due_index(cursor):
+    # The scheduler loads every future date at startup; extra dates are found by time, not by reminder
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_notifications_notify_at ON reminder_notifications (notify_at)")
+
+
+def _10_reminder_schedules(cursor):
+    # A repeating schedule is stored once as a rule (see recurrence.py) instead of as five
+    # dates in reminder_notifications. Like those dates it belongs to the row it was set on.
+    # Dates an older version already wrote out stay where they are, as one-off dates.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS reminder_schedules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            reminder_id INTEGER NOT NULL,
+            folder_name TEXT NOT NULL,
+            frequency TEXT NOT NULL,
+            interval INTEGER NOT NULL DEFAULT 1,
+            starts_at TEXT NOT NULL,
+            until TEXT,
+            exdates TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_schedules_folder_reminder
+        ON reminder_schedules (folder_name, reminder_id)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_schedules_reminder ON reminder_schedules (reminder_id)")
+
+
+def _11_occurrence_indexes(cursor):
+    # fetch_occurrences: one folder's extra dates in time order, and only the schedules that
+    # have started by the end of the range (where each one then starts counting is worked out)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_notifications_folder_date
+        ON reminder_notifications (folder_name, notify_at)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_schedules_starts_at ON reminder_schedules (starts_at)")
+
+
+def _12_epoch_timestamps(cursor):
+    # Dates were TEXT in two shapes ("YYYY-MM-DD HH:MM" from add_reminder, ISO from the calendar
+    # popup), compared as strings and parsed again on every render. They're now due_at, UTC seconds
+    # since the epoch, and utc_offset, the local zone's offset in seconds when the date was set,
+    # so an export can still give back the wall-clock time it was entered as.
+    # The completed archive keeps its TEXT notify_at, it's only ever shown.
+    for table in ("reminders", "reminder_notifications"):
+        _add_column(cursor, table, "due_at INTEGER")
+        _add_column(cursor, table, "utc_offset INTEGER")
+        # The old strings are local wall-clock times; unreadable ones (never shown or notified) become NULL
+        cursor.execute(f"""
+            UPDATE {table} SET
+                due_at = CAST(strftime('%s', notify_at, 'utc') AS INTEGER),
+                utc_offset = CAST(strftime('%s', notify_at) AS INTEGER) - CAST(strftime('%s', notify_at, 'utc') AS INTEGER)
+            WHERE notify_at IS NOT NULL AND notify_at != ''
+        """)
+    cursor.execute("DELETE FROM reminder_notifications WHERE due_at IS NULL")
+
+    # Everything that mentions notify_at has to go before the columns can
+    for trigger in ("folder_counters_insert", "folder_counters_delete", "folder_counters_update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    for index in ("idx_reminders_folder_order", "idx_reminders_notify_at", "idx_notifications_folder_reminder",
+                  "idx_notifications_reminder_date", "idx_notifications_notify_at", "idx_notifications_folder_date"):
+        cursor.execute(f"DROP INDEX IF EXISTS {index}")
+    cursor.execute("ALTER TABLE reminders DROP COLUMN notify_at")
+    cursor.execute("ALTER TABLE reminder_notifications DROP COLUMN notify_at")
+
+    # The same indexes, on the integers
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reminders_folder_order
+        ON reminders (folder_name, reminder_order, text, urgency_level, due_at)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reminders_due_at ON reminders (due_at, folder_name)")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_notifications_folder_reminder
+        ON reminder_notifications (folder_name, reminder_id, due_at)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_notifications_reminder_date
+        ON reminder_notifications (reminder_id, due_at)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_notifications_due_at ON reminder_notifications (due_at)")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_notifications_folder_date
+        ON reminder_notifications (folder_name, due_at)
+    """)
+
+    # The overdue watermark becomes epoch seconds too
+    cursor.execute("DROP TABLE IF EXISTS counter_state")
+    cursor.execute("""
+        CREATE TABLE counter_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            watermark INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("INSERT INTO counter_state (id, watermark) VALUES (1, CAST(strftime('%s', 'now') AS INTEGER))")
+
+    overdue = "({row}.due_at IS NOT NULL AND {row}.due_at <= (SELECT watermark FROM counter_state WHERE id = 1))"
+    add_reminder = f"""
+        INSERT INTO folder_counters (folder_name, open_count, overdue_count)
+        VALUES (new.folder_name, 1, {overdue.format(row="new")})
+        ON CONFLICT (folder_name) DO UPDATE SET
+            open_count = open_count + 1,
+            overdue_count = overdue_count + excluded.overdue_count;
+    """
+    remove_reminder = f"""
+        UPDATE folder_counters SET
+            open_count = open_count - 1,
+            overdue_count = overdue_count - {overdue.format(row="old")}
+        WHERE folder_name = old.folder_name;
+    """
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS folder_counters_insert AFTER INSERT ON reminders "
+                   f"BEGIN {add_reminder} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS folder_counters_delete AFTER DELETE ON reminders "
+                   f"BEGIN {remove_reminder} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS folder_counters_update AFTER UPDATE OF folder_name, due_at "
+                   f"ON reminders BEGIN {remove_reminder} {add_reminder} END")
+
+    cursor.execute("""
+        UPDATE folder_counters SET overdue_count = (
+            SELECT COUNT(*) FROM reminders
+            WHERE reminders.folder_name = folder_counters.folder_name
+              AND due_at <= (SELECT watermark FROM counter_state WHERE id = 1))
+    """)
+    cursor.execute("""
+        UPDATE folder_counters SET date_count = (
+            SELECT COUNT(*) FROM reminder_notifications
+            WHERE reminder_notifications.folder_name = folder_counters.folder_name)
+    """)
+
+
+def _13_delivery_watermark(cursor):
+    # Notifications are announced up to delivered_through (epoch seconds). Whatever falls due
+    # after it while the app is closed is caught up with on the next start. A new database (or
+    # one from before this) starts from now rather than announcing its whole history.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS notification_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            delivered_through INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        INSERT OR IGNORE INTO notification_state (id, delivered_through)
+        VALUES (1, CAST(strftime('%s', 'now') AS INTEGER))
+    """)
+
+
+def _14_notification_deliveries(cursor):
+    # One row per notification sent: a reminder (the original row's id) and the due time it went
+    # out for. Whoever inserts the row first, the app or the daemon, is the one that sends it, so
+    # nothing is announced twice; the rows are the delivery history too.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS notification_deliveries (
+            reminder_id INTEGER NOT NULL,
+            due_at INTEGER NOT NULL,
+            fired_at INTEGER NOT NULL,
+            fired_by TEXT NOT NULL,
+            reminder_text TEXT NOT NULL,
+            PRIMARY KEY (reminder_id, due_at)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_deliveries_fired_at ON notification_deliveries (fired_at)")
+
+
+def _15_schedule_times(cursor):
+    # reminder_schedules' starts_at, until and exdates are compared with ISO bounds as text, so they
+    # have to be in one shape, Recurrence.to_row's "YYYY-MM-DDTHH:MM:SS". Imports used to keep
+    # whatever fromisoformat had taken: a space separator, fractions of a second, an offset.
+    cursor.execute("SELECT id, frequency, interval, starts_at, until, exdates FROM reminder_schedules")
+    rows = []
+    for schedule_id, *row in cursor.fetchall():
+        try:
+            rows.append(Recurrence.from_row(*row).to_row()[2:] + (schedule_id,))
+        except ValueError:
+            pass  # Unreadable, and never could be scheduled; left as it is
+    cursor.executemany("UPDATE reminder_schedules SET starts_at = ?, until = ?, exdates = ? WHERE id = ?", rows)
+
+
+# Position in this list is the version number: MIGRATIONS[0] takes a database to version 1
+MIGRATIONS = [
+    _1_base_schema,
+    _2_reminder_ids,
+    _3_hot_query_indexes,
+    _4_notification_date_order,
+    _5_sparse_order_keys,
+    _6_reminder_search,
+    _7_completed_archive,
+    _8_folder_counters,
+    _9_notification_due_index,
+    _10_reminder_schedules,
+    _11_occurrence_indexes,
+    _12_epoch_timestamps,
+    _13_delivery_watermark,
+    _14_notification_deliveries,
+    _15_schedule_times,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(db):
+    with db.cursor() as cursor:
+        cursor.execute("PRAGMA user_version")
+        return cursor.fetchone()[0]
+
+
+def migrate(db):
+    """Apply every migration newer than the database's user_version. Returns the steps applied."""
+    version = schema_version(db)
+    if version >= SCHEMA_VERSION:
+        return []  # Already current, the usual startup path
+
+    pending = MIGRATIONS[version:]
+    with db.transaction() as cursor:
+        for step in pending:
+            step(cursor)
+        # PRAGMA can't take a bound parameter; SCHEMA_VERSION is always an int
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    return [step.__name__ for step in pending]
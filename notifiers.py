@@ -0,0 +1,187 @@
+"""Desktop notifications for the Reminders app.
+
+A notifier sends one notification, synchronously:
+
+    OsascriptNotifier   macOS Notification Center
+    NotifySendNotifier  Linux desktops, through notify-send (which talks D-Bus)
+    LogNotifier         appends a line to a file, or prints it
+    MemoryNotifier      keeps them in a list, for scripts and benchmarks
+
+default_notifier() picks one for the platform. The app and the daemon never call
+a notifier directly: they hand notifications to a NotificationDispatcher, which
+sends them one at a time from its own thread with a bounded queue, a timeout per
+notification and at most one notification every min_interval seconds, so a hung
+osascript can't stall the UI and a burst can't flood the desktop. Nothing here
+imports Kivy.
+"""
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+_STOP = object()
+
+# Reminder texts listed in a grouped notification before "and N more"
+GROUP_PREVIEW = 3
+
+# Going out this much later than due (the app was closed, the machine asleep) counts as missed
+MISSED_AFTER = timedelta(minutes=2)
+
+
+def reminder_message(text, due):
+    """The notification body for a reminder due at the datetime due."""
+    formatted_time = due.strftime("%I:%M %p on %b %d, %Y")
+    return f"{text}\nScheduled for {formatted_time}"
+
+
+def batch_message(items, now=None):
+    """(title, message) for reminders that fell due together, [(reminder_id, text, due, folder_name)]
+    earliest first.
+
+    One reminder gets the usual notification; several get one summary, counted by folder.
+    Either is titled as missed if the first one is over MISSED_AFTER late.
+    """
+    missed = (now or datetime.now()) - items[0][2] > MISSED_AFTER
+    if len(items) == 1:
+        _, text, due, _ = items[0]
+        return "Missed reminder" if missed else "Reminder", reminder_message(text, due)
+
+    folders = Counter(folder_name or "Reminders" for _, _, _, folder_name in items)
+    lines = [", ".join(f"{name}: {count}" for name, count in folders.most_common())]
+    lines += [f"- {text}" for _, text, _, _ in items[:GROUP_PREVIEW]]
+    if len(items) > GROUP_PREVIEW:
+        lines.append(f"and {len(items) - GROUP_PREVIEW} more")
+    return f"{len(items)} {'missed reminders' if missed else 'reminders due'}", "\n".join(lines)
+
+
+class OsascriptNotifier:
+    # Title and message are passed as arguments, never pasted into the script,
+    # so quotes and backslashes in a reminder can't break out of it
+    SCRIPT = ["on run argv", "display notification (item 2 of argv) with title (item 1 of argv)", "end run"]
+
+    def send(self, title, message, timeout=None):
+        command = ["osascript"]
+        for line in self.SCRIPT:
+            command += ["-e", line]
+        subprocess.run(command + [title, message], check=True, timeout=timeout, capture_output=True)
+
+
+class NotifySendNotifier:
+    def __init__(self, app_name="Reminders"):
+        self.app_name = app_name
+
+    def send(self, title, message, timeout=None):
+        subprocess.run(["notify-send", f"--app-name={self.app_name}", "--", title, message],
+                       check=True, timeout=timeout, capture_output=True)
+
+
+class LogNotifier:
+    def __init__(self, path=None):
+        """path is a file to append to; without one the notification is printed."""
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, title, message, timeout=None):
+        line = f"{datetime.now():%Y-%m-%d %H:%M:%S} {title}: {message.replace(chr(10), ' / ')}"
+        with self._lock:
+            if self.path is None:
+                print(line)
+            else:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+
+
+class MemoryNotifier:
+    def __init__(self):
+        self.sent = []  # (title, message)
+        self._lock = threading.Lock()
+
+    def send(self, title, message, timeout=None):
+        with self._lock:
+            self.sent.append((title, message))
+
+
+def default_notifier():
+    if sys.platform == "darwin":
+        return OsascriptNotifier()
+    if shutil.which("notify-send"):
+        return NotifySendNotifier()
+    return LogNotifier()
+
+
+class NotificationDispatcher:
+    def __init__(self, notifier=None, max_queued=100, timeout=5, min_interval=1.0):
+        """Sends through notifier (default_notifier() if not given) on a background thread.
+
+        At most max_queued notifications wait; each gets timeout seconds to go out, and
+        they go out at least min_interval seconds apart.
+        """
+        self.notifier = notifier or default_notifier()
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+        self._thread.start()
+
+    def send(self, title, message, on_sent=None):
+        """Queue a notification and return straight away. False if the queue is full and it was dropped.
+
+        on_sent(ok) is called on the dispatcher's thread once the notifier has finished with it,
+        ok False if it failed or timed out (and with False straight away if it was dropped).
+        """
+        try:
+            self._queue.put_nowait((title, message, on_sent))
+            return True
+        except queue.Full:
+            print(f"[ERROR] Notification queue full, dropped: {title}")
+            if on_sent is not None:
+                on_sent(False)
+            return False
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far has been sent (or has failed)."""
+        done = threading.Event()
+        self._queue.put(done, timeout=timeout)
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        """Send what's queued and stop, giving up after timeout seconds (the thread is a daemon)."""
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _run(self):
+        last_sent = None
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+
+            title, message, on_sent = item
+            if last_sent is not None:
+                wait = last_sent + self.min_interval - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+            last_sent = time.monotonic()
+            ok = False
+            try:
+                self.notifier.send(title, message, timeout=self.timeout)
+                ok = True
+            except subprocess.TimeoutExpired:
+                print(f"[ERROR] Notification timed out after {self.timeout}s: {title}")
+            except Exception as e:
+                print(f"[ERROR] Notification failed: {e}")
+            if on_sent is not None:
+                try:
+                    on_sent(ok)
+                except Exception as e:
+                    print(f"[ERROR] Notification callback failed: {e}")
@@ -0,0 +1,141 @@
+"""Repeating schedules for reminders.
+
+The calendar popup's Daily / Weekly / Monthly / Quarterly option used to write
+the next five dates into reminder_notifications, after which the schedule just
+stopped. A Recurrence is the rule itself, stored once in reminder_schedules, and
+works out any occurrence when it's asked for:
+
+    rule = Recurrence("monthly", datetime(2026, 1, 31, 9, 0))
+    rule.next_after(datetime(2026, 2, 1))       # 2026-02-28 09:00
+    list(rule.occurrences(start, end))          # every occurrence in [start, end)
+
+Monthly, quarterly and yearly rules count months from the start date and clamp
+to the end of short months, as the popup always did: a rule starting on the 31st
+falls on Feb 28, then Mar 31, never drifting to the 28th for good.
+"""
+from calendar import monthrange
+from datetime import datetime, timedelta
+
+# frequency -> (days, months) per step
+FREQUENCIES = {
+    "daily": (1, 0),
+    "weekly": (7, 0),
+    "monthly": (0, 1),
+    "quarterly": (0, 3),
+    "yearly": (0, 12),
+}
+
+
+def add_months(moment, months):
+    """moment moved by whole months, with the day clamped to the length of the new month."""
+    month = moment.month - 1 + months
+    year = moment.year + month // 12
+    month = month % 12 + 1
+    return moment.replace(year=year, month=month, day=min(moment.day, monthrange(year, month)[1]))
+
+
+def parse_time(value):
+    """An ISO datetime string as the naive local time, to the second, that schedules are stored in.
+
+    fromisoformat also takes a space for the 'T', fractions of a second and a UTC offset; stored
+    rows are compared with ISO bounds as text, so everything has to come out of to_row one way.
+    """
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment.replace(microsecond=0) if moment.microsecond else moment
+
+
+class Recurrence:
+    def __init__(self, frequency, start, interval=1, until=None, exdates=()):
+        """Every `interval` days / weeks / months / quarters / years from start (itself the
+        first occurrence) up to and including until, skipping the datetimes in exdates."""
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency: {frequency}")
+        if interval < 1:
+            raise ValueError(f"Interval must be at least 1, not {interval}")
+        self.frequency = frequency
+        self.start = start
+        self.interval = interval
+        self.until = until
+        self.exdates = frozenset(exdates)
+
+        days, months = FREQUENCIES[frequency]
+        self._step_days = days * interval
+        self._step_months = months * interval
+
+    def _key(self):
+        return self.frequency, self.start, self.interval, self.until, self.exdates
+
+    def __eq__(self, other):
+        return isinstance(other, Recurrence) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f"Recurrence({self.frequency!r}, {self.start!r}, interval={self.interval}, until={self.until!r})"
+
+    def occurrence(self, n):
+        """The n-th occurrence (0 is start), ignoring until and exdates."""
+        if self._step_months:
+            return add_months(self.start, n * self._step_months)
+        return self.start + timedelta(days=n * self._step_days)
+
+    def _first_index_after(self, moment):
+        # Jump straight to about the right step, then walk the last bit (clamped months can be off by one)
+        if moment < self.start:
+            return 0
+        if self._step_months:
+            months = (moment.year - self.start.year) * 12 + moment.month - self.start.month
+            n = max(0, months // self._step_months)
+        else:
+            n = (moment - self.start).days // self._step_days
+        while self.occurrence(n) <= moment:
+            n += 1
+        return n
+
+    def occurrences(self, start=None, end=None):
+        """Yield the occurrences in [start, end), in order. Without end, yields until the rule's until
+        (forever if it has none)."""
+        n = 0 if start is None else self._first_index_after(start - timedelta(microseconds=1))
+        while True:
+            moment = self.occurrence(n)
+            if (end is not None and moment >= end) or (self.until is not None and moment > self.until):
+                return
+            if moment not in self.exdates:
+                yield moment
+            n += 1
+
+    def count_from(self, moment):
+        """How many occurrences fall at or after moment, or None if the rule never ends."""
+        if self.until is None:
+            return None
+        if self.until < moment:
+            return 0
+        # Occurrence indexes run from the first at or after moment up to the last on or before until
+        first = self._first_index_after(moment - timedelta(microseconds=1))
+        end = self._first_index_after(self.until)
+        skipped = sum(1 for d in self.exdates if moment <= d <= self.until and self._is_occurrence(d))
+        return max(0, end - first - skipped)
+
+    def _is_occurrence(self, moment):
+        return self.occurrence(self._first_index_after(moment - timedelta(microseconds=1))) == moment
+
+    def next_after(self, moment):
+        """The first occurrence strictly after moment, or None once the rule has ended."""
+        return next(self.occurrences(moment + timedelta(microseconds=1)), None)
+
+    @classmethod
+    def from_row(cls, frequency, interval, starts_at, until, exdates):
+        """A Recurrence from its reminder_schedules columns (or an imported schedule's, see parse_time)."""
+        return cls(frequency, parse_time(starts_at), interval,
+                   parse_time(until) if until else None,
+                   [parse_time(d) for d in exdates.split(";")] if exdates else ())
+
+    def to_row(self):
+        """(frequency, interval, starts_at, until, exdates) for reminder_schedules, as
+        "YYYY-MM-DDTHH:MM:SS" strings so they sort as they compare."""
+        return (self.frequency, self.interval, self.start.isoformat(timespec="seconds"),
+                self.until.isoformat(timespec="seconds") if self.until else None,
+                ";".join(d.isoformat(timespec="seconds") for d in sorted(self.exdates)) or None)
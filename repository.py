@@ -0,0 +1,214 @@
+"""Cached access to folders and reminders for the UI.
+
+ReminderRepository sits in front of database.py, the DatabaseReader and the
+DatabaseWriter. It keeps the folder list and the last few folders' reminder
+lists in memory (least recently used folders are dropped first), so switching
+back to a folder, redrawing the sidebar or re-theming costs no queries at all.
+
+Writes go through the repository too. Each one drops exactly the cached folders
+it touched once it has committed, or patches the cache in place where the UI has
+already shown the change (drags, icon changes). Every read records the folder's
+version when it starts and is only cached if nothing invalidated the folder in
+the meantime, so a slow read can't put stale rows back.
+
+Only writes made through the repository are seen; a change from another process
+(a headless import, say) needs invalidate_all().
+"""
+import threading
+from collections import OrderedDict
+
+from database import (fetch_folders, fetch_folder_reminders, fetch_completed, search_reminders, insert_reminder,
+                      complete_reminder, move_reminder, rebalance_reminders,
+                      add_notification_dates, clear_completed, create_folder, remove_folder, move_folder,
+                      rebalance_folders, set_folder_icon, copy_folders, fetch_folder_counts,
+                      advance_overdue_watermark, add_schedule, fetch_occurrences)
+
+# Key shared by every read that fills the reminder area, so a newer one supersedes the rest
+VIEW_KEY = "reminders"
+COUNTS_KEY = "folder counts"
+OCCURRENCES_KEY = "occurrences"
+
+
+class ReminderRepository:
+    def __init__(self, db, reader, writer, max_folders=32, on_change=None):
+        """on_change() is called after every write commits (the app refreshes its count badges)."""
+        self.db = db
+        self.reader = reader
+        self.writer = writer
+        self.max_folders = max_folders
+        self.on_change = on_change
+
+        self._lock = threading.Lock()
+        self._folders = None
+        self._reminders = OrderedDict()  # folder name -> rows, least recently used first
+        self._versions = {}  # folder name -> bumped on every invalidation
+        self.queries = 0  # Reads that actually went to SQLite, for checking the cache works
+
+    # Reads
+
+    def folders(self):
+        """[(name, folder_order, image_path)], from the cache when possible."""
+        with self._lock:
+            if self._folders is not None:
+                return list(self._folders)
+
+        folders = fetch_folders(self.db)
+        with self._lock:
+            self.queries += 1
+            self._folders = folders
+        return list(folders)
+
+    def load_reminders(self, folder_name, on_done):
+        """Call on_done(rows) with the folder's reminders (the first Completed page for Completed).
+
+        A cached folder calls back straight away; otherwise the query runs on the reader.
+        """
+        with self._lock:
+            rows = self._reminders.get(folder_name)
+            if rows is not None:
+                self._reminders.move_to_end(folder_name)
+            version = self._versions.get(folder_name, 0)
+
+        if rows is not None:
+            self.reader.cancel(VIEW_KEY)  # A slower load for another folder mustn't land on top
+            on_done(rows)
+            return
+
+        def store(rows):
+            with self._lock:
+                self.queries += 1
+                if self._versions.get(folder_name, 0) == version:
+                    self._reminders[folder_name] = rows
+                    self._reminders.move_to_end(folder_name)
+                    while len(self._reminders) > self.max_folders:
+                        self._reminders.popitem(last=False)
+            on_done(rows)
+
+        if folder_name == "Completed":
+            self.reader.submit(VIEW_KEY, fetch_completed, on_done=store)
+        else:
+            self.reader.submit(VIEW_KEY, fetch_folder_reminders, folder_name, on_done=store)
+
+    def load_more_completed(self, before_id, on_done):
+        # Later pages of the archive aren't cached, only the first one is
+        self.reader.submit(VIEW_KEY, fetch_completed, before_id, on_done=on_done)
+
+    def search(self, query, on_done):
+        self.reader.submit(VIEW_KEY, search_reminders, query, on_done=on_done)
+
+    def folder_counts(self, on_done):
+        # Not cached: the counters table is already the cheap version, and overdue changes with the clock
+        self.reader.submit(COUNTS_KEY, fetch_folder_counts, on_done=on_done)
+
+    def occurrences(self, start, end, on_done, folder_name=None):
+        """on_done([(reminder_id, text, due, folder_name)]) with everything due in [start, end), in time order."""
+        self.reader.submit(OCCURRENCES_KEY, fetch_occurrences, start, end, folder_name, on_done=on_done)
+
+    # Invalidation
+
+    def invalidate(self, *folder_names):
+        with self._lock:
+            for name in folder_names:
+                self._reminders.pop(name, None)
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    def invalidate_folders(self):
+        with self._lock:
+            self._folders = None
+
+    def invalidate_all(self):
+        with self._lock:
+            names = set(self._reminders) | set(self._versions)
+        self.invalidate(*names)
+        self.invalidate_folders()
+
+    # Writes
+
+    def _write(self, func, *args, affected=None, folder_list=False, on_done=None, on_error=None):
+        """Submit func to the writer. Once it commits, drop the folders affected(result) names,
+        and the folder list too if folder_list is set."""
+        def done(result):
+            if folder_list:
+                self.invalidate_folders()
+            if affected is not None:
+                self.invalidate(*affected(result))
+            if on_done is not None:
+                on_done(result)
+            if self.on_change is not None:
+                self.on_change()
+
+        def failed(error):
+            # The cache may have been patched ahead of the write, don't trust it
+            self.invalidate_all()
+            if on_error is not None:
+                on_error(error)
+            else:
+                print(f"[ERROR] Background write failed: {error}")
+
+        self.writer.submit(func, *args, on_done=done, on_error=failed)
+
+    def add_reminder(self, text, folder_name, urgency_level, notify_at, add_to_recurring=False, on_done=None):
+        folders = [folder_name] + [name for name, _ in copy_folders(folder_name, urgency_level, add_to_recurring)]
+        self._write(insert_reminder, text, folder_name, urgency_level, notify_at, add_to_recurring,
+                    affected=lambda _: folders, on_done=on_done)
+
+    def complete(self, reminder_id, on_done=None):
+        self._write(complete_reminder, reminder_id,
+                    affected=lambda result: list(result[1]) + ["Completed"], on_done=on_done)
+
+    def add_dates(self, reminder_id, dates, on_done=None):
+        self._write(add_notification_dates, reminder_id, dates,
+                    affected=lambda result: [result[1]] if result[1] else [], on_done=on_done)
+
+    def add_schedule(self, reminder_id, rule, on_done=None):
+        self._write(add_schedule, reminder_id, rule,
+                    affected=lambda result: [result[1]] if result[1] else [], on_done=on_done)
+
+    def clear_completed(self, on_done=None):
+        self._write(clear_completed, affected=lambda _: ["Completed"], on_done=on_done)
+
+    def move_reminder(self, folder_name, reminder_id, before_id=None, after_id=None):
+        # The widgets are already in their new places, so move the cached row to match
+        with self._lock:
+            rows = self._reminders.get(folder_name)
+            if rows is not None:
+                by_id = {row[0]: row for row in rows}
+                if reminder_id in by_id:
+                    moved = by_id[reminder_id]
+                    rows = [row for row in rows if row[0] != reminder_id]
+                    index = next((i for i, row in enumerate(rows) if row[0] == after_id), len(rows))
+                    rows.insert(index, moved)
+                    self._reminders[folder_name] = rows
+
+        def done(tight):
+            if tight:
+                # Keys around here are nearly used up, respace the folder (same order, cache still good)
+                self.writer.submit(rebalance_reminders, folder_name)
+
+        self._write(move_reminder, reminder_id, before_id, after_id, on_done=done)
+
+    def create_folder(self, folder_name, on_done=None):
+        self._write(create_folder, folder_name, folder_list=True, on_done=on_done)
+
+    def remove_folder(self, folder_name, on_done=None):
+        self._write(remove_folder, folder_name, affected=lambda _: [folder_name], folder_list=True, on_done=on_done)
+
+    def move_folder(self, folder_name, before_name=None, after_name=None, on_done=None):
+        def done(tight):
+            if tight:
+                self.writer.submit(rebalance_folders, on_done=lambda _: self.invalidate_folders())
+            if on_done is not None:
+                on_done(tight)
+
+        self._write(move_folder, folder_name, before_name, after_name, folder_list=True, on_done=done)
+
+    def advance_overdue(self):
+        self.writer.submit(advance_overdue_watermark)
+
+    def set_folder_icon(self, folder_name, image_path, on_done=None):
+        # Write-through: the cached list gets the new icon now, no need to read the folders back
+        with self._lock:
+            if self._folders is not None:
+                self._folders = [(name, order, image_path if name == folder_name else path)
+                                 for name, order, path in self._folders]
+        self._write(set_folder_icon, folder_name, image_path, on_done=on_done)
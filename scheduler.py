@@ -0,0 +1,267 @@
+"""Notification scheduling for the Reminders app.
+
+Notifications used to be a Clock.schedule_once per date, made when the date was
+added, so a restart silently dropped every one of them. NotificationScheduler
+keeps all pending due times in one min-heap instead, filled from the database at
+startup (database.fetch_pending_notifications) and kept up to date as reminders
+are added, get extra dates or are completed. Only one timer is ever armed, for
+whatever is due first, however many reminders are waiting. A repeating schedule
+sits in the heap as its next occurrence only; when that fires, the one after it
+goes in (see recurrence.py).
+
+Reminders due close together (a 9:00 daily schedule on a dozen reminders) are
+handed to notify() as one batch, everything due within COALESCE_WINDOW of the
+first, so the app can show one grouped notification instead of a dozen. Anything
+due up to the end of the last batch counts as delivered and isn't scheduled again.
+
+Each tick also compares how far the wall clock and the monotonic clock have moved
+since the timer was armed. The monotonic clock stops while the machine sleeps, so
+a wall clock well ahead of it means the machine has just woken up. on_wake() is
+asked for whatever the database has that fell due since it went to sleep, and
+that goes out with everything on the heap as one batch (see catch_up(), which
+the app also uses at startup for what fell due while it was closed). The app
+reads it on a background thread and calls catch_up() itself once it has it;
+until then, or for MAX_SLEEP seconds at most, nothing else goes out.
+
+Completing a reminder doesn't dig its entries out of the heap; they're skipped
+when they reach the top, and the heap is rebuilt once more than half of it is
+dead. Nothing here touches Kivy or SQLite, the app hands in arm() and notify(),
+and optionally a LatencyRecorder (latency.py) to time each delivery.
+"""
+import heapq
+import itertools
+import time
+from datetime import datetime, timedelta
+from operator import itemgetter
+
+# Longest the timer sleeps in one go, so a wall-clock change (or a laptop waking up)
+# is noticed within this many seconds
+MAX_SLEEP = 60
+
+# Seconds after the first due item that others are delivered along with it. Due times
+# are mostly whole minutes, so reminders on the same minute are grouped whatever this is
+COALESCE_WINDOW = 10
+
+# Seconds the wall clock can get ahead of the monotonic clock between ticks before it
+# counts as the machine having slept
+SLEEP_THRESHOLD = 30
+
+
+class NotificationScheduler:
+    def __init__(self, notify, arm, now=datetime.now, coalesce=COALESCE_WINDOW, on_wake=None, latency=None):
+        """notify(items) delivers [(reminder_id, text, due, folder_name)] that fell due together.
+
+        arm(delay, callback) must call callback() after delay seconds and return something
+        with a cancel() method (a Kivy ClockEvent, a threading.Timer).
+
+        on_wake(since) is called when a tick finds the machine slept after the datetime since, and
+        returns what fell due in the meantime as catch_up() takes it; that and whatever is left on
+        the heap go to notify() together. If it returns None instead, it has gone to fetch them and
+        will pass them to catch_up() (and hand its result to notify()) itself. With on_wake set the
+        timer keeps ticking every MAX_SLEEP seconds even with nothing pending.
+
+        latency, a latency.LatencyRecorder, is told about everything handed to notify().
+        """
+        self.notify = notify
+        self.arm = arm
+        self.now = now
+        self.coalesce = timedelta(seconds=coalesce)
+        self.on_wake = on_wake
+        self.latency = latency
+
+        self._heap = []  # (due, reminder_id, sequence number, text, folder_name, rule)
+        self._sequence = itertools.count()  # Tie-breaker, so entries never compare their rules
+        self._pending = {}  # reminder_id -> {(due, rule)} still to fire; anything else in the heap is dead
+        self._dead = 0
+        self._delivered_through = datetime.min
+        self._timer = None
+        self._armed_for = None
+        self._armed_at = None  # (wall clock, monotonic clock) when the timer was armed
+        self._waking = False  # Waiting on an on_wake() read to call catch_up()
+
+    def __len__(self):
+        return len(self._heap) - self._dead
+
+    @property
+    def delivered_through(self):
+        """Everything due up to this datetime has been handed to notify() (or returned by catch_up())."""
+        return self._delivered_through
+
+    def load(self, pending):
+        """Add [(reminder_id, text, due, folder_name, rule)], e.g. from fetch_pending_notifications.
+        Duplicates are ignored, so it's safe to call after some add()s have already gone in."""
+        done = max(self.now(), self._delivered_through)
+        for reminder_id, text, due, folder_name, rule in pending:
+            entry = self._entry(reminder_id, text, due, folder_name, rule, done)
+            if entry is not None:
+                self._heap.append(entry)
+        heapq.heapify(self._heap)
+        self._rearm()
+
+    def add(self, reminder_id, text, due, folder_name=None, rule=None):
+        """Schedule one notification, or with rule (a Recurrence) a repeating one whose next
+        occurrence is due. Past and duplicate due times are ignored."""
+        entry = self._entry(reminder_id, text, due, folder_name, rule, max(self.now(), self._delivered_through))
+        if entry is not None:
+            heapq.heappush(self._heap, entry)
+            self._rearm()
+
+    def _entry(self, reminder_id, text, due, folder_name, rule, done):
+        if due <= done and rule is not None:
+            due = rule.next_after(done)
+        if due is None or due <= done or not self._track(reminder_id, (due, rule)):
+            return None
+        return due, reminder_id, next(self._sequence), text, folder_name, rule
+
+    def remove(self, reminder_id):
+        """Forget every pending notification for a reminder (it's been completed)."""
+        self._dead += len(self._pending.pop(reminder_id, ()))
+        if self._dead > len(self._heap) // 2:
+            self._heap = [entry for entry in self._heap if self._is_live(entry)]
+            heapq.heapify(self._heap)
+            self._dead = 0
+        self._rearm()
+
+    def clear(self):
+        """Drop everything pending (to load() afresh); what's been delivered stays delivered."""
+        self._heap, self._pending, self._dead = [], {}, 0
+        self._rearm()
+
+    def next_due(self):
+        """The earliest pending due time, or None."""
+        self._drop_dead()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None):
+        """Take every entry due by now off the heap and return them, earliest first,
+        as [(reminder_id, text, due, folder_name)]."""
+        now = now or self.now()
+        due = []
+        self._drop_dead()
+        while self._heap and self._heap[0][0] <= now:
+            when, reminder_id, _, text, folder_name, rule = heapq.heappop(self._heap)
+            self._untrack(reminder_id, (when, rule))
+            due.append((reminder_id, text, when, folder_name))
+            if rule is not None:
+                # Straight on to the next occurrence after this one (or after now, having slept through some)
+                entry = self._entry(reminder_id, text, when, folder_name, rule, max(when, now))
+                if entry is not None:
+                    heapq.heappush(self._heap, entry)
+            self._drop_dead()
+        return due
+
+    def catch_up(self, missed, since=None, now=None):
+        """Everything due by now that hasn't been delivered, as [(reminder_id, text, due, folder_name)],
+        earliest first; from then on everything up to now counts as delivered.
+
+        missed is [(reminder_id, text, due, folder_name, rule)] from the database (see
+        database.fetch_missed_notifications), for what fell due while the app was closed or
+        the machine slept; whatever is still on the heap is taken along with it. since is the
+        datetime missed was read after, anything due by then is left out (by default none is).
+
+        The rows are only checked against since, not against what has gone out in the meantime:
+        a tick can fire while they're being read and move delivered_through past all of them.
+        Anything announced twice that way is dropped by database.claim_notifications.
+        """
+        now = now or self.now()
+        due = self.pop_due(now)
+        seen = {(reminder_id, when) for reminder_id, _, when, _ in due}
+        self._delivered_through = max(self._delivered_through, now)
+
+        for reminder_id, text, when, folder_name, rule in missed:
+            if (since is None or since < when) and when <= now and (reminder_id, when) not in seen:
+                seen.add((reminder_id, when))
+                due.append((reminder_id, text, when, folder_name))
+            if rule is not None:
+                # Its next occurrence after now; pushed straight on, the timer is rearmed once below
+                entry = self._entry(reminder_id, text, when, folder_name, rule, self._delivered_through)
+                if entry is not None:
+                    heapq.heappush(self._heap, entry)
+
+        due.sort(key=itemgetter(2))
+        self._waking = False
+        self._rearm()
+        return due
+
+    def cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self._armed_for = None
+
+    def _fire(self):
+        armed_wall, armed_monotonic = self._armed_at
+        self._timer = self._armed_for = None
+
+        # The monotonic clock doesn't run while the machine sleeps
+        slept = (self.now() - armed_wall).total_seconds() - (time.monotonic() - armed_monotonic)
+        due = None
+        caught_up = False
+        if self._waking:
+            # The catch-up read never came back, go on without it
+            print("[ERROR] Catch-up after sleep timed out")
+            self._waking = False
+        elif self.on_wake is not None and slept > SLEEP_THRESHOLD:
+            try:
+                missed = self.on_wake(armed_wall)
+                if missed is None:
+                    # Being read in the background; hold everything back so it all goes out together
+                    self._waking = True
+                    self._rearm()
+                    return
+                due = self.catch_up(missed, armed_wall)
+                caught_up = True
+            except Exception as e:
+                print(f"[ERROR] Catch-up failed: {e}")
+
+        if due is None:
+            due = self.pop_due()
+            if due:
+                # Take whatever is about to fall due along with it
+                due += self.pop_due(due[0][2] + self.coalesce)
+                self._delivered_through = max(self._delivered_through, due[0][2] + self.coalesce, due[-1][2])
+        if due:
+            if self.latency is not None:
+                self.latency.dispatched(due, self.now(), caught_up)
+            try:
+                self.notify(due)
+            except Exception as e:
+                print(f"[ERROR] Notification failed: {e}")
+        self._rearm()
+
+    def _rearm(self):
+        if self._waking and self._timer is not None:
+            return  # Only the timeout for the catch-up read
+        next_due = None if self._waking else self.next_due()
+        if next_due == self._armed_for and self._timer is not None:
+            return  # Already waiting for exactly this one
+        self.cancel()
+        if next_due is None and self.on_wake is None:
+            return
+        now = self.now()
+        delay = MAX_SLEEP if next_due is None else max(0, min((next_due - now).total_seconds(), MAX_SLEEP))
+        self._armed_for = next_due
+        self._armed_at = (now, time.monotonic())
+        self._timer = self.arm(delay, self._fire)
+
+    def _track(self, reminder_id, key):
+        keys = self._pending.setdefault(reminder_id, set())
+        if key in keys:
+            return False
+        keys.add(key)
+        return True
+
+    def _untrack(self, reminder_id, key):
+        keys = self._pending.get(reminder_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._pending[reminder_id]
+
+    def _is_live(self, entry):
+        due, reminder_id, _, _, _, rule = entry
+        return (due, rule) in self._pending.get(reminder_id, ())
+
+    def _drop_dead(self):
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+            self._dead -= 1
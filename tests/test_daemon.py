@@ -0,0 +1,32 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database import insert_reminder, fetch_delivery_history
+from daemon import NotificationDaemon
+from notifiers import MemoryNotifier
+
+
+def run_for(daemon, seconds):
+    stop = threading.Event()
+    thread = threading.Thread(target=daemon.run, args=(stop,))
+    thread.start()
+    time.sleep(seconds)
+    stop.set()
+    thread.join(5)
+    assert not thread.is_alive()
+
+
+def test_waits_for_the_app_instead_of_creating_the_database(tmp_path):
+    path = tmp_path / "reminders.db"
+    run_for(NotificationDaemon(str(path), notifier=MemoryNotifier()), 0.2)
+    assert not path.exists()
+
+
+def test_announces_and_claims_a_due_reminder(db):
+    insert_reminder(db, "Stand up", "Work", 1, (datetime.now() + timedelta(seconds=1)).replace(microsecond=0))
+    notifier = MemoryNotifier()
+    run_for(NotificationDaemon(db.db_path, notifier=notifier), 2.5)
+
+    assert [title for title, _ in notifier.sent] == ["Reminder"]
+    assert [(text, fired_by) for _, text, _, _, fired_by in fetch_delivery_history(db)] == [("Stand up", "daemon")]
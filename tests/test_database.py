@@ -0,0 +1,148 @@
+from datetime import datetime, timedelta
+
+from database import (insert_reminder, add_notification_dates, add_schedule, fetch_folder_reminders, search_reminders,
+                      fetch_pending_notifications, claim_notifications, fetch_delivery_history, set_delivered_through,
+                      get_delivered_through, move_reminder, complete_reminder, fetch_completed, fetch_occurrences,
+                      fetch_folder_counts, advance_overdue_watermark)
+from recurrence import Recurrence
+
+SOON = (datetime.now() + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+
+
+def folder(db, name):
+    return {text: (dates, count) for _, text, _, dates, count in fetch_folder_reminders(db, name)}
+
+
+def test_folder_view_counts_stored_dates_and_schedule_occurrences(db):
+    plain = insert_reminder(db, "Plain", "Work", 1, SOON)
+    add_notification_dates(db, plain, [SOON + timedelta(days=3), SOON + timedelta(days=2)])
+    weekly = insert_reminder(db, "Four weeks", "Work", 1, None)
+    add_schedule(db, weekly, Recurrence("weekly", SOON, until=SOON + timedelta(weeks=3)))
+    forever = insert_reminder(db, "Forever", "Work", 1, None)
+    add_schedule(db, forever, Recurrence("daily", SOON))
+
+    reminders = folder(db, "Work")
+    assert reminders["Plain"] == ([SOON, SOON + timedelta(days=2)], 3)
+    assert reminders["Four weeks"] == ([SOON, SOON + timedelta(weeks=1)], 4)
+    assert reminders["Forever"] == ([SOON, SOON + timedelta(days=1)], None)
+
+
+def test_search_gathers_dates_and_schedules_from_every_copy(db):
+    original = insert_reminder(db, "Water the plants", "Home", 1, SOON)
+    (copy,) = [reminder_id for reminder_id, text, *_ in fetch_folder_reminders(db, "Non-Completed")
+               if text == "Water the plants"]
+    add_notification_dates(db, original, [SOON + timedelta(days=5)])
+    add_notification_dates(db, copy, [SOON + timedelta(days=2), SOON + timedelta(days=5)])
+    add_schedule(db, copy, Recurrence("weekly", SOON, until=SOON + timedelta(weeks=1)))
+
+    [(reminder_id, _, _, dates, count, folder_name)] = search_reminders(db, "plants")
+    assert (reminder_id, folder_name) == (original, "Home")
+    assert dates == [SOON, SOON]  # Its own date, and the schedule's first occurrence
+    assert count == 1 + 2 + 2  # notify_at, the two distinct extra dates and two weekly occurrences
+
+
+def test_claims_are_at_most_once_and_hide_pending_dates(db):
+    reminder = insert_reminder(db, "Take out the bins", "Home", 1, SOON)
+    pending = [item[:4] for item in fetch_pending_notifications(db)]
+    assert [text for _, text, _, _ in pending] == ["Take out the bins"]
+
+    assert claim_notifications(db, pending, "daemon") == pending
+    assert claim_notifications(db, pending, "app") == []
+    assert fetch_pending_notifications(db) == []
+    assert [(reminder_id, by) for reminder_id, _, _, _, by in fetch_delivery_history(db)] == [(reminder, "daemon")]
+
+
+def test_delivered_through_never_moves_back(db):
+    set_delivered_through(db, SOON)
+    set_delivered_through(db, SOON - timedelta(hours=1))
+    assert get_delivered_through(db) == SOON
+
+
+def test_moving_a_reminder_touches_one_row(db):
+    a, b, c = (insert_reminder(db, text, "Work", 1, None) for text in "ABC")
+    with db.cursor() as cursor:
+        cursor.execute("SELECT id, reminder_order FROM reminders WHERE folder_name = 'Work'")
+        before = dict(cursor.fetchall())
+
+    assert move_reminder(db, c, a, b) is False
+    assert [text for _, text, *_ in fetch_folder_reminders(db, "Work")] == ["A", "C", "B"]
+    with db.cursor() as cursor:
+        cursor.execute("SELECT id, reminder_order FROM reminders WHERE folder_name = 'Work'")
+        after = dict(cursor.fetchall())
+    assert {rid for rid in before if before[rid] != after[rid]} == {c}
+
+
+def test_completing_removes_every_copy_and_archives_once(db):
+    reminder = insert_reminder(db, "Renew passport", "Travel", 3, SOON, add_to_recurring=True)
+    original, folders = complete_reminder(db, reminder)
+    assert original == reminder
+    assert set(folders) == {"Travel", "Recurring", "Pinned"}
+    for folder_name in folders:
+        assert fetch_folder_reminders(db, folder_name) == []
+    assert [text for _, text in fetch_completed(db)] == ["Renew passport"]
+    assert fetch_pending_notifications(db) == []
+
+
+def test_occurrences_merge_dates_and_schedules_in_time_order(db):
+    one_off = insert_reminder(db, "One-off", "Work", 1, SOON + timedelta(hours=1))
+    add_notification_dates(db, one_off, [SOON + timedelta(days=1, hours=2)])
+    daily = insert_reminder(db, "Daily", "Work", 1, None)
+    add_schedule(db, daily, Recurrence("daily", SOON))
+
+    occurrences = fetch_occurrences(db, SOON, SOON + timedelta(days=2), "Work")
+    assert [(text, due - SOON) for _, text, due, _ in occurrences] == [
+        ("Daily", timedelta(0)), ("One-off", timedelta(hours=1)),
+        ("Daily", timedelta(days=1)), ("One-off", timedelta(days=1, hours=2))]
+    assert len(fetch_occurrences(db, SOON, SOON + timedelta(days=30), limit=3)) == 3
+
+
+def test_occurrences_on_a_reminder_and_its_copy_count_once(db):
+    original = insert_reminder(db, "Water the plants", "Home", 1, None)
+    (copy,) = [reminder_id for reminder_id, text, *_ in fetch_folder_reminders(db, "Non-Completed")
+               if text == "Water the plants"]
+    for reminder_id in (original, copy):
+        add_notification_dates(db, reminder_id, [SOON])
+        add_schedule(db, reminder_id, Recurrence("daily", SOON + timedelta(hours=1)))
+
+    occurrences = fetch_occurrences(db, SOON, SOON + timedelta(days=2))
+    assert [(reminder_id, due - SOON) for reminder_id, _, due, _ in occurrences] == [
+        (original, timedelta(0)), (original, timedelta(hours=1)), (original, timedelta(days=1, hours=1))]
+    assert len(fetch_occurrences(db, SOON, SOON + timedelta(days=2), "Home")) == 3
+
+
+def stored_counts(db, folder_name):
+    """(open, overdue) as the triggers left them in folder_counters, without the reader's range read."""
+    with db.cursor() as cursor:
+        cursor.execute("SELECT open_count, overdue_count FROM folder_counters WHERE folder_name = ?", (folder_name,))
+        return cursor.fetchone()
+
+
+def test_counters_follow_inserts_completions_and_moves(db):
+    late = insert_reminder(db, "Late", "Work", 1, datetime.now() - timedelta(days=1))
+    later = insert_reminder(db, "Later", "Work", 1, SOON)
+    assert stored_counts(db, "Work") == (2, 1)
+    assert stored_counts(db, "Non-Completed") == (2, 1)  # The copies count where they are
+
+    complete_reminder(db, late)
+    assert stored_counts(db, "Work") == (1, 0)
+    assert stored_counts(db, "Non-Completed") == (1, 0)
+
+    with db.transaction() as cursor:
+        cursor.execute("UPDATE reminders SET folder_name = 'Home' WHERE id = ?", (later,))
+    assert stored_counts(db, "Work") == (0, 0)
+    assert stored_counts(db, "Home") == (1, 0)
+    assert fetch_folder_counts(db)["Home"] == (1, 0, 0)
+
+
+def test_falling_due_after_the_watermark_counts_as_overdue(db):
+    insert_reminder(db, "In an hour", "Work", 1, datetime.now() + timedelta(hours=1))
+    later = datetime.now() + timedelta(hours=2)
+    assert fetch_folder_counts(db)["Work"][:2] == (1, 0)
+    assert fetch_folder_counts(db, later)["Work"][:2] == (1, 1)  # Read past the watermark
+    assert stored_counts(db, "Work") == (1, 0)
+
+    advance_overdue_watermark(db, later)
+    assert stored_counts(db, "Work") == (1, 1)
+    assert fetch_folder_counts(db, later)["Work"][:2] == (1, 1)  # Folded in, not counted twice
+    advance_overdue_watermark(db, later)
+    assert stored_counts(db, "Work") == (1, 1)
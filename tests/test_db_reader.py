@@ -0,0 +1,42 @@
+import threading
+
+from db_reader import DatabaseReader
+
+
+def blocked(started, release, result):
+    def read(db):
+        started.set()
+        assert release.wait(5)
+        return result
+    return read
+
+
+def test_a_read_superseded_while_running_is_dropped(db):
+    reader = DatabaseReader(db)
+    delivered = []
+    started, release = threading.Event(), threading.Event()
+    older = reader.submit("reminders", blocked(started, release, "Work"), on_done=delivered.append)
+    assert started.wait(5)
+    newer = reader.submit("reminders", lambda db: "Home", on_done=delivered.append)
+    newer.result(5)
+    release.set()
+    assert older.result(5) == "Work"  # It ran to the end, only its result went nowhere
+    reader.close()
+
+    assert delivered == ["Home"]
+
+
+def test_a_read_superseded_before_it_starts_is_cancelled(db):
+    reader = DatabaseReader(db, workers=1)
+    delivered = []
+    started, release = threading.Event(), threading.Event()
+    reader.submit("busy", blocked(started, release, None))
+    assert started.wait(5)  # The only worker is taken
+    queued = reader.submit("reminders", lambda db: "Work", on_done=delivered.append)
+    newer = reader.submit("reminders", lambda db: "Home", on_done=delivered.append)
+    assert queued.cancelled()
+    release.set()
+    newer.result(5)
+    reader.close()
+
+    assert delivered == ["Home"]
@@ -0,0 +1,13 @@
+from database import insert_reminder
+from db_writer import DatabaseWriter
+
+
+def test_inline_callbacks_run_even_if_dispatch_never_does(db):
+    held, done = [], []
+    writer = DatabaseWriter(db, dispatch=held.append)  # A UI thread that has already stopped
+    writer.submit(insert_reminder, "Queued", "Non-Completed", 1, None, on_done=done.append, inline=True)
+    writer.submit(insert_reminder, "Also queued", "Non-Completed", 1, None, on_done=done.append)
+    writer.close()
+
+    assert len(done) == 1
+    assert len(held) == 1
@@ -0,0 +1,73 @@
+import json
+from datetime import datetime, timedelta
+
+from database import (ConnectionManager, setup_database, insert_reminder, add_notification_dates, add_schedule,
+                      create_folder, move_folder, set_folder_icon, complete_reminder, fetch_folders,
+                      fetch_folder_reminders, fetch_completed)
+from db_writer import DatabaseWriter
+from exporter import export_file
+from importer import import_file
+from recurrence import Recurrence
+
+SOON = (datetime.now() + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+
+
+def test_import_survives_a_writer_commit_mid_chunk(db, tmp_path):
+    path = tmp_path / "reminders.jsonl"
+    path.write_text("\n".join(json.dumps({"text": f"Imported {i}", "folder": "Work", "notify_at": "2030-01-01 09:00"})
+                              for i in range(50)))
+
+    writer = DatabaseWriter(db)
+    flushed = []
+
+    def commit_alongside(statement):
+        # Once the import's transaction has read, another connection tries to commit
+        if "INSERT OR IGNORE INTO folders" in statement and not flushed:
+            writer.submit(insert_reminder, "Added meanwhile", "Non-Completed", 1, None)
+            flushed.append(writer.flush(timeout=0.5))
+
+    db.connection.set_trace_callback(commit_alongside)
+    try:
+        result = import_file(db, str(path))
+    finally:
+        db.connection.set_trace_callback(None)
+    writer.close()
+
+    assert result.imported == 50
+    assert flushed == [False]  # The writer waited for the import instead of committing under it
+    with db.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM reminders WHERE folder_name = 'Work'")
+        assert cursor.fetchone()[0] == 50
+        cursor.execute("SELECT COUNT(*) FROM reminders WHERE text = 'Added meanwhile'")
+        assert cursor.fetchone()[0] == 1
+
+
+def sidebar(db):
+    return [(name, image_path) for name, _, image_path in sorted(fetch_folders(db), key=lambda f: f[1])]
+
+
+def test_backup_round_trip_keeps_folders_schedules_and_the_archive(db, tmp_path):
+    for name in ("Work", "Empty", "Home"):
+        create_folder(db, name)
+    move_folder(db, "Home", None, "Work")  # Home first
+    set_folder_icon(db, "Empty", "/icons/empty.png")
+    reminder = insert_reminder(db, "Standup", "Work", 2, SOON)
+    add_notification_dates(db, reminder, [SOON + timedelta(days=2)])
+    add_schedule(db, reminder, Recurrence("weekly", SOON, until=SOON + timedelta(weeks=4)))
+    complete_reminder(db, insert_reminder(db, "Done already", "Home", 1, None))
+
+    path = str(tmp_path / "backup.jsonl")
+    export_file(db, path)
+    restored = ConnectionManager(str(tmp_path / "restored.db"))
+    setup_database(restored)
+    try:
+        result = import_file(restored, path)
+        assert (result.imported, result.folders, result.completed, result.skipped) == (1, 3, 1, 0)
+        assert sidebar(restored) == sidebar(db)
+        assert fetch_folder_reminders(restored, "Work")[0][1:] == fetch_folder_reminders(db, "Work")[0][1:]
+        assert [text for _, text in fetch_completed(restored)] == ["Done already"]
+
+        import_file(restored, path)  # A second restore adds no folders and keeps the icons
+        assert sidebar(restored) == sidebar(db)
+    finally:
+        restored.close()
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+from database import (ConnectionManager, setup_database, to_epoch, fetch_folder_reminders, fetch_folder_counts,
+                      fetch_pending_notifications)
+from migrations import MIGRATIONS, SCHEMA_VERSION, migrate, schema_version
+
+
+def test_a_current_database_is_left_alone(db):
+    assert schema_version(db) == SCHEMA_VERSION
+    assert migrate(db) == []
+
+
+def test_text_dates_from_version_11_become_epoch_seconds(tmp_path):
+    db = ConnectionManager(str(tmp_path / "old.db"))
+    try:
+        with db.transaction() as cursor:
+            for step in MIGRATIONS[:11]:
+                step(cursor)
+            cursor.execute("PRAGMA user_version = 11")
+            cursor.execute("INSERT INTO folders (name, folder_order) VALUES ('Work', 4096)")
+            # The two shapes the app used to write: add_reminder's, and the calendar popup's ISO
+            cursor.execute("INSERT INTO reminders (text, folder_name, notify_at) VALUES ('Old', 'Work', '2030-03-01 09:30')")
+            cursor.execute("INSERT INTO reminder_notifications (reminder_id, reminder_text, folder_name, notify_at) "
+                           "VALUES (last_insert_rowid(), 'Old', 'Work', '2030-03-02T10:00:00')")
+            cursor.execute("INSERT INTO reminders (text, folder_name, notify_at) VALUES ('Undated', 'Work', '')")
+
+        setup_database(db)
+        assert schema_version(db) == SCHEMA_VERSION
+        with db.cursor() as cursor:
+            cursor.execute("SELECT text, due_at FROM reminders ORDER BY id")
+            assert cursor.fetchall() == [("Old", to_epoch(datetime(2030, 3, 1, 9, 30))), ("Undated", None)]
+
+        dates = {text: (dates, count) for _, text, _, dates, count in fetch_folder_reminders(db, "Work")}
+        assert dates["Old"] == ([datetime(2030, 3, 1, 9, 30), datetime(2030, 3, 2, 10, 0)], 2)
+        assert fetch_folder_counts(db)["Work"][0] == 2
+    finally:
+        db.close()
+
+
+def test_schedule_times_from_version_14_are_made_iso(tmp_path):
+    db = ConnectionManager(str(tmp_path / "old.db"))
+    try:
+        with db.transaction() as cursor:
+            for step in MIGRATIONS[:14]:
+                step(cursor)
+            cursor.execute("PRAGMA user_version = 14")
+            cursor.execute("INSERT INTO reminders (text, folder_name) VALUES ('Imported', 'Work')")
+            cursor.execute("INSERT INTO reminder_schedules (reminder_id, folder_name, frequency, starts_at, until) "
+                           "VALUES (last_insert_rowid(), 'Work', 'daily', '2030-03-01 09:30:00.5', '2030-03-05 09:30')")
+
+        setup_database(db)
+        with db.cursor() as cursor:
+            cursor.execute("SELECT starts_at, until FROM reminder_schedules")
+            assert cursor.fetchall() == [("2030-03-01T09:30:00", "2030-03-05T09:30:00")]
+        # Ends on the 5th: "2030-03-05 09:30" sorted before the bound "2030-03-05T00:00:00" as it was
+        pending = fetch_pending_notifications(db, datetime(2030, 3, 5), datetime(2030, 3, 6))
+        assert [due for _, _, due, _, _ in pending] == [datetime(2030, 3, 5, 9, 30)]
+    finally:
+        db.close()
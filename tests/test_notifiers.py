@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+from latency import LatencyRecorder, percentile
+from notifiers import NotificationDispatcher, MemoryNotifier, batch_message
+
+DUE = datetime(2030, 1, 1, 9, 0)
+
+
+def test_batch_message_groups_and_marks_missed():
+    one = [(1, "Stretch", DUE, "Health")]
+    assert batch_message(one, DUE)[0] == "Reminder"
+    assert batch_message(one, DUE + timedelta(hours=1))[0] == "Missed reminder"
+
+    many = [(i, f"R{i}", DUE, "Work" if i % 2 else "Home") for i in range(5)]
+    title, message = batch_message(many, DUE)
+    assert title == "5 reminders due"
+    assert message.splitlines()[0] == "Home: 3, Work: 2"
+    assert message.splitlines()[-1] == "and 2 more"
+
+
+class FailingNotifier:
+    def send(self, title, message, timeout=None):
+        raise OSError("no desktop")
+
+
+def test_dispatcher_reports_each_send():
+    results = []
+    for notifier, expected in ((MemoryNotifier(), True), (FailingNotifier(), False)):
+        dispatcher = NotificationDispatcher(notifier, min_interval=0)
+        dispatcher.send("Reminder", "Stretch", on_sent=results.append)
+        dispatcher.close(timeout=5)
+        assert results.pop() is expected
+
+
+def test_latency_percentiles_leave_out_catch_ups():
+    latency = LatencyRecorder(size=100)
+    items = [(i, "R", DUE, None) for i in range(10)]
+    for i, item in enumerate(items):
+        latency.dispatched([item], DUE + timedelta(seconds=i))
+    latency.completed(items[:5], True, DUE + timedelta(seconds=20))
+    latency.dispatched([(99, "R", DUE - timedelta(hours=5), None)], DUE, caught_up=True)
+
+    summary = latency.percentiles()
+    assert summary["count"] == 10
+    assert summary["dispatch"] == {"p50": 4.0, "p95": 9.0, "p99": 9.0}
+    assert summary["delivery"]["p50"] == 20.0
+    assert percentile([], 50) is None
@@ -0,0 +1,19 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from check_query_plans import check
+
+
+def test_hot_paths_use_an_index(db):
+    checked, failures = check(db)
+    assert checked > 40
+    assert failures == []
+
+
+def test_a_lost_index_is_caught(db):
+    with db.cursor() as cursor:
+        cursor.execute("DROP INDEX idx_reminders_folder_order")
+    _, failures = check(db)
+    assert "load_reminders" in {name for name, _, _ in failures}
@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from recurrence import Recurrence, add_months
+
+START = datetime(2026, 1, 31, 9, 0)
+
+
+def test_add_months_clamps_to_the_end_of_short_months():
+    assert add_months(START, 1) == datetime(2026, 2, 28, 9, 0)
+    assert add_months(START, 13) == datetime(2027, 2, 28, 9, 0)
+    assert add_months(datetime(2027, 11, 30), 3) == datetime(2028, 2, 29)
+
+
+def test_monthly_counts_from_the_start_so_it_never_drifts():
+    rule = Recurrence("monthly", START)
+    assert list(rule.occurrences(START, datetime(2026, 5, 1))) == [
+        datetime(2026, 1, 31, 9, 0), datetime(2026, 2, 28, 9, 0),
+        datetime(2026, 3, 31, 9, 0), datetime(2026, 4, 30, 9, 0)]
+
+
+def test_occurrences_respect_interval_until_and_exdates():
+    rule = Recurrence("weekly", START, interval=2, until=datetime(2026, 3, 31),
+                      exdates=[datetime(2026, 2, 28, 9, 0)])
+    assert list(rule.occurrences()) == [datetime(2026, 1, 31, 9, 0), datetime(2026, 2, 14, 9, 0),
+                                        datetime(2026, 3, 14, 9, 0), datetime(2026, 3, 28, 9, 0)]
+
+
+def test_next_after_is_strictly_after_and_none_once_ended():
+    rule = Recurrence("daily", START, until=datetime(2026, 2, 2, 9, 0))
+    assert rule.next_after(START) == datetime(2026, 2, 1, 9, 0)
+    assert rule.next_after(datetime(2026, 1, 1)) == START
+    assert rule.next_after(datetime(2026, 2, 2, 9, 0)) is None
+
+
+def test_count_from():
+    rule = Recurrence("monthly", START, until=datetime(2026, 12, 31, 9, 0), exdates=[datetime(2026, 3, 31, 9, 0)])
+    assert rule.count_from(datetime(2025, 1, 1)) == 11
+    assert rule.count_from(datetime(2026, 2, 1)) == 10
+    assert rule.count_from(datetime(2027, 1, 1)) == 0
+    assert Recurrence("daily", START).count_from(START) is None
+
+
+def test_row_round_trip():
+    rule = Recurrence("quarterly", START, interval=2, until=datetime(2030, 1, 1),
+                      exdates=[datetime(2026, 7, 31, 9, 0), datetime(2026, 3, 31, 9, 0)])
+    assert Recurrence.from_row(*rule.to_row()) == rule
+
+
+def test_rejects_unknown_frequency_and_bad_interval():
+    with pytest.raises(ValueError):
+        Recurrence("fortnightly", START)
+    with pytest.raises(ValueError):
+        Recurrence("daily", START, interval=0)
+
+
+def test_rows_are_stored_in_one_iso_shape_however_they_were_written():
+    rule = Recurrence.from_row("daily", 1, "2026-01-31 09:00:00.250000", "2026-03-01T09:00:00+00:00",
+                               "2026-02-01 09:00")
+    frequency, interval, starts_at, until, exdates = rule.to_row()
+    assert starts_at == "2026-01-31T09:00:00"
+    assert until == datetime(2026, 3, 1, 9, 0, tzinfo=timezone.utc).astimezone().strftime("%Y-%m-%dT%H:%M:%S")
+    assert exdates == "2026-02-01T09:00:00"
@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+import repository
+from database import insert_reminder
+from db_reader import DatabaseReader
+from db_writer import DatabaseWriter
+from repository import ReminderRepository
+
+
+@pytest.fixture
+def repo(db):
+    reader, writer = DatabaseReader(db), DatabaseWriter(db)
+    yield ReminderRepository(db, reader, writer, max_folders=2)
+    reader.close()
+    writer.close()
+
+
+def load(repo, folder_name):
+    """The folder's reminder texts, waiting for the background read if there is one."""
+    done = threading.Event()
+    rows = []
+    repo.load_reminders(folder_name, lambda result: (rows.extend(result), done.set()))
+    assert done.wait(5)
+    return [row[1] for row in rows]
+
+
+def test_a_second_load_comes_from_the_cache(db, repo):
+    insert_reminder(db, "Cached", "Work", 1, None)
+    assert load(repo, "Work") == ["Cached"]
+    assert load(repo, "Work") == ["Cached"]
+    assert repo.queries == 1
+
+
+def test_a_write_drops_the_folders_it_touched(db, repo):
+    load(repo, "Work")
+    load(repo, "Non-Completed")
+    repo.add_reminder("New", "Work", 1, None)
+    repo.writer.flush()
+
+    assert load(repo, "Work") == ["New"]
+    assert load(repo, "Non-Completed") == ["New"]  # Its copy
+    assert repo.queries == 4
+
+
+def test_least_recently_used_folders_are_dropped(db, repo):
+    for folder_name in ("A", "B", "C"):
+        load(repo, folder_name)
+    load(repo, "C")
+    load(repo, "A")
+    assert repo.queries == 4  # C from the cache, A read again
+
+
+def test_a_read_overtaken_by_a_write_is_not_cached(db, repo, monkeypatch):
+    insert_reminder(db, "Before", "Work", 1, None)
+    fetch = repository.fetch_folder_reminders
+    started, release = threading.Event(), threading.Event()
+
+    def slow_read(db, folder_name):
+        rows = fetch(db, folder_name)
+        started.set()
+        release.wait(5)
+        return rows
+
+    monkeypatch.setattr(repository, "fetch_folder_reminders", slow_read)
+    done = threading.Event()
+    repo.load_reminders("Work", lambda rows: done.set())
+    assert started.wait(5)
+    insert_reminder(db, "After", "Work", 1, None)
+    repo.invalidate("Work")  # As a write through the repository would, while the read is still going
+    release.set()
+    assert done.wait(5)
+
+    monkeypatch.setattr(repository, "fetch_folder_reminders", fetch)
+    assert load(repo, "Work") == ["Before", "After"]
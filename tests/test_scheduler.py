@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta
+
+from recurrence import Recurrence
+from scheduler import NotificationScheduler, MAX_SLEEP
+
+START = datetime(2030, 1, 1, 9, 0)
+
+
+class FakeClock:
+    """Wall clock the test moves by hand, and an arm() that only records the timer."""
+    def __init__(self):
+        self.now = START
+        self.timers = []
+
+    def arm(self, delay, callback):
+        timer = Timer(delay, callback)
+        self.timers.append(timer)
+        return timer
+
+    def fire(self):
+        """Run the live timer, as if its delay had passed."""
+        timer = [t for t in self.timers if not t.cancelled][-1]
+        timer.cancelled = True
+        timer.callback()
+        return timer
+
+
+class Timer:
+    def __init__(self, delay, callback):
+        self.delay = delay
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+def make(clock, batches, **kwargs):
+    return NotificationScheduler(batches.append, clock.arm, now=lambda: clock.now, **kwargs)
+
+
+def ids(batches):
+    return [[item[0] for item in batch] for batch in batches]
+
+
+def test_fires_in_due_order_with_one_timer():
+    clock, batches = FakeClock(), []
+    scheduler = make(clock, batches)
+    for reminder_id, minutes in ((3, 30), (1, 10), (2, 20)):
+        scheduler.add(reminder_id, f"R{reminder_id}", START + timedelta(minutes=minutes))
+    assert scheduler.next_due() == START + timedelta(minutes=10)
+    assert len([t for t in clock.timers if not t.cancelled]) == 1
+
+    for minutes in (10, 20, 30):
+        clock.now = START + timedelta(minutes=minutes)
+        clock.fire()
+    assert ids(batches) == [[1], [2], [3]]
+    assert len(scheduler) == 0
+
+
+def test_coalesces_what_falls_due_within_the_window():
+    clock, batches = FakeClock(), []
+    scheduler = make(clock, batches, coalesce=10)
+    scheduler.load([(1, "A", START + timedelta(minutes=1), None, None),
+                    (2, "B", START + timedelta(minutes=1, seconds=5), None, None),
+                    (3, "C", START + timedelta(minutes=1, seconds=30), None, None)])
+
+    clock.now = START + timedelta(minutes=1)
+    clock.fire()
+    assert ids(batches) == [[1, 2]]
+    assert scheduler.delivered_through == START + timedelta(minutes=1, seconds=10)
+    scheduler.add(2, "B", START + timedelta(minutes=1, seconds=5))  # Already delivered, ignored
+    assert len(scheduler) == 1
+
+
+def test_ignores_past_and_duplicate_due_times():
+    clock, batches = FakeClock(), []
+    scheduler = make(clock, batches)
+    scheduler.add(1, "Past", START - timedelta(minutes=1))
+    scheduler.add(2, "Soon", START + timedelta(minutes=1))
+    scheduler.add(2, "Soon", START + timedelta(minutes=1))
+    assert len(scheduler) == 1
+
+
+def test_removed_reminders_are_skipped_and_the_heap_compacted():
+    clock, batches = FakeClock(), []
+    scheduler = make(clock, batches)
+    for i in range(10):
+        scheduler.add(i, f"R{i}", START + timedelta(minutes=i + 1))
+    for i in range(6):
+        scheduler.remove(i)
+    assert len(scheduler) == 4
+    assert len(scheduler._heap) == 4  # Over half dead, rebuilt
+    assert scheduler.next_due() == START + timedelta(minutes=7)
+
+
+def test_a_repeating_rule_goes_back_in_as_its_next_occurrence():
+    clock, batches = FakeClock(), []
+    scheduler = make(clock, batches)
+    scheduler.add(1, "Daily", START - timedelta(days=3), rule=Recurrence("daily", START - timedelta(days=3)))
+    assert scheduler.next_due() == START + timedelta(days=1)  # Past ones skipped
+
+    clock.now = START + timedelta(days=1)
+    clock.fire()
+    assert ids(batches) == [[1]]
+    assert scheduler.next_due() == START + timedelta(days=2)
+
+
+def test_wake_read_in_background_goes_out_with_the_heap():
+    clock, batches, asked = FakeClock(), [], []
+    scheduler = make(clock, batches, on_wake=asked.append)  # Returns None, reads in the background
+    scheduler.add(1, "On the heap", START + timedelta(minutes=30))
+
+    clock.now = START + timedelta(hours=2)  # Wall clock jumped, monotonic didn't: slept
+    clock.fire()
+    assert asked == [START] and batches == []
+    assert clock.timers[-1].delay == MAX_SLEEP  # Held back until the read comes in
+
+    due = scheduler.catch_up([(2, "From the database", START + timedelta(minutes=10), None, None)])
+    assert [item[0] for item in due] == [2, 1]
+    assert scheduler.delivered_through == clock.now
+
+
+def test_wake_read_that_never_returns_times_out():
+    clock, batches = FakeClock(), []
+    scheduler = make(clock, batches, on_wake=lambda since: None)
+    scheduler.add(1, "On the heap", START + timedelta(minutes=30))
+
+    clock.now = START + timedelta(hours=2)
+    clock.fire()
+    clock.fire()  # MAX_SLEEP later, still nothing
+    assert ids(batches) == [[1]]
+
+
+def test_catch_up_rearms_once_however_many_schedules():
+    clock, batches = FakeClock(), []
+    scheduler = make(clock, batches)
+    clock.now = START + timedelta(hours=1)
+    missed = [(i, f"Daily {i}", START, None, Recurrence("daily", START)) for i in range(100)]
+
+    due = scheduler.catch_up(missed)
+    assert len(due) == 100
+    assert len(clock.timers) == 1
+    assert scheduler.next_due() == START + timedelta(days=1)
+    assert len(scheduler) == 100
+
+
+def test_wake_read_in_place_goes_out_as_one_batch():
+    clock, batches = FakeClock(), []
+    missed = [(2, "From the database", START + timedelta(minutes=10), None, None)]
+    scheduler = make(clock, batches, on_wake=lambda since: missed)
+    scheduler.add(1, "On the heap", START + timedelta(minutes=30))
+
+    clock.now = START + timedelta(hours=2)
+    clock.fire()
+    assert ids(batches) == [[2, 1]]
+
+
+def test_catch_up_keeps_what_a_tick_delivered_past_meanwhile():
+    clock, batches = FakeClock(), []
+    scheduler = make(clock, batches)
+    scheduler.add(1, "Due at start", START + timedelta(minutes=1))
+    clock.now = START + timedelta(minutes=1)
+    clock.fire()  # Before the startup read comes back; delivered_through moves past it
+    assert scheduler.delivered_through > START
+
+    since = START - timedelta(hours=3)
+    missed = [(2, "Too old", since, None, None), (3, "While closed", START - timedelta(hours=1), None, None)]
+    assert [item[0] for item in scheduler.catch_up(missed, since)] == [3]